@@ -0,0 +1,273 @@
+"""
+equivalence.py
+
+Golden-output differential harness: runs the reference engine (ReferenceBacktester, a frozen copy of
+the original row-by-row Backtester.run in reference_backtester.py) and a candidate engine on
+randomized synthetic series, strategies, parameters and settings, and compares the equity curve, strategy returns, trade_log, _extract_trades and metrics.
+The reference quirks are part of the contract: SL/TP is checked on the close, the fee is
+subtracted once per trade, and _extract_trades follows position changes, not trade_log.
+
+A candidate is given as 'module:attr' (modules are imported with src/ on sys.path):
+- a Backtester-compatible class, constructed like Backtester and run with .run(), or
+- a function (data, strategy, **settings) -> dict with the keys of engine_output().
+
+A failing case is shrunk (shorter bar window, default settings and params) to a minimal
+reproducer, printed as JSON and optionally saved; --replay re-runs a saved case.
+
+Usage:
+python benchmarks/equivalence.py --candidate backtester:Backtester --cases 50   # default engine (Numba kernel when installed)
+python benchmarks/equivalence.py --candidate my_engine:run_fast --cases 200 --seed 7 --save_failure case.json
+python benchmarks/equivalence.py --candidate my_engine:run_fast --replay case.json
+"""
+import argparse
+import importlib
+import inspect
+import json
+import os
+import random
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from backtester import Backtester
+from policies import SIZING_POLICIES, STOP_POLICIES
+from reference_backtester import ReferenceBacktester
+from strategy_registry import create_strategy, get_param_schema, list_strategies
+from synthetic import SESSION_BARS, synthetic_ohlcv
+
+DEFAULT_SETTINGS = {
+    'initial_cash': 100_000, 'fee': 0.0, 'risk_factor': 1.0, 'risk_reward': 3.0,
+    'stop_policy': None, 'sizing_policy': None,
+}
+# Columns of trade_log / _extract_trades compared exactly (the rest are floats compared with tolerances)
+EXACT_TRADE_COLUMNS = ['entry', 'exit', 'side', 'exit_reason']
+RTOL = 1e-9
+ATOL = 1e-6
+
+
+def load_candidate(path):
+    module, _, attr = path.partition(':')
+    if not attr:
+        raise ValueError(f"Candidate must be 'module:attr', got {path}")
+    return getattr(importlib.import_module(module), attr)
+
+
+def engine_output(backtester):
+    """
+    The artifacts compared between engines, taken from a finished Backtester.
+    """
+    return {
+        'equity': backtester.data['equity'].to_numpy(dtype=np.float64),
+        'strategy_returns': backtester.data['strategy_returns'].to_numpy(dtype=np.float64),
+        'trade_log': backtester.trade_log,
+        'trades': backtester._extract_trades(),
+        'metrics': dict(backtester.results),
+    }
+
+
+def run_engine(engine, data, strategy, settings):
+    if inspect.isclass(engine):
+        backtester = engine(data, strategy, **settings)
+        backtester.run()
+        return engine_output(backtester)
+    return engine(data, strategy, **settings)
+
+
+def random_case(rng):
+    """
+    A JSON-serializable case: market generator arguments, bar window, strategy, params and settings.
+    """
+    strategy = rng.choice(list_strategies())
+    params = {}
+    for name, spec in get_param_schema(strategy).items():
+        default = spec['default']
+        if spec['type'] is int:
+            params[name] = max(2, int(round(default * rng.uniform(0.5, 1.5))))
+        else:
+            params[name] = round(default * rng.uniform(0.7, 1.3), 4)
+    if 'fast' in params and 'slow' in params and params['fast'] >= params['slow']:
+        params['fast'], params['slow'] = min(params['fast'], params['slow'] - 1), max(params['slow'], params['fast'] + 1)
+    n_bars = rng.randint(50, 600)
+    return {
+        'market': {
+            'n_bars': n_bars,
+            'timeframe': rng.choice(list(SESSION_BARS)),
+            'seed': rng.randrange(2 ** 31),
+            'annual_vol': round(rng.uniform(0.1, 0.6), 4),
+            'annual_drift': round(rng.uniform(0.0, 0.8), 4),
+            'regime_stay': round(rng.uniform(0.9, 0.995), 4),
+        },
+        'window': [0, n_bars],
+        'strategy': strategy,
+        'params': params,
+        'settings': {
+            'initial_cash': rng.choice([10_000, 100_000, 1_000_000]),
+            'fee': rng.choice([0.0, 0.0, round(rng.uniform(0.1, 10.0), 4)]),
+            'risk_factor': round(rng.uniform(0.25, 3.0), 4),
+            'risk_reward': round(rng.uniform(0.5, 5.0), 4),
+            'stop_policy': rng.choice([None] + list(STOP_POLICIES)),
+            'sizing_policy': rng.choice([None] + list(SIZING_POLICIES)),
+        },
+    }
+
+
+def case_data(case):
+    start, stop = case['window']
+    return synthetic_ohlcv(**case['market']).iloc[start:stop]
+
+
+def _compare_frames(name, ref, cand, rtol, atol):
+    if len(ref) != len(cand):
+        return [f"{name}: {len(ref)} rows in reference, {len(cand)} in candidate"]
+    if ref.empty:
+        return []
+    if list(ref.columns) != list(cand.columns):
+        return [f"{name}: columns {list(ref.columns)} != {list(cand.columns)}"]
+    errors = []
+    for col in ref.columns:
+        a, b = ref[col].reset_index(drop=True), cand[col].reset_index(drop=True)
+        if col in EXACT_TRADE_COLUMNS or not pd.api.types.is_numeric_dtype(a):
+            bad = np.flatnonzero((a != b).to_numpy())
+        else:
+            bad = np.flatnonzero(~np.isclose(a.to_numpy(dtype=np.float64), b.to_numpy(dtype=np.float64), rtol=rtol, atol=atol, equal_nan=True))
+        if len(bad):
+            i = bad[0]
+            errors.append(f"{name}.{col}: {len(bad)} mismatches, first at row {i}: {a.iloc[i]!r} != {b.iloc[i]!r}")
+    return errors
+
+
+def compare_outputs(ref, cand, rtol=RTOL, atol=ATOL):
+    """
+    List of human-readable differences between two engine outputs (empty when equivalent).
+    """
+    errors = []
+    for key in ('equity', 'strategy_returns'):
+        a, b = np.asarray(ref[key]), np.asarray(cand[key])
+        if a.shape != b.shape:
+            errors.append(f"{key}: shape {a.shape} != {b.shape}")
+            continue
+        bad = np.flatnonzero(~np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True))
+        if len(bad):
+            errors.append(f"{key}: {len(bad)} mismatches, first at bar {bad[0]}: {a[bad[0]]} != {b[bad[0]]}")
+    errors += _compare_frames('trade_log', ref['trade_log'], cand['trade_log'], rtol, atol)
+    errors += _compare_frames('trades', ref['trades'], cand['trades'], rtol, atol)
+    for key in sorted(set(ref['metrics']) | set(cand['metrics'])):
+        if key not in ref['metrics'] or key not in cand['metrics']:
+            errors.append(f"metrics.{key}: missing from {'candidate' if key in ref['metrics'] else 'reference'}")
+            continue
+        a, b = ref['metrics'][key], cand['metrics'][key]
+        try:
+            same = np.isclose(float(a), float(b), rtol=rtol, atol=atol, equal_nan=True)
+        except (TypeError, ValueError):
+            same = a == b
+        if not same:
+            errors.append(f"metrics.{key}: {a} != {b}")
+    return errors
+
+
+def check_case(case, candidate, rtol=RTOL, atol=ATOL):
+    """
+    Run both engines on a case. Returns None when the reference itself cannot run the case
+    (not a valid case), else the list of differences.
+    """
+    data = case_data(case)
+    try:
+        ref = run_engine(ReferenceBacktester, data, create_strategy(case['strategy'], case['params']), case['settings'])
+    except Exception:
+        return None
+    try:
+        cand = run_engine(candidate, data, create_strategy(case['strategy'], case['params']), case['settings'])
+    except Exception as e:
+        return [f"candidate raised {type(e).__name__}: {e}"]
+    return compare_outputs(ref, cand, rtol, atol)
+
+
+def _shrink_steps(case):
+    """
+    (description, simpler case) pairs, most aggressive first.
+    """
+    start, stop = case['window']
+    n = stop - start
+    for size in (n // 2, n - n // 4, n - max(1, n // 8), n - 1):
+        if 0 < size < n:
+            # Keep the head or the tail of the window
+            yield f"first {size} bars", dict(case, window=[start, start + size])
+            yield f"last {size} bars", dict(case, window=[stop - size, stop])
+    for key, default in DEFAULT_SETTINGS.items():
+        if case['settings'].get(key) != default:
+            yield f"{key}={default!r}", dict(case, settings=dict(case['settings'], **{key: default}))
+    defaults = {name: spec['default'] for name, spec in get_param_schema(case['strategy']).items()}
+    for key, value in case['params'].items():
+        if value != defaults.get(key, value):
+            yield f"{key}={defaults[key]!r}", dict(case, params=dict(case['params'], **{key: defaults[key]}))
+
+
+def shrink(case, candidate, rtol=RTOL, atol=ATOL, max_checks=500, log=print):
+    """
+    Greedily simplify a failing case while it still fails. Returns (minimal case, its differences).
+    """
+    errors = check_case(case, candidate, rtol, atol)
+    checks = 0
+    progress = True
+    while progress and checks < max_checks:
+        progress = False
+        for step, smaller in _shrink_steps(case):
+            checks += 1
+            result = check_case(smaller, candidate, rtol, atol)
+            if result:
+                case, errors = smaller, result
+                progress = True
+                log(f"  shrunk: {step}")
+                break
+    return case, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential check of a candidate engine against the frozen reference Backtester.run.")
+    parser.add_argument('--candidate', type=str, default='backtester:Backtester', help="Candidate engine as 'module:attr'")
+    parser.add_argument('--cases', type=int, default=50, help='Number of random cases')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for case generation')
+    parser.add_argument('--rtol', type=float, default=RTOL, help='Relative tolerance for floats')
+    parser.add_argument('--atol', type=float, default=ATOL, help='Absolute tolerance for floats')
+    parser.add_argument('--no_shrink', action='store_true', help='Report the first failing case as generated')
+    parser.add_argument('--save_failure', type=str, default=None, help='Write the minimal failing case as JSON here')
+    parser.add_argument('--replay', type=str, default=None, help='Re-run a saved case instead of random ones')
+    args = parser.parse_args(argv)
+
+    candidate = load_candidate(args.candidate)
+    if args.replay:
+        with open(args.replay, encoding='utf-8') as f:
+            cases = [json.load(f)]
+    else:
+        rng = random.Random(args.seed)
+        cases = [random_case(rng) for _ in range(args.cases)]
+
+    skipped = 0
+    for i, case in enumerate(cases):
+        errors = check_case(case, candidate, args.rtol, args.atol)
+        if errors is None:
+            skipped += 1
+            continue
+        if not errors:
+            continue
+        print(f"[FAIL] case {i}: {case['strategy']} {case['market']['timeframe']} {case['window'][1] - case['window'][0]} bars")
+        if not args.no_shrink:
+            case, errors = shrink(case, candidate, args.rtol, args.atol)
+        for error in errors:
+            print(f"  {error}")
+        print(json.dumps(case, indent=2))
+        if args.save_failure:
+            with open(args.save_failure, 'w', encoding='utf-8') as f:
+                json.dump(case, f, indent=2)
+            print(f"Reproducer written to {args.save_failure}; re-run with --replay {args.save_failure}")
+        return 1
+    print(f"[OK] {len(cases) - skipped} cases equivalent ({skipped} skipped: reference could not run them)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+import_time.py
+
+Start-up budget check for the CLI. Runs `python -X importtime` on a module in a fresh
+interpreter, reports the cumulative import time, and exits non-zero when:
+- the cumulative import time exceeds the budget, or
+- any provider SDK (yfinance, polygon, dotenv) is imported on the cache/backtest path, or
+- numba is imported before the first compiled kernel call (kernels.py loads it lazily).
+  (pytz is not checked: pandas imports it itself whenever it is installed.)
+
+Usage:
+python benchmarks/import_time.py                       # checks run_backtest, 1500 ms budget
+python benchmarks/import_time.py --module src.cache --budget_ms 300 --repeat 5
+python benchmarks/import_time.py --module backtester --budget_ms 600
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+FORBIDDEN_MODULES = ['yfinance', 'polygon', 'dotenv']
+# Imported on first use only
+LAZY_MODULES = ['numba']
+
+
+def measure_import(module: str):
+    """
+    Import module in a fresh interpreter with -X importtime (src/ is importable, as in run_backtest).
+    Returns (cumulative microseconds for module, set of top-level packages imported).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.join(PROJECT_ROOT, 'src'), os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, env=env
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+    cumulative = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        imported.add(name.split('.')[0])
+        if name == module:
+            cumulative = int(parts[1])
+    return cumulative, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when module import time regresses past a budget.")
+    parser.add_argument('--module', default='run_backtest', help='Module to import (default: run_backtest)')
+    parser.add_argument('--budget_ms', type=float, default=1500.0, help='Maximum cumulative import time in milliseconds')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs to take the best of (reduces noise)')
+    args = parser.parse_args()
+
+    best = None
+    imported = set()
+    for _ in range(args.repeat):
+        cumulative, imported = measure_import(args.module)
+        if cumulative is not None and (best is None or cumulative < best):
+            best = cumulative
+    if best is None:
+        print(f"[FAIL] Could not find {args.module} in -X importtime output.")
+        sys.exit(1)
+
+    failed = False
+    best_ms = best / 1000
+    status = 'OK' if best_ms <= args.budget_ms else 'FAIL'
+    print(f"[{status}] import {args.module}: {best_ms:.1f} ms (budget {args.budget_ms:.0f} ms, best of {args.repeat})")
+    failed |= status == 'FAIL'
+    heavy = sorted(m for m in FORBIDDEN_MODULES if m in imported)
+    if heavy:
+        print(f"[FAIL] Provider SDKs imported at start-up: {', '.join(heavy)}")
+        failed = True
+    eager = sorted(m for m in LAZY_MODULES if m in imported)
+    if eager:
+        print(f"[FAIL] Lazily loaded modules imported at start-up: {', '.join(eager)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+reference_backtester.py
+
+Frozen copy of Backtester.run, _extract_trades and the metrics as they were before the columnar trade
+record and the compiled kernel (the row-by-row iterrows loop). benchmarks/equivalence.py uses it as
+the reference engine, so rewrites of src/backtester.py are compared against the original semantics
+rather than against themselves. Do not change it to follow the live engine.
+
+Policies (src/policies.py) and strategies are inputs to both engines and are imported live.
+One accepted contract change is applied: Strategy.custom_metrics receives trade_log (the simulated
+trades) rather than _extract_trades(), as Backtester has done since the columnar trade record.
+"""
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+from policies import SizingPolicy, StopPolicy, get_sizing_policy, get_stop_policy
+from strategy_interface import Strategy
+
+
+class ReferenceBacktester:
+    def __init__(self, data: pd.DataFrame, strategy: Strategy, initial_cash: float = 100_000, fee: float = 0.0, risk_factor: float = 1.0, risk_reward: float = 3.0,
+                 stop_policy: Union[str, StopPolicy, None] = None, sizing_policy: Union[str, SizingPolicy, None] = None,
+                 stop_params: Optional[Dict[str, Any]] = None, sizing_params: Optional[Dict[str, Any]] = None, engine: Optional[str] = None):
+        # engine is accepted for signature compatibility with Backtester and ignored
+        self.data = data.copy()
+        self.strategy = strategy
+        self.initial_cash = initial_cash
+        self.fee = fee
+        self.risk_factor = risk_factor
+        self.risk_reward = risk_reward
+        self.stop_policy = get_stop_policy(stop_policy or getattr(strategy, 'stop_policy', None), **(stop_params or getattr(strategy, 'stop_params', None) or {}))
+        self.sizing_policy = get_sizing_policy(sizing_policy or getattr(strategy, 'sizing_policy', None), **(sizing_params or getattr(strategy, 'sizing_params', None) or {}))
+        self.results = {}
+
+    def run(self) -> Dict[str, Any]:
+        self.strategy.before_backtest(self.data)
+        signals = self.strategy.generate_signals(self.data)
+        self.data = self.data.join(signals, how='left')
+        self.data['signal'] = self.data['signal'].fillna(0)
+        self.data['position'] = self.data['signal'].shift(1).fillna(0)
+        self.data['returns'] = self.data['close'].pct_change().fillna(0)
+        stop_policy = self.stop_policy
+        sizing_policy = self.sizing_policy
+        stop_policy.prepare(self.data)
+        sizing_policy.prepare(self.data)
+
+        equity = self.initial_cash
+        position = 0
+        entry_price = None
+        stop_loss = None
+        take_profit = None
+        trade_size = 0
+        equity_curve = []
+        strat_returns = []
+        trade_log = []
+        entry_idx = None
+        for i, (idx, row) in enumerate(self.data.iterrows()):
+            signal = row['signal']
+            price = row['close']
+            exit_reason = None
+            if position != 0:
+                if position == 1:
+                    if price <= stop_loss:
+                        exit_reason = 'stop_loss'
+                    elif price >= take_profit:
+                        exit_reason = 'take_profit'
+                elif position == -1:
+                    if price >= stop_loss:
+                        exit_reason = 'stop_loss'
+                    elif price <= take_profit:
+                        exit_reason = 'take_profit'
+                if signal == -position and exit_reason is None:
+                    exit_reason = 'signal'
+                if exit_reason:
+                    pnl = (price - entry_price) * position * trade_size - self.fee
+                    equity += pnl
+                    trade_log.append({
+                        'entry': entry_idx,
+                        'exit': idx,
+                        'side': position,
+                        'entry_price': entry_price,
+                        'exit_price': price,
+                        'size': trade_size,
+                        'pnl': pnl,
+                        'exit_reason': exit_reason
+                    })
+                    position = 0
+                    entry_price = None
+                    stop_loss = None
+                    take_profit = None
+                    trade_size = 0
+                    entry_idx = None
+                else:
+                    stop_loss = stop_policy.update_stop(i, price, position, stop_loss)
+            if position == 0 and signal != 0:
+                stop_loss = stop_policy.initial_stop(i, price, signal)
+                if signal == 1:
+                    take_profit = price + (price - stop_loss) * self.risk_reward
+                else:
+                    take_profit = price - (stop_loss - price) * self.risk_reward
+                trade_size = sizing_policy.size(i, price, stop_loss, equity, self.risk_factor)
+                entry_price = price
+                position = signal
+                entry_idx = idx
+            if position != 0 and entry_price is not None:
+                mtm_pnl = (price - entry_price) * position * trade_size
+                equity_curve.append(equity + mtm_pnl)
+                strat_returns.append(mtm_pnl / (equity if equity else 1))
+            else:
+                equity_curve.append(equity)
+                strat_returns.append(0)
+        self.data['equity'] = equity_curve
+        self.data['strategy_returns'] = strat_returns
+        self.trade_log = pd.DataFrame(trade_log)
+        trades = self._extract_trades()
+        metrics = self._compute_metrics(trades)
+        if not self.trade_log.empty:
+            wins = self.trade_log[self.trade_log['pnl'] > 0]['pnl']
+            losses = self.trade_log[self.trade_log['pnl'] < 0]['pnl']
+            metrics['avg_win'] = wins.mean() if not wins.empty else 0
+            metrics['avg_loss'] = losses.mean() if not losses.empty else 0
+        else:
+            metrics['avg_win'] = 0
+            metrics['avg_loss'] = 0
+        metrics.update(self.strategy.custom_metrics(self.trade_log, self.data))
+        self.strategy.after_backtest(metrics)
+        self.results = metrics
+        return metrics
+
+    def _extract_trades(self) -> pd.DataFrame:
+        trades = []
+        pos = 0
+        entry_idx = None
+        for idx, row in self.data.iterrows():
+            if row['position'] != pos:
+                if pos != 0:
+                    trades.append({'entry': entry_idx, 'exit': idx, 'side': pos})
+                if row['position'] != 0:
+                    entry_idx = idx
+                pos = row['position']
+        return pd.DataFrame(trades)
+
+    def _compute_metrics(self, trades: pd.DataFrame) -> Dict[str, Any]:
+        equity = self.data['equity']
+        returns = self.data['strategy_returns']
+        num_trades = len(self.trade_log) if not self.trade_log.empty else len(trades)
+        return {
+            'final_equity': equity.iloc[-1],
+            'total_return': equity.iloc[-1] / self.initial_cash - 1,
+            'max_drawdown': self._max_drawdown(equity),
+            'sharpe': self._sharpe(returns),
+            'num_trades': num_trades,
+        }
+
+    def _max_drawdown(self, equity: pd.Series) -> float:
+        roll_max = equity.cummax()
+        drawdown = (equity - roll_max) / roll_max
+        return drawdown.min()
+
+    def _sharpe(self, returns: pd.Series, risk_free: float = 0.0) -> float:
+        excess = returns - risk_free / 252
+        return np.sqrt(252) * excess.mean() / (excess.std() + 1e-9)
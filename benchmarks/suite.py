@@ -0,0 +1,258 @@
+"""
+suite.py
+
+Offline benchmark suite on seeded synthetic OHLCV data (src/synthetic.py); no provider keys needed.
+Times, for each timeframe and bar count:
+- signals/<strategy>: Strategy.generate_signals for every registered strategy (default params)
+- backtest/loop, backtest/metrics: the phases of Backtester.run,
+  read from the instrumentation spans (sma_crossover, default settings)
+- cache/<fmt>/save, cache/<fmt>/load: DataCache round trips for parquet, csv and feather
+- sessions/compute, sessions/cached: session arrays computed from the index vs read from the cache sidecar
+
+Each benchmark keeps the best and median of --repeat runs. Once a benchmark takes longer
+than --max_seconds at some size, its larger sizes are skipped (recorded as skipped).
+Results are written as JSON; with --baseline they are compared against a stored run and
+any benchmark slower than the baseline by more than --threshold is flagged as a regression.
+
+Usage:
+python benchmarks/suite.py                                         # 1k/10k/100k bars, 1d and 1min
+python benchmarks/suite.py --sizes 1000,10000,100000,1000000,10000000 --max_seconds 120
+python benchmarks/suite.py --output bench.json --save_baseline benchmarks/baseline.json
+python benchmarks/suite.py --baseline benchmarks/baseline.json --fail_on_regression
+python benchmarks/suite.py --only signals --timeframes 1min
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+import numpy as np
+import pandas as pd
+import instrumentation
+from backtester import Backtester
+from cache import DataCache
+from sessions import DEFAULT_CALENDAR
+from strategy_registry import create_strategy, list_strategies
+from synthetic import synthetic_ohlcv
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_TIMEFRAMES = ['1d', '1min']
+CACHE_FORMATS = ['parquet', 'csv', 'feather']
+BACKTEST_STRATEGY = 'sma_crossover'
+BACKTEST_PHASES = {'backtester.loop': 'loop', 'backtester.metrics': 'metrics'}
+# Differences below this are treated as timer noise, never as regressions
+NOISE_FLOOR_S = 0.002
+
+
+def time_call(func, repeat):
+    """
+    Run func repeat times; func returns None (timed here) or a dict of phase -> seconds it measured itself.
+    Returns {phase: [seconds, ...]} with phase None for the whole call.
+    """
+    samples = {}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        phases = func()
+        elapsed = time.perf_counter() - t0
+        for phase, seconds in (phases or {None: elapsed}).items():
+            samples.setdefault(phase, []).append(seconds)
+    return samples
+
+
+def summarize(samples, n_bars, timeframe):
+    return {
+        'n_bars': n_bars,
+        'timeframe': timeframe,
+        'repeat': len(samples),
+        'min_s': min(samples),
+        'median_s': statistics.median(samples),
+    }
+
+
+def bench_signals(name):
+    def run(data):
+        strategy = create_strategy(name, {})
+
+        def once():
+            strategy.generate_signals(data)
+        return once
+    return run
+
+
+def bench_backtest(data):
+    def once():
+        instrumentation.reset()
+        Backtester(data, create_strategy(BACKTEST_STRATEGY, {})).run()
+        spans = instrumentation.snapshot()['spans']
+        return {phase: spans[span]['total_s'] for span, phase in BACKTEST_PHASES.items() if span in spans}
+    return once
+
+
+def bench_cache(fmt, cache_dir):
+    def run(data):
+        cache = DataCache(cache_dir)
+
+        def once():
+            t0 = time.perf_counter()
+            cache.save(data, 'BENCH', 'synthetic', 'bench', fmt)
+            t1 = time.perf_counter()
+            cache.load('BENCH', 'synthetic', 'bench', fmt)
+            return {'save': t1 - t0, 'load': time.perf_counter() - t1}
+        return once
+    return run
+
+
+def bench_sessions(cache_dir):
+    def run(data):
+        cache = DataCache(cache_dir)
+        cache.save(data, 'BENCH', 'synthetic', 'sessions')
+        path = cache._get_path('BENCH', 'synthetic', 'sessions')
+
+        def once():
+            t0 = time.perf_counter()
+            DEFAULT_CALENDAR.arrays(data.index)
+            t1 = time.perf_counter()
+            cache.sessions(path, data)
+            return {'compute': t1 - t0, 'cached': time.perf_counter() - t1}
+        return once
+    return run
+
+
+def build_benchmarks(only, cache_dir):
+    """
+    List of (prefix, factory); factory(data) returns the callable that time_call repeats.
+    """
+    benches = [(f'signals/{name}', bench_signals(name)) for name in list_strategies()]
+    benches.append(('backtest', bench_backtest))
+    benches += [(f'cache/{fmt}', bench_cache(fmt, cache_dir)) for fmt in CACHE_FORMATS]
+    benches.append(('sessions', bench_sessions(cache_dir)))
+    if only:
+        benches = [(prefix, factory) for prefix, factory in benches if any(prefix.startswith(o) for o in only)]
+    return benches
+
+
+def run_suite(sizes, timeframes, repeat=3, max_seconds=30.0, only=None, seed=0, log=print):
+    """
+    Run every benchmark for every (timeframe, size). Returns {benchmark key: result dict}.
+    """
+    cache_dir = tempfile.mkdtemp(prefix='strategytester-bench-')
+    # Spans are aggregated for the backtest phases but not logged line by line
+    instrumentation.enable(logging.WARNING)
+    results = {}
+    try:
+        benches = build_benchmarks(only, cache_dir)
+        for timeframe in timeframes:
+            over_budget = set()
+            for n_bars in sorted(sizes):
+                pending = [(prefix, factory) for prefix, factory in benches if prefix not in over_budget]
+                if not pending:
+                    break
+                data = synthetic_ohlcv(n_bars, timeframe, seed=seed)
+                for prefix, factory in pending:
+                    t0 = time.perf_counter()
+                    samples = time_call(factory(data), repeat)
+                    for phase, values in samples.items():
+                        name = f"{prefix}/{phase}" if phase else prefix
+                        key = f"{name}[{timeframe},{n_bars}]"
+                        results[key] = summarize(values, n_bars, timeframe)
+                        log(f"{key:55s} min {results[key]['min_s'] * 1000:10.2f} ms  median {results[key]['median_s'] * 1000:10.2f} ms")
+                    if (time.perf_counter() - t0) / repeat > max_seconds:
+                        over_budget.add(prefix)
+                        log(f"{prefix}: over {max_seconds:.0f}s per run at {n_bars} bars, skipping larger sizes for {timeframe}")
+                for prefix in over_budget:
+                    for n in sizes:
+                        if n > n_bars:
+                            results.setdefault(f"{prefix}[{timeframe},{n}]", {'n_bars': n, 'timeframe': timeframe, 'skipped': True})
+                del data
+    finally:
+        instrumentation.disable()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def environment(seed):
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'seed': seed,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare best times with a baseline's. Returns (regressions, improvements), each a list of
+    (key, baseline_s, current_s, ratio).
+    """
+    regressions, improvements = [], []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base or cur.get('skipped') or base.get('skipped'):
+            continue
+        b, c = base['min_s'], cur['min_s']
+        if abs(c - b) < NOISE_FLOOR_S or b <= 0:
+            continue
+        ratio = c / b
+        if ratio > 1 + threshold:
+            regressions.append((key, b, c, ratio))
+        elif ratio < 1 / (1 + threshold):
+            improvements.append((key, b, c, ratio))
+    return regressions, improvements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on synthetic OHLCV data.")
+    parser.add_argument('--sizes', type=str, default=','.join(str(n) for n in DEFAULT_SIZES), help='Comma-separated bar counts')
+    parser.add_argument('--timeframes', type=str, default=','.join(DEFAULT_TIMEFRAMES), help='Comma-separated timeframes (1d, 1h, 5min, 1min)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the best is compared')
+    parser.add_argument('--max_seconds', type=float, default=30.0, help='Skip larger sizes of a benchmark once one run takes longer than this')
+    parser.add_argument('--only', type=str, default=None, help='Comma-separated benchmark prefixes, e.g. signals,cache/parquet')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic data seed')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON here')
+    parser.add_argument('--baseline', type=str, default=None, help='Baseline JSON to compare against')
+    parser.add_argument('--save_baseline', type=str, default=None, help='Also write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Relative slowdown flagged as a regression (0.25 = 25%%)')
+    parser.add_argument('--fail_on_regression', action='store_true', help='Exit non-zero when a regression is flagged')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    timeframes = [t for t in args.timeframes.split(',') if t]
+    only = [o for o in args.only.split(',') if o] if args.only else None
+    results = run_suite(sizes, timeframes, args.repeat, args.max_seconds, only, args.seed)
+    report = {'environment': environment(args.seed), 'results': results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"Results written to {path}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions, improvements = compare(results, baseline.get('results', {}), args.threshold)
+    print(f"Compared with {args.baseline} (recorded {baseline.get('environment', {}).get('timestamp', '?')})")
+    for key, b, c, ratio in improvements:
+        print(f"[FASTER] {key}: {b * 1000:.2f} ms -> {c * 1000:.2f} ms ({ratio:.2f}x)")
+    for key, b, c, ratio in regressions:
+        print(f"[REGRESSION] {key}: {b * 1000:.2f} ms -> {c * 1000:.2f} ms ({ratio:.2f}x)")
+    if not regressions:
+        print(f"[OK] no regressions above {args.threshold:.0%}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
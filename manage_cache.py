@@ -0,0 +1,129 @@
+"""
+CLI to inspect and trim the market data cache (see src/cache_manager.py).
+Usage example:
+python manage_cache.py usage
+python manage_cache.py evict --budget massive/minute=20GB --max_age '*/*=180' --dry_run
+python manage_cache.py evict --policies cache_policies.json
+python manage_cache.py compact --dry_run
+python manage_cache.py clear --provider massive --symbols AAPL,MSFT --timeframes day
+python manage_cache.py benchmark --timeframes minute --limit 5 --output codecs.csv
+python manage_cache.py benchmark --codecs parquet:lz4,parquet:zstd:3,parquet:zstd:19,feather:lz4
+Budgets are PROVIDER/TIMEFRAME=VALUE with '*' as a wildcard; a policies file is JSON of the form
+{"massive/minute": {"max_bytes": "20GB", "max_age_days": 90}, "*/*": {"max_age_days": 365}}.
+Without --dry_run the listed files are deleted (evict, clear) or merged (compact).
+benchmark rewrites cached datasets in each format/codec (in a temp directory, the cache is not
+modified) and reports write time, load time and size; '*' marks the codec save() currently uses.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from cache import DataCache
+from cache_manager import CacheManager, RetentionPolicy, format_bytes, parse_size
+
+
+def _key(scope: str):
+    provider, _, timeframe = scope.partition('/')
+    if not provider or not timeframe:
+        raise argparse.ArgumentTypeError(f"Expected PROVIDER/TIMEFRAME, got {scope!r}")
+    return provider, timeframe
+
+
+def _scope(text: str):
+    scope, _, value = text.partition('=')
+    if not value:
+        raise argparse.ArgumentTypeError(f"Expected PROVIDER/TIMEFRAME=VALUE, got {text!r}")
+    return _key(scope), value
+
+
+def build_policies(args) -> dict:
+    policies = {}
+    if args.policies:
+        with open(args.policies) as f:
+            for scope, conf in json.load(f).items():
+                max_bytes = conf.get('max_bytes')
+                policies[_key(scope)] = RetentionPolicy(parse_size(str(max_bytes)) if max_bytes is not None else None, conf.get('max_age_days'))
+    for key, value in args.budget or []:
+        policies.setdefault(key, RetentionPolicy()).max_bytes = parse_size(value)
+    for key, value in args.max_age or []:
+        policies.setdefault(key, RetentionPolicy()).max_age_days = float(value)
+    return policies
+
+
+def print_actions(actions, dry_run: bool) -> None:
+    verb = 'Would reclaim' if dry_run else 'Reclaimed'
+    for action in actions:
+        target = f" -> {os.path.basename(action.target)}" if action.target else ''
+        print(f"  {action.kind:8} {format_bytes(action.bytes):>10}  {action.paths[0]}{target}  ({action.reason})")
+        for path in action.paths[1:] if action.kind == 'compact' else []:
+            print(f"  {'':8} {'':>10}  {path}")
+    estimated = ' (compaction sizes estimated)' if dry_run and any(a.kind == 'compact' for a in actions) else ''
+    print(f"{verb} {format_bytes(sum(a.bytes for a in actions))} in {len(actions)} action(s){estimated}.")
+
+
+def print_benchmark(results: pd.DataFrame) -> None:
+    if results.empty:
+        print("No cached datasets to benchmark.")
+        return
+    print(f"{results['dataset'].nunique()} dataset(s), {len(results)} runs")
+    for tier, group in results.groupby('tier'):
+        summary = group.groupby('codec').agg(bytes=('bytes', 'sum'), write_s=('write_s', 'sum'), read_s=('read_s', 'sum'),
+                                             current=('current', 'any')).sort_values('read_s')
+        print(f"\n[{tier}] totals over {group['dataset'].nunique()} dataset(s), fastest load first")
+        print(f"  {'codec':24} {'size':>10} {'write ms':>10} {'read ms':>10}")
+        for codec, row in summary.iterrows():
+            mark = '*' if row['current'] else ' '
+            print(f"{mark} {codec:24} {format_bytes(row['bytes']):>10} {row['write_s'] * 1000:>10.1f} {row['read_s'] * 1000:>10.1f}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Inspect, evict and compact cached market data.")
+    parser.add_argument('command', choices=['usage', 'evict', 'compact', 'clear', 'benchmark'])
+    parser.add_argument('--cache_dir', type=str, default=None, help='Cache directory (default: ./cache)')
+    parser.add_argument('--dry_run', action='store_true', help='List what would change without touching files')
+    parser.add_argument('--policies', type=str, default=None, help='JSON file of retention policies')
+    parser.add_argument('--budget', type=_scope, action='append', help='Size budget, e.g. massive/minute=20GB (repeatable)')
+    parser.add_argument('--max_age', type=_scope, action='append', help='Days since last read, e.g. */day=365 (repeatable)')
+    parser.add_argument('--provider', type=str, default=None, help='Provider to clear or benchmark')
+    parser.add_argument('--symbols', type=str, default=None, help='Comma-separated symbols to clear (default: all)')
+    parser.add_argument('--timeframes', type=str, default=None, help='Comma-separated timeframes to clear or benchmark (default: all)')
+    parser.add_argument('--codecs', type=str, default=None, help='Comma-separated format:compression[:level][:nodict] to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Benchmark runs per codec; the best is reported')
+    parser.add_argument('--limit', type=int, default=None, help='Benchmark at most this many datasets (largest first)')
+    parser.add_argument('--output', type=str, default=None, help='Write benchmark rows to this CSV')
+    args = parser.parse_args()
+
+    manager = CacheManager(DataCache(args.cache_dir), build_policies(args))
+    if args.command == 'usage':
+        usage = manager.usage()
+        print(usage.assign(size=usage['bytes'].map(format_bytes)).to_string(index=False) if not usage.empty else "Cache is empty.")
+        print(f"Total: {format_bytes(usage['bytes'].sum() if not usage.empty else 0)}")
+    elif args.command == 'evict':
+        if not manager.policies:
+            print("No policies given; only leftover files (corrupt, temp, orphaned sidecars) are reclaimed.")
+        print_actions(manager.evict(dry_run=args.dry_run), args.dry_run)
+    elif args.command == 'compact':
+        print_actions(manager.compact(dry_run=args.dry_run), args.dry_run)
+    elif args.command == 'clear':
+        if not args.provider:
+            parser.error("clear requires --provider")
+        symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else None
+        timeframes = [t.strip() for t in args.timeframes.split(',')] if args.timeframes else None
+        print_actions(manager.clear(args.provider, symbols, timeframes, dry_run=args.dry_run), args.dry_run)
+    elif args.command == 'benchmark':
+        codecs = [c.strip() for c in args.codecs.split(',')] if args.codecs else None
+        timeframes = [t.strip() for t in args.timeframes.split(',')] if args.timeframes else [None]
+        results = pd.concat([manager.benchmark_codecs(codecs, args.repeat, args.provider, timeframe, args.limit)
+                             for timeframe in timeframes], ignore_index=True)
+        print_benchmark(results)
+        if args.output:
+            results.to_csv(args.output, index=False)
+            print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,62 +2,105 @@
 CLI tool to run backtests on cached data with any strategy.
 Usage example:
 python run_backtest.py --symbol GOOGL --provider massive --strategy sma_crossover --fast 5 --slow 15
+python run_backtest.py --symbol GOOGL --provider massive --strategy sma_crossover --start 2023-01-01 --end 2023-06-30
+python run_backtest.py --symbol GOOGL --provider auto --strategy sma_crossover --start 2024-01-01 --end 2024-06-30 --fetch
+python run_backtest.py --symbol GOOGL --provider massive --timeframe 1min --strategy sma_crossover --session regular
+Timing spans as JSON lines (see src/instrumentation.py), optionally with a profiler capture:
+python run_backtest.py --symbol GOOGL --provider massive --strategy sma_crossover --trace --profile run.prof
+Batch mode (many symbols x strategies x param grids in one process, see src/batch.py):
+python run_backtest.py batch --spec jobs.json
+python run_backtest.py batch --symbols AAPL,MSFT --provider massive --strategies sma_crossover --grid fast=5:20:5 --grid slow=30,50 --output results.parquet
 """
 
 import argparse
-import importlib
-from src.data_fetchers import DataFetcher
-from src.backtester import Backtester
-
-STRATEGY_MAP = {
-    'sma_crossover': 'src.strategies.sma_crossover.SmaCrossoverStrategy',
-    'rsi_mean_reversion': 'src.strategies.rsi_mean_reversion.RsiMeanReversionStrategy',
-    'macd_crossover': 'src.strategies.macd_crossover.MACDCrossoverStrategy',
-    'impulse_macd': 'src.strategies.impulse_macd.ImpulseMACDStrategy',
-}
-
-def get_strategy_class(strategy_name):
-    if strategy_name not in STRATEGY_MAP:
-        raise ValueError(f"Unknown strategy: {strategy_name}")
-    module_path, class_name = STRATEGY_MAP[strategy_name].rsplit('.', 1)
-    module = importlib.import_module(module_path)
-    return getattr(module, class_name)
+import os
+import sys
+# Strategy modules import their siblings top-level (e.g. strategy_interface), so src/ must be importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from cache import DataCache
+from backtester import Backtester
+from policies import STOP_POLICIES, SIZING_POLICIES, parse_policy_params
+from providers import AUTO, PROVIDER_NAMES, ProviderRouter, cache_timeframe
+from sessions import SESSION_FILTERS
+from strategy_registry import list_strategies, create_strategy
+import instrumentation
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from batch import main as batch_main
+        batch_main(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser(description="Run a backtest on cached data.")
     parser.add_argument('--symbol', required=True, help='Ticker symbol (e.g. GOOGL)')
-    parser.add_argument('--provider', required=True, choices=['massive', 'yfinance'], help='Data provider')
-    parser.add_argument('--strategy', required=True, choices=list(STRATEGY_MAP.keys()), help='Strategy name')
+    parser.add_argument('--provider', required=True, choices=[AUTO, *PROVIDER_NAMES], help="Data provider ('auto': whichever provider's cache has the data)")
+    parser.add_argument('--strategy', required=True, choices=list_strategies(), help='Strategy name')
     parser.add_argument('--fast', type=int, default=5, help='Fast period (for SMA Crossover)')
     parser.add_argument('--slow', type=int, default=15, help='Slow period (for SMA Crossover)')
+    parser.add_argument('--params', type=str, default=None, help='Extra strategy params, e.g. period=10,lower=25 (override --fast/--slow)')
     parser.add_argument('--cash', type=float, default=100_000, help='Initial cash')
     parser.add_argument('--fee', type=float, default=0.0, help='Per-trade fee')
-    parser.add_argument('--risk_factor', type=float, default=1.0, help='Risk factor (multiplier for risk per trade, e.g. 1 = 1% of equity)')
+    parser.add_argument('--risk_factor', type=float, default=1.0, help='Risk factor (multiplier for risk per trade, e.g. 1 = 1%% of equity)')
     parser.add_argument('--risk_reward', type=float, default=3.0, help='Risk:Reward ratio (e.g. 3 = 3:1)')
+    parser.add_argument('--stop_policy', choices=list(STOP_POLICIES.keys()), default=None, help='Stop policy (default: fixed_pct, 1%% from entry)')
+    parser.add_argument('--stop_params', type=str, default=None, help='Stop policy params, e.g. period=14,multiplier=2')
+    parser.add_argument('--sizing_policy', choices=list(SIZING_POLICIES.keys()), default=None, help='Position sizing policy (default: fixed_fractional)')
+    parser.add_argument('--sizing_params', type=str, default=None, help='Sizing policy params, e.g. target_vol=0.15,max_exposure=1.0')
     parser.add_argument('--timeframe', type=str, default='1d', help='Timeframe (e.g. 1d, 1min, 5min, 1h)')
     parser.add_argument('--date_range', type=str, default=None, help='Date range string (e.g. 2021-01-01_to_2026-01-12)')
+    parser.add_argument('--start', type=str, default=None, help='First bar to test (e.g. 2023-01-01); reads only that window from the cache')
+    parser.add_argument('--end', type=str, default=None, help='Last bar to test, inclusive (e.g. 2023-06-30)')
+    parser.add_argument('--fetch', action='store_true', help='Download missing data (needs --start/--end), routed cache -> yfinance -> massive -> alpaca with --provider auto')
+    parser.add_argument('--session', choices=list(SESSION_FILTERS), default=None, help="Backtest only bars of this session ('extended' adds pre/after-hours); default: the strategy's")
+    parser.add_argument('--engine', choices=['auto', 'numba', 'python'], default=None, help='Simulation engine (default: STRATEGYTESTER_ENGINE or auto = Numba kernel when installed)')
+    parser.add_argument('--trace', action='store_true', help='Log timing spans and counters as JSON lines on stderr')
+    parser.add_argument('--profile', type=str, nargs='?', const='', default=None, help='Profile the run; optional output path (otherwise print a report)')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile', help='Profiler used by --profile')
     args = parser.parse_args()
+    if args.trace:
+        instrumentation.enable()
+    if args.profile is not None:
+        with instrumentation.profile(args.profile or None, engine=args.profiler):
+            run(args)
+    else:
+        run(args)
+    if args.trace:
+        instrumentation.log_summary()
 
-    fetcher = DataFetcher()
-    # Timeframe mapping for cache folder
-    tf_map = {'1d': 'day', '1min': 'minute', '1m': 'minute', '5min': 'minute', '1h': 'hour'}
-    cache_timeframe = args.timeframe or '1d'
-    if args.provider == 'massive':
-        cache_timeframe = tf_map.get(args.timeframe, 'day')
-    data = fetcher.cache.load(args.symbol, args.provider, cache_timeframe, 'parquet', args.date_range)
-    if data is None:
-        print(f"No cached data found for {args.symbol}/{args.provider}/{cache_timeframe}{f'/{args.date_range}' if args.date_range else ''}. Please run the fetcher first.")
-        return
 
-    StrategyClass = get_strategy_class(args.strategy)
-    # For impulse_macd, pass extra params
-    if args.strategy == 'impulse_macd':
-        strategy = StrategyClass(fast=args.fast, slow=args.slow, signal=9, hist_clip=0.5, lookback_days=22)
+def run(args):
+
+    # Read straight from the cache: the provider SDKs behind DataFetcher are only imported to download (--fetch)
+    cache = DataCache()
+    provider = args.provider
+    router = None
+    if provider == AUTO or args.fetch:
+        router = ProviderRouter.default()
+        cache = router.cache
+        provider = router.resolve(provider, args.timeframe, args.start, args.end, symbol=args.symbol) or PROVIDER_NAMES[0]
+    folder = cache_timeframe(provider, args.timeframe)
+    if args.start or args.end:
+        # Window queries pick the cached file(s) themselves and skip row groups outside the window
+        data = cache.scan(args.symbol, folder, provider, date_range=args.date_range).between(args.start, args.end).to_pandas()
     else:
-        strategy = StrategyClass(fast=args.fast, slow=args.slow)
+        data = cache.load(args.symbol, provider, folder, 'parquet', args.date_range, sessions=bool(args.session))
+    if (data is None or data.empty) and args.fetch:
+        if not (args.start and args.end):
+            print("--fetch needs --start and --end.")
+            return
+        data, provider = router.fetch(args.symbol, args.timeframe, args.start, args.end, provider=args.provider)
+    if data is None or data.empty:
+        print(f"No cached data found for {args.symbol}/{provider}/{folder}{f'/{args.date_range}' if args.date_range else ''}. Please run the fetcher first.")
+        return
+
+    params = {'fast': args.fast, 'slow': args.slow}
+    params.update(parse_policy_params(args.params))
+    strategy = create_strategy(args.strategy, params)
     backtester = Backtester(
         data, strategy, initial_cash=args.cash, fee=args.fee,
-        risk_factor=args.risk_factor, risk_reward=args.risk_reward
+        risk_factor=args.risk_factor, risk_reward=args.risk_reward,
+        stop_policy=args.stop_policy, sizing_policy=args.sizing_policy,
+        stop_params=parse_policy_params(args.stop_params), sizing_params=parse_policy_params(args.sizing_params),
+        engine=args.engine, session=args.session
     )
     results = backtester.run()
     print("Backtest Results:")
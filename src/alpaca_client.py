@@ -0,0 +1,230 @@
+"""
+Async client for Alpaca's historical stock bars endpoint (GET /v2/stocks/bars).
+One request carries many symbols and the response is paginated with next_page_token, so
+refreshing a whole watchlist costs one round trip per page rather than one request per symbol.
+Requests go through a transport:
+- AiohttpTransport keeps one connection pool (keep-alive) for the client's lifetime
+- RecordedTransport replays responses saved by RecordingTransport, so fetch logic can run offline without API keys
+
+Bars come back in the Massive cache schema (open, high, low, close, volume, vwap, timestamp,
+transactions; naive UTC 'datetime' index), so cached Alpaca data loads like any other provider's.
+
+Example:
+    frames = fetch_bars(['AAPL', 'MSFT'], 'day', '2024-01-01', '2024-06-30', key_id=..., secret_key=...)
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATA_URL = 'https://data.alpaca.markets'
+BARS_PATH = '/v2/stocks/bars'
+# Cache timeframe folder -> Alpaca timeframe
+TIMEFRAMES = {'day': '1Day', 'hour': '1Hour', 'minute': '1Min'}
+# Bars per page (the API maximum); the limit applies across all symbols of a request
+PAGE_LIMIT = 10_000
+# Symbols per request, to keep the query string well under URL length limits
+MAX_SYMBOLS_PER_REQUEST = 100
+MAX_RETRIES = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Alpaca bar fields -> cache columns
+BAR_COLUMNS = {'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume', 'vw': 'vwap', 'n': 'transactions'}
+CACHE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'vwap', 'timestamp', 'transactions']
+
+Response = Tuple[int, Dict[str, str], Any]
+
+
+class AlpacaError(Exception):
+    def __init__(self, status: int, body: Any):
+        super().__init__(f"Alpaca request failed with HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class AiohttpTransport:
+    """
+    HTTP transport over one aiohttp session, created on first use and reused for every request.
+    """
+    def __init__(self, max_connections: int = 8, timeout: float = 30.0):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+
+    async def get(self, url: str, params: Dict[str, str], headers: Dict[str, str]) -> Response:
+        import aiohttp
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections),
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        async with self._session.get(url, params=params, headers=headers) as resp:
+            body = await resp.json(content_type=None)
+            return resp.status, dict(resp.headers), body
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def _request_key(params: Dict[str, str]) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+class RecordedTransport:
+    """
+    Replays recorded responses: a JSON-lines file (or list) of {'params', 'status', 'headers', 'body'}.
+    Responses are matched on the request parameters and served in recorded order, so a 429 followed
+    by a 200 for the same page replays the retry. requests lists every request made, for assertions.
+    """
+    def __init__(self, recordings):
+        if isinstance(recordings, str):
+            with open(recordings, encoding='utf-8') as f:
+                recordings = [json.loads(line) for line in f if line.strip()]
+        self._responses: Dict[str, List[dict]] = {}
+        for rec in recordings:
+            self._responses.setdefault(_request_key(rec['params']), []).append(rec)
+        self.requests: List[Dict[str, str]] = []
+
+    async def get(self, url: str, params: Dict[str, str], headers: Dict[str, str]) -> Response:
+        self.requests.append(dict(params))
+        queue = self._responses.get(_request_key(params))
+        if not queue:
+            raise KeyError(f"[RecordedTransport] No recorded response for {params}")
+        rec = queue.pop(0) if len(queue) > 1 else queue[0]
+        return rec.get('status', 200), rec.get('headers', {}), rec['body']
+
+    async def close(self) -> None:
+        pass
+
+
+class RecordingTransport:
+    """
+    Wraps a live transport and appends every exchange to a JSON-lines file for RecordedTransport.
+    """
+    def __init__(self, path: str, transport=None):
+        self.path = path
+        self.transport = transport or AiohttpTransport()
+
+    async def get(self, url: str, params: Dict[str, str], headers: Dict[str, str]) -> Response:
+        status, resp_headers, body = await self.transport.get(url, params, headers)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'params': params, 'status': status, 'headers': resp_headers, 'body': body}) + '\n')
+        return status, resp_headers, body
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+
+class AlpacaBarsClient:
+    """
+    Paginated multi-symbol bars requests; use as 'async with AlpacaBarsClient(...) as client'.
+    :param feed: 'iex' (free plan) or 'sip'
+    :param adjustment: 'raw', 'split', 'dividend' or 'all'
+    :param transport: AiohttpTransport (default), RecordedTransport or anything with async get()/close()
+    :param max_concurrency: Symbol batches requested at once
+    :param retry_delay: Base seconds for exponential backoff when the server gives no reset time
+    """
+    def __init__(self, key_id: Optional[str] = None, secret_key: Optional[str] = None, feed: str = 'iex', adjustment: str = 'all',
+                 transport=None, base_url: str = DATA_URL, max_concurrency: int = 4, page_limit: int = PAGE_LIMIT,
+                 retry_delay: float = 1.0):
+        self.headers = {'APCA-API-KEY-ID': key_id or '', 'APCA-API-SECRET-KEY': secret_key or ''}
+        self.feed = feed
+        self.adjustment = adjustment
+        self.transport = transport or AiohttpTransport()
+        self.url = base_url.rstrip('/') + BARS_PATH
+        self.page_limit = page_limit
+        self.retry_delay = retry_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.requests = 0
+
+    async def __aenter__(self) -> 'AlpacaBarsClient':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.transport.close()
+
+    async def bars(self, symbols: Sequence[str], timeframe: str, start: str, end: str) -> Dict[str, pd.DataFrame]:
+        """
+        Bars of every symbol between start and end (dates, end day included).
+        :param timeframe: Cache timeframe ('day', 'hour', 'minute') or an Alpaca timeframe such as '5Min'
+        :return: {symbol: DataFrame in the cache schema}; symbols without bars are omitted
+        """
+        symbols = list(dict.fromkeys(symbols))
+        batches = [symbols[i:i + MAX_SYMBOLS_PER_REQUEST] for i in range(0, len(symbols), MAX_SYMBOLS_PER_REQUEST)]
+        results = await asyncio.gather(*(self._fetch_batch(batch, TIMEFRAMES.get(timeframe, timeframe), start, end) for batch in batches))
+        rows: Dict[str, List[dict]] = {}
+        for batch_rows in results:
+            for symbol, bars in batch_rows.items():
+                rows.setdefault(symbol, []).extend(bars)
+        return {symbol: bars_frame(bars) for symbol, bars in rows.items() if bars}
+
+    async def _fetch_batch(self, symbols: List[str], timeframe: str, start: str, end: str) -> Dict[str, List[dict]]:
+        params = {
+            'symbols': ','.join(symbols), 'timeframe': timeframe, 'start': _rfc3339(start), 'end': _rfc3339(end, end_of_day=True),
+            'limit': str(self.page_limit), 'adjustment': self.adjustment, 'feed': self.feed,
+        }
+        rows: Dict[str, List[dict]] = {}
+        page_token = None
+        async with self._semaphore:
+            while True:
+                page_params = dict(params, page_token=page_token) if page_token else params
+                body = await self._get(page_params)
+                for symbol, bars in (body.get('bars') or {}).items():
+                    rows.setdefault(symbol, []).extend(bars)
+                page_token = body.get('next_page_token')
+                if not page_token:
+                    return rows
+
+    async def _get(self, params: Dict[str, str]) -> dict:
+        for attempt in range(MAX_RETRIES + 1):
+            self.requests += 1
+            status, headers, body = await self.transport.get(self.url, params, self.headers)
+            if status == 200:
+                return body
+            if status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                raise AlpacaError(status, body)
+            delay = self._retry_after(headers, attempt)
+            logger.info("[Alpaca] HTTP %s, retrying in %.1fs (attempt %d/%d)", status, delay, attempt + 1, MAX_RETRIES)
+            await asyncio.sleep(delay)
+
+    def _retry_after(self, headers: Dict[str, str], attempt: int) -> float:
+        headers = {k.lower(): v for k, v in headers.items()}
+        if 'x-ratelimit-reset' in headers:
+            return max(float(headers['x-ratelimit-reset']) - time.time(), 0.0)
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+        return self.retry_delay * 2 ** attempt
+
+
+def _rfc3339(value: str, end_of_day: bool = False) -> str:
+    ts = pd.Timestamp(value)
+    if end_of_day and isinstance(value, str) and len(value.strip()) <= 10:
+        ts = ts + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    return ts.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def bars_frame(bars: List[dict]) -> pd.DataFrame:
+    """
+    Alpaca bar objects as a DataFrame in the cache schema (like fetch_massive's), sorted by time.
+    """
+    df = pd.DataFrame(bars).rename(columns=BAR_COLUMNS)
+    times = pd.to_datetime(df.pop('t'), utc=True)
+    df['timestamp'] = times.dt.as_unit('ms').astype('int64')
+    df.index = pd.DatetimeIndex(times.dt.tz_localize(None), name='datetime')
+    df = df.reindex(columns=CACHE_COLUMNS)
+    return df[~df.index.duplicated()].sort_index()
+
+
+def fetch_bars(symbols: Sequence[str], timeframe: str, start: str, end: str, **client_kwargs) -> Dict[str, pd.DataFrame]:
+    """
+    Synchronous wrapper: run one client over all symbols and close it (not for use inside a running event loop).
+    """
+    async def run():
+        async with AlpacaBarsClient(**client_kwargs) as client:
+            return await client.bars(symbols, timeframe, start, end)
+    return asyncio.run(run())
@@ -5,26 +5,80 @@ Runs strategies on historical data and computes performance metrics.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Union
 from strategy_interface import Strategy
+from policies import StopPolicy, SizingPolicy, get_stop_policy, get_sizing_policy
+from instrumentation import span
+from trades import TradeRecord, TradeRecordBuilder
+from simulation import SimulationResult, simulate
+from sessions import session_mask
+import kernels
+
+class BacktestCancelled(Exception):
+    """Raised from a progress callback to stop a running backtest."""
+
+
+def _policy_choice(policy, params: Optional[Dict[str, Any]], preferred, preferred_params: Optional[Dict[str, Any]]):
+    """
+    (policy, params) to build: explicit params win, and the strategy's params are only used with the strategy's policy.
+    """
+    if policy is None or policy == preferred:
+        return policy or preferred, params or preferred_params or {}
+    return policy, params or {}
+
 
 class Backtester:
-    def __init__(self, data: pd.DataFrame, strategy: Strategy, initial_cash: float = 100_000, fee: float = 0.0, risk_factor: float = 1.0, risk_reward: float = 3.0):
-        self.data = data.copy()
+    def __init__(self, data: pd.DataFrame, strategy: Strategy, initial_cash: float = 100_000, fee: float = 0.0, risk_factor: float = 1.0, risk_reward: float = 3.0,
+                 stop_policy: Union[str, StopPolicy, None] = None, sizing_policy: Union[str, SizingPolicy, None] = None,
+                 stop_params: Optional[Dict[str, Any]] = None, sizing_params: Optional[Dict[str, Any]] = None,
+                 engine: Optional[str] = None, session: Optional[str] = None):
+        """
+        :param engine: Simulation engine: 'auto' (compiled Numba kernel when installed), 'numba' or 'python'; see kernels.py
+        :param session: Keep only bars of this session filter ('regular', 'extended' or 'all'); default: the strategy's
+        """
+        self.session = session or getattr(strategy, 'session', None)
+        # Uses the cached session columns when data was loaded with sessions=True. Without a filter the
+        # frame is only shallow-copied: run() adds columns but never writes into the caller's arrays,
+        # so a read-only shared-memory frame (shared_data.attach_dataset) is not duplicated per job
+        self.data = data[session_mask(data, self.session)] if self.session not in (None, 'all') else data.copy(deep=False)
         self.strategy = strategy
         self.initial_cash = initial_cash
         self.fee = fee
         self.risk_factor = risk_factor
         self.risk_reward = risk_reward
+        # Explicit policies win over the strategy's preferred policies, which win over the defaults
+        stop_name, stop_args = _policy_choice(stop_policy, stop_params, getattr(strategy, 'stop_policy', None), getattr(strategy, 'stop_params', None))
+        sizing_name, sizing_args = _policy_choice(sizing_policy, sizing_params, getattr(strategy, 'sizing_policy', None), getattr(strategy, 'sizing_params', None))
+        self.stop_policy = get_stop_policy(stop_name, **stop_args)
+        self.sizing_policy = get_sizing_policy(sizing_name, **sizing_args)
+        self.engine = kernels.resolve_engine(engine)
         self.results = {}
 
-    def run(self) -> Dict[str, Any]:
+    def run(self, progress: Optional[Callable[[int, int], None]] = None, progress_every: int = 1000) -> Dict[str, Any]:
+        """
+        Run the backtest. If given, progress(bars_done, total_bars) is called every progress_every bars;
+        it may raise BacktestCancelled to abort the run.
+        """
         self.strategy.before_backtest(self.data)
-        signals = self.strategy.generate_signals(self.data)
+        with span('strategy.generate_signals', strategy=type(self.strategy).__name__, rows=len(self.data)):
+            signals = self.strategy.generate_signals(self.data)
         self.data = self.data.join(signals, how='left')
         self.data['signal'] = self.data['signal'].fillna(0)
         self.data['position'] = self.data['signal'].shift(1).fillna(0)
         self.data['returns'] = self.data['close'].pct_change().fillna(0)
+        # Policies precompute their per-bar inputs (ATR, volatility) once, before the loop
+        stop_policy = self.stop_policy
+        sizing_policy = self.sizing_policy
+        stop_policy.prepare(self.data)
+        sizing_policy.prepare(self.data)
+        if self._use_kernel():
+            with span('backtester.loop', bars=len(self.data), engine='numba') as loop_span:
+                result = simulate(self.data, self.data['signal'].to_numpy().astype(np.int8), stop_policy, sizing_policy, self.initial_cash,
+                                  self.fee, self.risk_factor, self.risk_reward, progress, progress_every, engine='numba')
+                loop_span.set(trades=len(result.trade_arrays['pnl']))
+            self.data['equity'] = result.equity[:, 0]
+            self.data['strategy_returns'] = result.strategy_returns[:, 0]
+            return self._finish(result.trades(0))
 
         # New: SL/TP and position sizing logic
         equity = self.initial_cash
@@ -35,123 +89,146 @@ class Backtester:
         trade_size = 0
         equity_curve = []
         strat_returns = []
-        trade_info = []
-        trade_log = []
-        entry_idx = None
-        for i, (idx, row) in enumerate(self.data.iterrows()):
-            signal = row['signal']
-            price = row['close']
-            # Exit logic
-            exit_reason = None
-            if position != 0:
-                # Check SL/TP
-                if position == 1:
-                    if price <= stop_loss:
-                        exit_reason = 'stop_loss'
-                    elif price >= take_profit:
-                        exit_reason = 'take_profit'
-                elif position == -1:
-                    if price >= stop_loss:
-                        exit_reason = 'stop_loss'
-                    elif price <= take_profit:
-                        exit_reason = 'take_profit'
-                # Exit on opposite signal
-                if signal == -position and exit_reason is None:
-                    exit_reason = 'signal'
-                if exit_reason:
-                    # Close trade
-                    pnl = (price - entry_price) * position * trade_size - self.fee
-                    equity += pnl
-                    trade_log.append({
-                        'entry': entry_idx,
-                        'exit': idx,
-                        'side': position,
-                        'entry_price': entry_price,
-                        'exit_price': price,
-                        'size': trade_size,
-                        'pnl': pnl,
-                        'exit_reason': exit_reason
-                    })
-                    position = 0
-                    entry_price = None
-                    stop_loss = None
-                    take_profit = None
-                    trade_size = 0
-                    trade_info.append({'exit': idx, 'exit_reason': exit_reason, 'pnl': pnl, 'equity': equity})
-                    entry_idx = None
-            # Entry logic
-            if position == 0 and signal != 0:
-                # Risk per trade: risk_factor% of equity
-                risk_per_trade = self.risk_factor / 100 * equity
-                # Set stop loss 1% away from entry (default, can be improved)
-                sl_pct = 0.01
-                if signal == 1:
-                    stop_loss = price * (1 - sl_pct)
-                    take_profit = price + (price - stop_loss) * self.risk_reward
+        trades = TradeRecordBuilder()
+        entry_pos = None
+        n_bars = len(self.data)
+        with span('backtester.loop', bars=n_bars) as loop_span:
+            for i, (idx, row) in enumerate(self.data.iterrows()):
+                if progress is not None and i % progress_every == 0:
+                    progress(i, n_bars)
+                signal = row['signal']
+                price = row['close']
+                # Exit logic
+                exit_reason = None
+                if position != 0:
+                    # Check SL/TP
+                    if position == 1:
+                        if price <= stop_loss:
+                            exit_reason = 'stop_loss'
+                        elif price >= take_profit:
+                            exit_reason = 'take_profit'
+                    elif position == -1:
+                        if price >= stop_loss:
+                            exit_reason = 'stop_loss'
+                        elif price <= take_profit:
+                            exit_reason = 'take_profit'
+                    # Exit on opposite signal
+                    if signal == -position and exit_reason is None:
+                        exit_reason = 'signal'
+                    if exit_reason:
+                        # Close trade
+                        pnl = (price - entry_price) * position * trade_size - self.fee
+                        equity += pnl
+                        trades.add(entry_pos, i, position, entry_price, price, trade_size, pnl, exit_reason)
+                        position = 0
+                        entry_price = None
+                        stop_loss = None
+                        take_profit = None
+                        trade_size = 0
+                        entry_pos = None
+                    else:
+                        # Trailing stops ratchet with the close; fixed stops are returned unchanged
+                        stop_loss = stop_policy.update_stop(i, price, position, stop_loss)
+                # Entry logic
+                if position == 0 and signal != 0:
+                    stop_loss = stop_policy.initial_stop(i, price, signal)
+                    if signal == 1:
+                        take_profit = price + (price - stop_loss) * self.risk_reward
+                    else:
+                        take_profit = price - (stop_loss - price) * self.risk_reward
+                    trade_size = sizing_policy.size(i, price, stop_loss, equity, self.risk_factor)
+                    entry_price = price
+                    position = signal
+                    entry_pos = i
+                # Mark-to-market
+                if position != 0 and entry_price is not None:
+                    mtm_pnl = (price - entry_price) * position * trade_size
+                    equity_curve.append(equity + mtm_pnl)
+                    strat_returns.append(mtm_pnl / (equity if equity else 1))
                 else:
-                    stop_loss = price * (1 + sl_pct)
-                    take_profit = price - (stop_loss - price) * self.risk_reward
-                # Position size = risk per trade / (entry - stop_loss)
-                risk_per_share = abs(price - stop_loss)
-                trade_size = risk_per_trade / risk_per_share if risk_per_share > 0 else 0
-                entry_price = price
-                position = signal
-                entry_idx = idx
-                trade_info.append({'entry': idx, 'entry_price': price, 'size': trade_size, 'stop_loss': stop_loss, 'take_profit': take_profit, 'equity': equity})
-            # Mark-to-market
-            if position != 0 and entry_price is not None:
-                mtm_pnl = (price - entry_price) * position * trade_size
-                equity_curve.append(equity + mtm_pnl)
-                strat_returns.append(mtm_pnl / (equity if equity else 1))
-            else:
-                equity_curve.append(equity)
-                strat_returns.append(0)
+                    equity_curve.append(equity)
+                    strat_returns.append(0)
+            loop_span.set(trades=len(trades.pnl))
+        if progress is not None:
+            progress(n_bars, n_bars)
         self.data['equity'] = equity_curve
         self.data['strategy_returns'] = strat_returns
-        self.trade_log = pd.DataFrame(trade_log)
-        trades = self._extract_trades()
-        metrics = self._compute_metrics(trades)
-        # Add average win/loss
-        if not self.trade_log.empty:
-            wins = self.trade_log[self.trade_log['pnl'] > 0]['pnl']
-            losses = self.trade_log[self.trade_log['pnl'] < 0]['pnl']
-            metrics['avg_win'] = wins.mean() if not wins.empty else 0
-            metrics['avg_loss'] = losses.mean() if not losses.empty else 0
-        else:
-            metrics['avg_win'] = 0
-            metrics['avg_loss'] = 0
-        metrics.update(self.strategy.custom_metrics(trades, self.data))
+        return self._finish(trades.build(self.data.index))
+
+    def _use_kernel(self) -> bool:
+        """
+        The compiled kernel runs the same state machine; it is used when selected, when both policies have a
+        compiled form and when the signals are exactly -1/0/1 (other values keep the loop's semantics).
+        """
+        if self.engine != 'numba' or kernels.policy_args(self.stop_policy, self.sizing_policy) is None:
+            return False
+        return bool(np.isin(self.data['signal'].to_numpy(), (-1, 0, 1)).all())
+
+    def _finish(self, trades: TradeRecord) -> Dict[str, Any]:
+        # The simulation's own trade record is the single source for metrics, charts and exports;
+        # trade_log is its DataFrame view
+        self.trades = trades
+        self.trade_log = self.trades.to_frame()
+        with span('backtester.metrics'):
+            metrics = self._compute_metrics()
+        metrics.update(self.strategy.custom_metrics(self.trade_log, self.data))
         self.strategy.after_backtest(metrics)
         self.results = metrics
         return metrics
 
+    def run_batch(self, param_sets: List[Dict[str, Any]], progress: Optional[Callable[[int, int], None]] = None,
+                  progress_every: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Backtest many parameter sets of the strategy's class on the same data and settings.
+        Signals come from Strategy.signal_matrix and all columns are simulated together; returns one
+        metrics dict per parameter set (the engine metrics of run(), without per-strategy hooks).
+        The full equity/returns matrices and trades are kept in self.batch.
+        """
+        strategy_cls = type(self.strategy)
+        with span('strategy.signal_matrix', strategy=strategy_cls.__name__, rows=len(self.data), combos=len(param_sets)):
+            signals = strategy_cls.signal_matrix(self.data, param_sets)
+        self.stop_policy.prepare(self.data)
+        self.sizing_policy.prepare(self.data)
+        with span('backtester.batch_loop', bars=len(self.data), combos=len(param_sets)) as loop_span:
+            self.batch: SimulationResult = simulate(self.data, signals, self.stop_policy, self.sizing_policy, self.initial_cash, self.fee,
+                                                    self.risk_factor, self.risk_reward, progress, progress_every, self.engine)
+            loop_span.set(trades=len(self.batch.trade_arrays['pnl']))
+        with span('backtester.batch_metrics'):
+            return self.batch.metrics()
+
     def _extract_trades(self) -> pd.DataFrame:
-        # Find trade entry/exit points
-        trades = []
-        pos = 0
-        entry_idx = None
-        for idx, row in self.data.iterrows():
-            if row['position'] != pos:
-                if pos != 0:
-                    # Exit trade
-                    trades.append({'entry': entry_idx, 'exit': idx, 'side': pos})
-                if row['position'] != 0:
-                    # Enter trade
-                    entry_idx = idx
-                pos = row['position']
-        return pd.DataFrame(trades)
+        """
+        Trades implied by changes of the signal-derived 'position' column (entry, exit, side).
+        Kept for compatibility; these can disagree with the SL/TP exits in self.trades.
+        """
+        pos = self.data['position'].to_numpy()
+        prev = np.concatenate(([0], pos[:-1]))
+        changes = np.flatnonzero(pos != prev)
+        # A trade runs from one change to the next whenever the state between them is not flat
+        held = pos[changes[:-1]] != 0
+        if not held.any():
+            return pd.DataFrame()
+        index = self.data.index
+        return pd.DataFrame({
+            'entry': index[changes[:-1][held]],
+            'exit': index[changes[1:][held]],
+            'side': pos[changes[:-1][held]],
+        })
 
-    def _compute_metrics(self, trades: pd.DataFrame) -> Dict[str, Any]:
+    def _compute_metrics(self) -> Dict[str, Any]:
         equity = self.data['equity']
         returns = self.data['strategy_returns']
-        # Use trade_log for number of trades if available
-        num_trades = len(self.trade_log) if hasattr(self, 'trade_log') and not self.trade_log.empty else len(trades)
+        pnl = self.trades.pnl
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl < 0]
         metrics = {
             'final_equity': equity.iloc[-1],
             'total_return': equity.iloc[-1] / self.initial_cash - 1,
             'max_drawdown': self._max_drawdown(equity),
             'sharpe': self._sharpe(returns),
-            'num_trades': num_trades,
+            'num_trades': len(self.trades),
+            'avg_win': wins.mean() if len(wins) else 0,
+            'avg_loss': losses.mean() if len(losses) else 0,
         }
         return metrics
 
@@ -0,0 +1,318 @@
+"""
+Batch backtesting: many symbols x strategies x parameter grids x date windows in one process.
+Jobs are grouped by cached dataset so each parquet file is decoded once, the groups are
+scheduled across a process pool, and all results are written to one columnar file.
+Within a dataset, the parameter grid of each strategy and window is backtested as one signal
+matrix (Strategy.signal_matrix + Backtester.run_batch) rather than one backtest per combination.
+
+Job spec (JSON, or YAML when PyYAML is installed):
+{
+    "symbols": ["AAPL", "MSFT"],
+    "provider": "massive",
+    "timeframe": "1d",
+    "date_ranges": ["2021-01-01_to_2026-01-12"],
+    "windows": [["2022-01-01", "2023-01-01"], [null, null]],
+    "strategies": {"sma_crossover": {"fast": [5, 10], "slow": [20, 50]}, "rsi_mean_reversion": {}},
+    "backtest": {"cash": 100000, "fee": 0.0, "risk_factor": 1.0, "risk_reward": 3.0, "session": "regular"},
+    "workers": 4,
+    "shared_memory": false,
+    "output": "batch_results.parquet"
+}
+With "shared_memory": true (or --shared_memory) each dataset is loaded once by the parent into
+shared memory (see shared_data.py) and its jobs are split across all workers, which attach zero-copy.
+"session" ('regular' or 'extended') restricts every backtest to those bars, using the session arrays
+cached next to each dataset (see sessions.py).
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester import Backtester
+from cache import DataCache
+from providers import PROVIDER_NAMES, cache_timeframe
+from sessions import SESSION_FILTERS
+from strategy_registry import create_strategy, list_strategies, resolve_params
+
+logger = logging.getLogger(__name__)
+# Workers are spawned, not forked: a serial run in this process may already have started the compiled
+# kernel's thread pool (kernels.py), which is not fork-safe
+POOL_CONTEXT = multiprocessing.get_context('spawn')
+
+BACKTEST_KEYS = ['cash', 'fee', 'risk_factor', 'risk_reward', 'stop_policy', 'stop_params', 'sizing_policy', 'sizing_params', 'engine', 'session']
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yml', '.yaml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML job specs require PyYAML (pip install pyyaml); use JSON otherwise.")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def parse_grid_value(text: str) -> List[Any]:
+    """
+    Parse a CLI grid value: 'a,b,c' for a list, or 'start:stop:step' for an inclusive range.
+    """
+    def number(v):
+        try:
+            return int(v)
+        except ValueError:
+            try:
+                return float(v)
+            except ValueError:
+                return v
+    if ':' in text:
+        parts = [number(p) for p in text.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        if all(isinstance(p, int) for p in (start, stop, step)):
+            return list(range(start, stop + 1, step))
+        return [round(v, 10) for v in np.arange(start, stop + step / 2, step).tolist()]
+    return [number(v) for v in text.split(',')]
+
+
+def expand_grid(grid: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Cartesian product of a {param: value or [values]} grid.
+    """
+    if not grid:
+        return [{}]
+    keys = list(grid.keys())
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def build_tasks(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    One task per cached dataset, each carrying every (window, strategy, params) combination for it.
+    """
+    provider = spec.get('provider', 'massive')
+    timeframe = spec.get('timeframe', '1d')
+    folder = cache_timeframe(provider, timeframe)
+    windows = spec.get('windows') or [[None, None]]
+    combos = []
+    for strategy, grid in (spec.get('strategies') or {}).items():
+        if strategy not in list_strategies():
+            raise ValueError(f"Unknown strategy: {strategy}")
+        for params in expand_grid(grid or {}):
+            combos.append((strategy, params))
+    jobs = [(tuple(w), s, p) for w in windows for s, p in combos]
+    backtest = {k: v for k, v in (spec.get('backtest') or {}).items() if k in BACKTEST_KEYS}
+    tasks = []
+    for symbol in spec.get('symbols') or []:
+        for date_range in spec.get('date_ranges') or [None]:
+            tasks.append({
+                'symbol': symbol, 'provider': provider, 'timeframe': folder, 'date_range': date_range,
+                'cache_dir': spec.get('cache_dir'), 'jobs': jobs, 'backtest': backtest,
+            })
+    return tasks
+
+
+def run_dataset_jobs(task: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Worker entry point: load one dataset once (or attach to it in shared memory) and run its jobs against it.
+    """
+    base = {'symbol': task['symbol'], 'provider': task['provider'], 'timeframe': task['timeframe'], 'date_range': task['date_range']}
+    if task.get('handle'):
+        from shared_data import attach_dataset
+        with attach_dataset(task['handle']) as data:
+            return _run_jobs(data, task, base)
+    data = DataCache(task['cache_dir']).load(task['symbol'], task['provider'], task['timeframe'], 'parquet', task['date_range'],
+                                             sessions=bool(task['backtest'].get('session')))
+    if data is None:
+        return [dict(base, error='no cached data')]
+    return _run_jobs(data, task, base)
+
+
+def _make_backtester(window: pd.DataFrame, strategy, bt: Dict[str, Any]) -> Backtester:
+    return Backtester(
+        window, strategy,
+        initial_cash=bt.get('cash', 100_000), fee=bt.get('fee', 0.0),
+        risk_factor=bt.get('risk_factor', 1.0), risk_reward=bt.get('risk_reward', 3.0),
+        stop_policy=bt.get('stop_policy'), sizing_policy=bt.get('sizing_policy'),
+        stop_params=bt.get('stop_params'), sizing_params=bt.get('sizing_params'), engine=bt.get('engine'), session=bt.get('session'),
+    )
+
+
+def _run_jobs(data: pd.DataFrame, task: Dict[str, Any], base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Run a dataset's jobs. All parameter sets of one strategy on one window form a single
+    signal matrix simulated column-wise (Backtester.run_batch); elapsed_s is the group time per job.
+    """
+    bt = task['backtest']
+    groups: Dict[Any, List[int]] = {}
+    for j, ((start, end), strategy, _) in enumerate(task['jobs']):
+        groups.setdefault(((start, end), strategy), []).append(j)
+    rows: List[Optional[Dict[str, Any]]] = [None] * len(task['jobs'])
+    for ((start, end), strategy), members in groups.items():
+        param_sets = [task['jobs'][j][2] for j in members]
+        for j, params in zip(members, param_sets):
+            row = dict(base, window_start=start, window_end=end, strategy=strategy, params=json.dumps(params, sort_keys=True))
+            row.update({f'param_{k}': v for k, v in params.items()})
+            rows[j] = row
+        window = data.loc[start:end] if (start or end) else data
+        if window.empty:
+            for j in members:
+                rows[j]['error'] = 'empty window'
+            continue
+        t0 = time.perf_counter()
+        try:
+            resolved = [resolve_params(strategy, params) for params in param_sets]
+            results = _make_backtester(window, create_strategy(strategy, param_sets[0]), bt).run_batch(resolved)
+        except Exception:
+            # Run the group job by job so each failing parameter set reports its own error
+            results = None
+        elapsed = (time.perf_counter() - t0) / len(members)
+        for n, (j, params) in enumerate(zip(members, param_sets)):
+            row = rows[j]
+            if results is not None:
+                row.update(results[n])
+                row['error'] = None
+                row['elapsed_s'] = elapsed
+                continue
+            t0 = time.perf_counter()
+            try:
+                metrics = _make_backtester(window, create_strategy(strategy, params), bt).run()
+                row.update({k: v for k, v in metrics.items() if np.isscalar(v)})
+                row['error'] = None
+            except Exception as e:
+                row['error'] = f"{type(e).__name__}: {e}"
+            row['elapsed_s'] = time.perf_counter() - t0
+    return rows
+
+
+def run_batch(spec: Dict[str, Any], workers: Optional[int] = None, shared: Optional[bool] = None) -> pd.DataFrame:
+    """
+    Run every job in spec and return one row per job.
+    """
+    tasks = build_tasks(spec)
+    workers = workers or spec.get('workers') or os.cpu_count() or 1
+    shared = spec.get('shared_memory', False) if shared is None else shared
+    if shared and workers > 1:
+        return _run_batch_shared(tasks, workers, spec.get('cache_dir'))
+    rows = []
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            rows.extend(run_dataset_jobs(task))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=POOL_CONTEXT) as pool:
+            futures = {pool.submit(run_dataset_jobs, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    rows.extend(future.result())
+                except Exception as e:
+                    rows.append({'symbol': task['symbol'], 'date_range': task['date_range'], 'error': f"{type(e).__name__}: {e}"})
+                logger.info("[BATCH] %s %s %s: %d jobs done", task['symbol'], task['timeframe'], task['date_range'], len(task['jobs']))
+    return _results_frame(rows)
+
+
+def _run_batch_shared(tasks: List[Dict[str, Any]], workers: int, cache_dir: Optional[str]) -> pd.DataFrame:
+    """
+    Publish each dataset once to shared memory and fan its jobs out over all workers.
+    A dataset is unlinked as soon as its last chunk finishes.
+    """
+    from shared_data import DatasetBroker
+    rows = []
+    with DatasetBroker(cache_dir) as broker, ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as pool:
+        futures = {}
+        for task in tasks:
+            handle = broker.acquire(task['symbol'], task['provider'], task['timeframe'], task['date_range'])
+            if handle is None:
+                rows.append({'symbol': task['symbol'], 'provider': task['provider'], 'timeframe': task['timeframe'],
+                             'date_range': task['date_range'], 'error': 'no cached data'})
+                continue
+            jobs = task['jobs']
+            chunk = max(1, -(-len(jobs) // workers))
+            for i in range(0, len(jobs), chunk):
+                broker.acquire(task['symbol'], task['provider'], task['timeframe'], task['date_range'])
+                futures[pool.submit(run_dataset_jobs, dict(task, jobs=jobs[i:i + chunk], handle=handle))] = (task, handle)
+            broker.release(handle)
+        for future in as_completed(futures):
+            task, handle = futures[future]
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                rows.append({'symbol': task['symbol'], 'date_range': task['date_range'], 'error': f"{type(e).__name__}: {e}"})
+            broker.release(handle)
+    return _results_frame(rows)
+
+
+def _results_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    # pandas infers a string column with NaN for the successful rows; keep None there
+    results = pd.DataFrame(rows)
+    errors = results['error'] if 'error' in results.columns else pd.Series(None, index=results.index)
+    results['error'] = errors.astype(object).where(errors.notna(), None)
+    return results
+
+
+def write_results(results: pd.DataFrame, path: str) -> None:
+    if path.endswith('.csv'):
+        results.to_csv(path, index=False)
+    elif path.endswith('.feather'):
+        results.to_feather(path)
+    else:
+        results.to_parquet(path, index=False)
+
+
+def spec_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    spec = load_spec(args.spec) if args.spec else {}
+    if args.symbols:
+        spec['symbols'] = [s.strip() for s in args.symbols.split(',')]
+    if args.provider:
+        spec['provider'] = args.provider
+    if args.timeframe:
+        spec['timeframe'] = args.timeframe
+    if args.date_ranges:
+        spec['date_ranges'] = [d.strip() for d in args.date_ranges.split(',')]
+    if args.strategies:
+        grid = {}
+        for item in args.grid or []:
+            key, _, value = item.partition('=')
+            grid[key.strip()] = parse_grid_value(value.strip())
+        spec['strategies'] = {s.strip(): grid for s in args.strategies.split(',')}
+    if args.session:
+        spec.setdefault('backtest', {})['session'] = args.session
+    if args.output:
+        spec['output'] = args.output
+    return spec
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='run_backtest.py batch', description="Run many backtests in one process.")
+    parser.add_argument('--spec', type=str, default=None, help='Job spec file (JSON or YAML)')
+    parser.add_argument('--symbols', type=str, default=None, help='Comma-separated symbols (overrides spec)')
+    parser.add_argument('--provider', choices=list(PROVIDER_NAMES), default=None, help='Data provider (overrides spec)')
+    parser.add_argument('--timeframe', type=str, default=None, help='Timeframe (e.g. 1d, 1min)')
+    parser.add_argument('--date_ranges', type=str, default=None, help='Comma-separated cache date range strings')
+    parser.add_argument('--strategies', type=str, default=None, help='Comma-separated strategy names (use with --grid)')
+    parser.add_argument('--grid', action='append', default=None, help="Param grid, e.g. fast=5,10 or slow=20:50:10 (inclusive); repeatable")
+    parser.add_argument('--session', choices=list(SESSION_FILTERS), default=None, help='Backtest only bars of this session (overrides spec)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: spec or CPU count)')
+    parser.add_argument('--shared_memory', action='store_true', help='Share each dataset across workers via shared memory')
+    parser.add_argument('--output', type=str, default=None, help='Results file (.parquet, .csv or .feather)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    spec = spec_from_args(args)
+    if not spec.get('symbols') or not spec.get('strategies'):
+        parser.error("a job spec or --symbols and --strategies are required")
+    t0 = time.perf_counter()
+    results = run_batch(spec, workers=args.workers, shared=True if args.shared_memory else None)
+    output = spec.get('output', 'batch_results.parquet')
+    write_results(results, output)
+    n_err = int(results['error'].notna().sum()) if 'error' in results.columns else 0
+    logger.info("[BATCH] %d results (%d errors) written to %s in %.1fs", len(results), n_err, output, time.perf_counter() - t0)
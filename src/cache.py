@@ -2,25 +2,179 @@
 Local caching utilities for market data.
 Supports parquet, csv, and feather formats.
 Provides a DataCache class to save and load DataFrames efficiently for each symbol/provider.
+
+Writes are atomic: the file is written to a temporary name in the same folder, fsynced and
+renamed over the final path, so readers never see a partial file. Each file gets a sidecar
+'<file>.sha256' with its digest, size and row count; load() rejects entries whose size (or,
+with verify=True, digest) does not match, or that fail to parse, and moves them aside as
+'<file>.corrupt' so the next fetch downloads them again. lock() is a per-key advisory file
+lock that lets concurrent fetchers of the same key wait for one download.
+
+Data files are indexed in exchange time (see sessions.py); save() also stores the per-bar session
+arrays in '<file>.sessions.npz', and load(..., sessions=True) attaches them as columns.
 """
+import hashlib
+import json
+import logging
 import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
 import pandas as pd
-from typing import Optional
+try:
+    import fcntl
+except ImportError:
+    # Windows: byte-range locks on the lock file instead of flock
+    fcntl = None
+    import msvcrt
+# Prefer the top-level module so callers that put src/ on sys.path share one set of counters
+try:
+    from instrumentation import span, count, is_enabled
+    from cache_scan import CacheScan
+    from sessions import DEFAULT_CALENDAR, SESSION_COLUMNS, SessionCalendar, attach_sessions, normalize
+except ImportError:
+    from .instrumentation import span, count, is_enabled
+    from .cache_scan import CacheScan
+    from .sessions import DEFAULT_CALENDAR, SESSION_COLUMNS, SessionCalendar, attach_sessions, normalize
 
 CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache')
-os.makedirs(CACHE_DIR, exist_ok=True)
+# Rows per parquet row group: small enough that scan() windows skip most of a long minute file
+PARQUET_ROW_GROUP_ROWS = 65_536
+# Compression per tier for parquet and feather: frequently re-read intraday data favours decode
+# speed (lz4), long daily history favours size (zstd at a high level). csv is written uncompressed.
+# Timeframes missing from TIMEFRAME_TIERS are 'hot'.
+CODEC_TIERS = {
+    'hot': {'compression': 'lz4', 'compression_level': None, 'use_dictionary': True},
+    'cold': {'compression': 'zstd', 'compression_level': 19, 'use_dictionary': True},
+}
+TIMEFRAME_TIERS = {'day': 'cold', '1d': 'cold', 'week': 'cold', '1wk': 'cold', 'month': 'cold', '1mo': 'cold'}
+CHECKSUM_SUFFIX = '.sha256'
+LOCK_SUFFIX = '.lock'
+CORRUPT_SUFFIX = '.corrupt'
+SESSIONS_SUFFIX = '.sessions.npz'
+
+logger = logging.getLogger(__name__)
+
+# Locks this process holds, per (lock path, thread), so save() inside a caller's lock() does not deadlock
+_held_locks: Dict[tuple, int] = {}
+_held_guard = threading.Lock()
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_dir(folder: str) -> None:
+    # Makes the rename itself durable; directories cannot be opened this way on Windows
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    Yield a temporary path next to path; on success it is fsynced and atomically renamed to path,
+    on error it is removed and path is left untouched.
+    """
+    folder = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        yield tmp
+        with open(tmp, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(folder)
+
+
+def _acquire_file_lock(f, timeout: Optional[float]) -> None:
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (fcntl.LOCK_NB if deadline is not None else 0))
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return
+        except (BlockingIOError, PermissionError, OSError):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"[DataCache] Timed out waiting for lock {f.name}")
+            time.sleep(0.05)
+
+
+def _open_locked(lock_path: str, timeout: Optional[float]):
+    """
+    Open lock_path and lock it. The lock only excludes others while the path still names the locked
+    file: if it was deleted (and maybe recreated) while we waited, lock whatever the path names now.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        f = open(lock_path, 'a+b')
+        try:
+            _acquire_file_lock(f, None if deadline is None else max(0.0, deadline - time.monotonic()))
+            try:
+                current = os.stat(lock_path).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                return f
+            _release_file_lock(f)
+        except BaseException:
+            f.close()
+            raise
+        f.close()
+
+
+def _release_file_lock(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 class DataCache:
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None, codecs: Optional[Dict[str, Dict[str, Any]]] = None,
+                 calendar: Optional[SessionCalendar] = None):
         """
         Initialize the DataCache with a cache directory.
         :param cache_dir: Optional custom cache directory path
+        :param codecs: Codec overrides keyed by timeframe or tier name, e.g. {'minute': {'compression': 'zstd', 'compression_level': 3}}
+        :param calendar: Session calendar for the session arrays (default: US equities)
         """
         self.cache_dir = cache_dir or CACHE_DIR
+        self.codecs = codecs or {}
+        self.calendar = calendar or DEFAULT_CALENDAR
         os.makedirs(self.cache_dir, exist_ok=True)
 
-    def _get_path(self, symbol: str, provider: str, timeframe: str = '1d', ext: str = 'parquet', date_range: Optional[str] = None) -> str:
+    def codec(self, timeframe: str) -> Dict[str, Any]:
+        """
+        Write options (compression, compression_level, use_dictionary) used for a timeframe.
+        """
+        tier = TIMEFRAME_TIERS.get(timeframe, 'hot')
+        codec = dict(CODEC_TIERS[tier])
+        codec.update(self.codecs.get(tier, {}))
+        codec.update(self.codecs.get(timeframe, {}))
+        return codec
+
+    def _get_path(self, symbol: str, provider: str, timeframe: str = '1d', ext: str = 'parquet', date_range: Optional[str] = None, create: bool = True) -> str:
         """
         Build the cache file path for a given symbol, provider, timeframe, and file extension.
         :param symbol: Stock ticker symbol
@@ -28,6 +182,7 @@ class DataCache:
         :param timeframe: Data timeframe (e.g., '1d', '1min')
         :param ext: File extension (parquet, csv, feather)
         :param date_range: Optional date range string (e.g., '2019-2026')
+        :param create: Create the containing folder (writers); readers pass False to stay side-effect free
         :return: Full path to the cache file
         """
         # Guard: For massive, only allow mapped timeframes
@@ -36,7 +191,8 @@ class DataCache:
             if timeframe not in allowed:
                 raise ValueError(f"[DataCache] Invalid timeframe '{timeframe}' for provider 'massive'. Only {allowed} are allowed. Please use the correct mapping.")
         folder = os.path.join(self.cache_dir, provider, symbol, timeframe)
-        os.makedirs(folder, exist_ok=True)
+        if create:
+            os.makedirs(folder, exist_ok=True)
         fname = f"{date_range}.{ext}" if date_range else f"data.{ext}"
         return os.path.join(folder, fname)
 
@@ -51,28 +207,255 @@ class DataCache:
         :param date_range: Optional date range string
         """
         path = self._get_path(symbol, provider, timeframe, fmt, date_range)
+        with self.lock(symbol, provider, timeframe, fmt, date_range), \
+                span('cache.save', symbol=symbol, provider=provider, timeframe=timeframe, fmt=fmt) as sp:
+            with atomic_path(path) as tmp:
+                self._write(df, tmp, fmt, self.codec(timeframe))
+                meta = {'sha256': file_sha256(tmp), 'bytes': os.path.getsize(tmp), 'rows': len(df)}
+                # The old checksum must never describe the new file, even if we crash before writing the new one
+                for sidecar in (path + CHECKSUM_SUFFIX, path + SESSIONS_SUFFIX):
+                    if os.path.exists(sidecar):
+                        os.remove(sidecar)
+            with atomic_path(path + CHECKSUM_SUFFIX) as tmp:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+            if isinstance(df.index, pd.DatetimeIndex):
+                self._write_sessions(path, self.calendar.arrays(df.index), meta['sha256'])
+            if is_enabled():
+                self._record(sp, 'written', len(df), path)
+
+    def _write(self, df: pd.DataFrame, path: str, fmt: str, codec: Optional[Dict[str, Any]] = None) -> None:
+        codec = codec or {}
+        compression = codec.get('compression')
+        level = codec.get('compression_level')
         if fmt == 'parquet':
-            df.to_parquet(path)
+            df.to_parquet(path, row_group_size=PARQUET_ROW_GROUP_ROWS, compression=compression or 'snappy',
+                          compression_level=level, use_dictionary=codec.get('use_dictionary', True))
         elif fmt == 'csv':
             df.to_csv(path)
         elif fmt == 'feather':
-            df.reset_index().to_feather(path)
+            df.reset_index().to_feather(path, compression=compression, compression_level=level)
         else:
             raise ValueError(f"Unsupported format: {fmt}")
 
-    def load(self, symbol: str, provider: str, timeframe: str = '1d', fmt: str = 'parquet', date_range: Optional[str] = None) -> Optional[pd.DataFrame]:
+    def load(self, symbol: str, provider: str, timeframe: str = '1d', fmt: str = 'parquet', date_range: Optional[str] = None,
+             verify: bool = False, sessions: bool = False) -> Optional[pd.DataFrame]:
         """
-        Load a DataFrame from the cache if it exists.
+        Load a DataFrame from the cache if it exists and is intact.
         :param symbol: Stock ticker symbol
         :param provider: Data provider name
         :param timeframe: Data timeframe (e.g., '1d', '1min')
         :param fmt: File format (parquet, csv, feather)
         :param date_range: Optional date range string
-        :return: DataFrame if found, else None
+        :param verify: Also compare the file's SHA-256 with its stored checksum (the size is always compared)
+        :param sessions: Add the cached session arrays as 'session', 'regular' and 'extended' columns
+        :return: DataFrame if found, else None (corrupt entries are moved aside and reported as misses)
         """
-        path = self._get_path(symbol, provider, timeframe, fmt, date_range)
+        path = self._get_path(symbol, provider, timeframe, fmt, date_range, create=False)
+        window = None
         if not os.path.exists(path):
+            # After compaction a range may live inside a wider merged file
+            window = self._window(date_range)
+            path = self.scan(symbol, timeframe, provider, fmt).between(*window).covering() if window else None
+            if path is None:
+                count('cache.misses')
+                return None
+        with span('cache.load', symbol=symbol, provider=provider, timeframe=timeframe, fmt=fmt) as sp:
+            df, problem = self._read_checked(path, fmt, verify)
+            if problem:
+                # save() replaces the file before its checksum, so without the lock a concurrent save can pair
+                # the new file with the old checksum; only a problem that persists under the lock is corruption
+                with self._file_lock(path + LOCK_SUFFIX):
+                    df, problem = self._read_checked(path, fmt, verify)
+                    if problem:
+                        self._quarantine(path, problem)
+                        return None
+            # Files cached before index normalization hold naive UTC timestamps
+            if isinstance(df.index, pd.DatetimeIndex) or df.index.name == 'datetime':
+                df = normalize(df)
+            if sessions:
+                attach_sessions(df, self.sessions(path, df))
+            if window:
+                df = df.sort_index().loc[window[0]:window[1]]
+            self._touch(path)
+            if is_enabled():
+                count('cache.hits')
+                self._record(sp, 'read', len(df), path)
+        return df
+
+    def _read_checked(self, path: str, fmt: str, verify: bool) -> tuple:
+        """
+        (df, None) for an intact file, (None, problem) when it fails its checksum record or does not parse.
+        """
+        problem = self._check(path, verify)
+        if problem:
+            return None, problem
+        try:
+            return self._read(path, fmt), None
+        except Exception as e:
+            return None, f"unreadable ({type(e).__name__}: {e})"
+
+    @staticmethod
+    def _window(date_range: Optional[str]) -> Optional[tuple]:
+        parts = date_range.split('_to_') if date_range else []
+        if len(parts) != 2:
+            return None
+        try:
+            pd.Timestamp(parts[0]), pd.Timestamp(parts[1])
+        except ValueError:
             return None
+        return parts[0], parts[1]
+
+    def _touch(self, path: str) -> None:
+        """
+        Record a read in the file's access time (kept separate from the write time in mtime), which the
+        cache manager uses for LRU eviction; set explicitly because noatime/relatime mounts do not.
+        """
+        try:
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except OSError:
+            pass
+
+    def sessions(self, path: str, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Session arrays of the cache file at path (whose contents are df), from its '.sessions.npz' sidecar.
+        A missing or stale sidecar (written for other file contents) is recomputed and stored.
+        """
+        source = self._source_stamp(path)
+        try:
+            with np.load(path + SESSIONS_SUFFIX) as stored:
+                if str(stored['source']) == source and len(stored['session']) == len(df):
+                    count('cache.sessions_hits')
+                    return {name: stored[name] for name in SESSION_COLUMNS}
+        except (OSError, ValueError, KeyError):
+            pass
+        count('cache.sessions_computed')
+        arrays = self.calendar.arrays(df.index)
+        try:
+            self._write_sessions(path, arrays, source)
+        except OSError as e:
+            logger.warning("[DataCache] Could not store session arrays for %s: %s", path, e)
+        return arrays
+
+    def _source_stamp(self, path: str) -> str:
+        # Ties a sessions sidecar to one version of the data file
+        meta = self.checksum(path)
+        if meta and meta.get('sha256'):
+            return meta['sha256']
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _write_sessions(self, path: str, arrays: Dict[str, np.ndarray], source: str) -> None:
+        with atomic_path(path + SESSIONS_SUFFIX) as tmp:
+            with open(tmp, 'wb') as f:
+                np.savez(f, source=np.array(source), **arrays)
+
+    def verify(self, symbol: str, provider: str, timeframe: str = '1d', fmt: str = 'parquet', date_range: Optional[str] = None) -> Optional[bool]:
+        """
+        Check a cached file against its stored checksum without loading it.
+        :return: True if intact, False if corrupt, None if missing or written without a checksum
+        """
+        path = self._get_path(symbol, provider, timeframe, fmt, date_range, create=False)
+        if not os.path.exists(path) or self.checksum(path) is None:
+            return None
+        return self._check(path, True) is None
+
+    def checksum(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored checksum record ({'sha256', 'bytes', 'rows'}) of a cache file, None for files written before checksums.
+        """
+        try:
+            with open(path + CHECKSUM_SUFFIX, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _check(self, path: str, full: bool) -> Optional[str]:
+        meta = self.checksum(path)
+        if meta is None:
+            return None
+        size = os.path.getsize(path)
+        if size != meta.get('bytes'):
+            return f"size {size} != {meta.get('bytes')} bytes"
+        if full and file_sha256(path) != meta.get('sha256'):
+            return "checksum mismatch"
+        return None
+
+    def _quarantine(self, path: str, problem: str) -> None:
+        """
+        Move a corrupt file aside (kept for inspection) so the key reads as missing and is fetched again.
+        """
+        logger.warning("[DataCache] Corrupt cache entry %s: %s; moved to %s", path, problem, path + CORRUPT_SUFFIX)
+        count('cache.corrupt')
+        count('cache.misses')
+        try:
+            os.replace(path, path + CORRUPT_SUFFIX)
+            for sidecar in (path + CHECKSUM_SUFFIX, path + SESSIONS_SUFFIX):
+                if os.path.exists(sidecar):
+                    os.remove(sidecar)
+        except OSError:
+            pass
+
+    @contextmanager
+    def lock(self, symbol: str, provider: str, timeframe: str = '1d', fmt: str = 'parquet', date_range: Optional[str] = None,
+             timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Exclusive advisory lock on one cache key, shared by every process using this cache directory.
+        Fetchers hold it around check-download-save so a second fetcher of the same key waits and then
+        finds the file cached. Re-entrant within a thread (save() takes it too).
+        :param timeout: Seconds to wait before TimeoutError; None waits indefinitely
+        """
+        with self._file_lock(self._get_path(symbol, provider, timeframe, fmt, date_range) + LOCK_SUFFIX, timeout):
+            yield
+
+    @contextmanager
+    def _file_lock(self, lock_path: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        lock() by lock file path, for callers that hold a cache file path rather than its key.
+        """
+        key = (lock_path, threading.get_ident())
+        with _held_guard:
+            if _held_locks.get(key):
+                _held_locks[key] += 1
+                reentered = True
+            else:
+                reentered = False
+        if reentered:
+            try:
+                yield
+            finally:
+                with _held_guard:
+                    _held_locks[key] -= 1
+            return
+        with span('cache.lock_wait', key=os.path.basename(lock_path)):
+            f = _open_locked(lock_path, timeout)
+        with f:
+            with _held_guard:
+                _held_locks[key] = 1
+            try:
+                yield
+            finally:
+                with _held_guard:
+                    del _held_locks[key]
+                _release_file_lock(f)
+
+    def scan(self, symbol: str, timeframe: str = '1d', provider: Optional[str] = None, fmt: str = 'parquet', date_range: Optional[str] = None) -> CacheScan:
+        """
+        Lazy query over the cached files of a symbol/timeframe, e.g.
+        cache.scan('AAPL', 'minute').between(t0, t1).columns(['close', 'high', 'low']).to_pandas()
+        :param provider: Provider folder to read; None searches every provider
+        :param date_range: Read only this cached range (otherwise files are chosen from the window)
+        :return: CacheScan plan; nothing is read until to_arrow()/to_numpy()/to_pandas()
+        """
+        return CacheScan(self, symbol, timeframe, provider, fmt, date_range)
+
+    def _record(self, sp, direction: str, rows: int, path: str) -> None:
+        nbytes = os.path.getsize(path)
+        sp.set(rows=rows, bytes=nbytes)
+        count(f'cache.rows_{direction}', rows)
+        count(f'cache.bytes_{direction}', nbytes)
+
+    def _read(self, path: str, fmt: str) -> pd.DataFrame:
         if fmt == 'parquet':
             return pd.read_parquet(path)
         elif fmt == 'csv':
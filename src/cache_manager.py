@@ -0,0 +1,444 @@
+"""
+Cache retention: size/age budgets, LRU eviction and compaction of overlapping range files.
+
+Budgets are RetentionPolicy objects keyed by (provider, timeframe), either of which may be '*'.
+A file is governed by the most specific matching policy. Within a policy's scope:
+- files not read for more than max_age_days are evicted
+- if the scope still holds more than max_bytes, the least recently read files go next
+Reads are tracked in each file's access time (DataCache._touch) and writes in its modification time.
+Quarantined '.corrupt' files, orphaned sidecars and temp files left by crashed writes are always reclaimed.
+Lock files are only deleted once their data file is gone, and then only while held (DataCache._file_lock
+re-checks the path after locking, so a fetcher waiting on a deleted lock file locks the new one instead).
+
+Compaction merges files of one provider/symbol/timeframe whose '<start>_to_<end>' ranges overlap
+into a single deduplicated file spanning them all. DataCache.load still serves the old ranges
+from the merged file.
+
+Every operation returns a plan of CacheAction objects and only touches the disk when dry_run is False.
+
+benchmark_codecs() rewrites cached datasets in each format/codec combination (in a scratch
+directory) and reports write time, load time and size, to pick CODEC_TIERS for the real access pattern.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    from cache import CHECKSUM_SUFFIX, CORRUPT_SUFFIX, LOCK_SUFFIX, SESSIONS_SUFFIX, TIMEFRAME_TIERS, DataCache
+    from cache_scan import name_range
+    from sessions import normalize
+except ImportError:
+    from .cache import CHECKSUM_SUFFIX, CORRUPT_SUFFIX, LOCK_SUFFIX, SESSIONS_SUFFIX, TIMEFRAME_TIERS, DataCache
+    from .cache_scan import name_range
+    from .sessions import normalize
+
+logger = logging.getLogger(__name__)
+
+DATA_FORMATS = ('parquet', 'csv', 'feather')
+# Temp files younger than this may belong to a write in progress
+STALE_TEMP_SECONDS = 3600
+DAY_SECONDS = 86_400
+# Combinations benchmark_codecs() compares by default: 'format:compression[:level][:nodict]'
+BENCHMARK_CODECS = [
+    'parquet:none', 'parquet:snappy', 'parquet:lz4', 'parquet:lz4:nodict', 'parquet:zstd:1', 'parquet:zstd:9',
+    'parquet:zstd:19', 'parquet:zstd:9:nodict', 'feather:uncompressed', 'feather:lz4', 'feather:zstd:1',
+    'feather:zstd:9', 'csv',
+]
+
+
+class RetentionPolicy:
+    """
+    Budget for one (provider, timeframe) scope; None disables a limit.
+    :param max_bytes: Total size allowed in the scope
+    :param max_age_days: Days since a file was last read (or written, if never read) before it is evicted
+    """
+    def __init__(self, max_bytes: Optional[int] = None, max_age_days: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+
+    def __repr__(self):
+        return f"RetentionPolicy(max_bytes={self.max_bytes}, max_age_days={self.max_age_days})"
+
+
+class CacheFile:
+    """
+    One data file in the cache with its sidecar files and timestamps. Its lock file is not a sidecar:
+    it outlives the data file (see _remove_lock).
+    """
+    def __init__(self, path: str, provider: str, symbol: str, timeframe: str, fmt: str):
+        self.path = path
+        self.provider = provider
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.fmt = fmt
+        stat = os.stat(path)
+        self.sidecars = [p for p in (path + CHECKSUM_SUFFIX, path + SESSIONS_SUFFIX) if os.path.exists(p)]
+        self.bytes = stat.st_size + sum(os.path.getsize(p) for p in self.sidecars)
+        self.written = stat.st_mtime
+        self.last_access = max(stat.st_atime, stat.st_mtime)
+        self.start, self.end = name_range(path)
+
+    @property
+    def date_range(self) -> Optional[str]:
+        name = os.path.splitext(os.path.basename(self.path))[0]
+        return None if name == 'data' else name
+
+    def __repr__(self):
+        return f"CacheFile({self.path!r}, bytes={self.bytes})"
+
+
+class CacheAction:
+    """
+    One planned change: 'evict' or 'reclaim' (delete paths), or 'compact' (merge sources into target).
+    """
+    def __init__(self, kind: str, paths: List[str], nbytes: int, reason: str, target: Optional[str] = None):
+        self.kind = kind
+        self.paths = paths
+        self.bytes = nbytes
+        self.reason = reason
+        self.target = target
+
+    def __repr__(self):
+        return f"CacheAction({self.kind!r}, {len(self.paths)} files, bytes={self.bytes}, reason={self.reason!r})"
+
+
+class CacheManager:
+    def __init__(self, cache: Optional[DataCache] = None, policies: Optional[Dict[Tuple[str, str], RetentionPolicy]] = None):
+        """
+        :param cache: DataCache to manage (default: the project cache)
+        :param policies: {(provider, timeframe): RetentionPolicy}; '*' matches any provider or timeframe
+        """
+        self.cache = cache or DataCache()
+        self.policies = policies or {}
+
+    def files(self) -> List[CacheFile]:
+        """
+        Every data file in the cache (sidecars, locks and quarantined files excluded).
+        """
+        out = []
+        for folder, provider, symbol, timeframe in self._folders():
+            for name in sorted(os.listdir(folder)):
+                fmt = os.path.splitext(name)[1].lstrip('.')
+                if fmt in DATA_FORMATS and not name.startswith('.'):
+                    out.append(CacheFile(os.path.join(folder, name), provider, symbol, timeframe, fmt))
+        return out
+
+    def _folders(self) -> Iterable[Tuple[str, str, str, str]]:
+        root = self.cache.cache_dir
+        for provider in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+            for symbol in _subdirs(os.path.join(root, provider)):
+                for timeframe in _subdirs(os.path.join(root, provider, symbol)):
+                    yield os.path.join(root, provider, symbol, timeframe), provider, symbol, timeframe
+
+    def usage(self) -> pd.DataFrame:
+        """
+        Bytes and file counts per provider/timeframe.
+        """
+        rows = [{'provider': f.provider, 'timeframe': f.timeframe, 'symbol': f.symbol, 'bytes': f.bytes} for f in self.files()]
+        if not rows:
+            return pd.DataFrame(columns=['provider', 'timeframe', 'files', 'symbols', 'bytes'])
+        df = pd.DataFrame(rows)
+        return df.groupby(['provider', 'timeframe']).agg(files=('bytes', 'size'), symbols=('symbol', 'nunique'),
+                                                         bytes=('bytes', 'sum')).reset_index()
+
+    def policy_for(self, provider: str, timeframe: str) -> Tuple[Optional[Tuple[str, str]], Optional[RetentionPolicy]]:
+        """
+        The most specific policy (and its key) governing a provider/timeframe, or (None, None).
+        """
+        for key in ((provider, timeframe), (provider, '*'), ('*', timeframe), ('*', '*')):
+            if key in self.policies:
+                return key, self.policies[key]
+        return None, None
+
+    def plan_eviction(self, now: Optional[float] = None) -> List[CacheAction]:
+        """
+        Files to delete under the policies, oldest access first within each scope, plus leftovers to reclaim.
+        """
+        now = time.time() if now is None else now
+        actions = self._plan_reclaim(now)
+        scopes: Dict[Tuple[str, str], List[CacheFile]] = {}
+        for f in self.files():
+            key, _ = self.policy_for(f.provider, f.timeframe)
+            if key is not None:
+                scopes.setdefault(key, []).append(f)
+        for key, files in scopes.items():
+            policy = self.policies[key]
+            kept = sorted(files, key=lambda f: f.last_access)
+            if policy.max_age_days is not None:
+                cutoff = now - policy.max_age_days * DAY_SECONDS
+                for f in [f for f in kept if f.last_access < cutoff]:
+                    idle = (now - f.last_access) / DAY_SECONDS
+                    actions.append(self._evict(f, f"not read for {idle:.0f} days (max {policy.max_age_days:g}) [{'/'.join(key)}]"))
+                kept = [f for f in kept if f.last_access >= cutoff]
+            if policy.max_bytes is not None:
+                total = sum(f.bytes for f in kept)
+                for f in kept:
+                    if total <= policy.max_bytes:
+                        break
+                    actions.append(self._evict(f, f"over budget {format_bytes(total)} > {format_bytes(policy.max_bytes)} [{'/'.join(key)}], least recently read"))
+                    total -= f.bytes
+        return actions
+
+    def _evict(self, f: CacheFile, reason: str) -> CacheAction:
+        return CacheAction('evict', [f.path] + f.sidecars, f.bytes, reason)
+
+    def _plan_reclaim(self, now: float) -> List[CacheAction]:
+        actions = []
+        for folder, _, _, _ in self._folders():
+            names = set(os.listdir(folder))
+            for name in sorted(names):
+                path = os.path.join(folder, name)
+                if name.endswith(CORRUPT_SUFFIX):
+                    reason = 'quarantined corrupt file'
+                elif name.startswith('.') and name.endswith('.tmp'):
+                    if now - os.path.getmtime(path) < STALE_TEMP_SECONDS:
+                        continue
+                    reason = 'temp file from an interrupted write'
+                elif name.endswith(CHECKSUM_SUFFIX) and name[:-len(CHECKSUM_SUFFIX)] not in names:
+                    reason = 'checksum without data file'
+                elif name.endswith(LOCK_SUFFIX) and name[:-len(LOCK_SUFFIX)] not in names:
+                    if not self._lock_free(path):
+                        continue
+                    reason = 'lock without data file'
+                elif name.endswith(SESSIONS_SUFFIX) and name[:-len(SESSIONS_SUFFIX)] not in names:
+                    reason = 'session arrays without data file'
+                else:
+                    continue
+                actions.append(CacheAction('reclaim', [path], os.path.getsize(path), reason))
+        return actions
+
+    def plan_compaction(self) -> List[CacheAction]:
+        """
+        Groups of two or more files (same provider/symbol/timeframe/format) whose name ranges overlap,
+        each to be merged into one '<first start>_to_<last end>' file. Bytes estimate the space reclaimed:
+        the sources minus the largest of them, since the merged file holds at least its rows.
+        """
+        groups: Dict[tuple, List[CacheFile]] = {}
+        for f in self.files():
+            if f.start is not None:
+                groups.setdefault((f.provider, f.symbol, f.timeframe, f.fmt), []).append(f)
+        actions = []
+        for files in groups.values():
+            for cluster in _overlapping_clusters(files):
+                if len(cluster) < 2:
+                    continue
+                date_range = f"{min(f.start for f in cluster):%Y-%m-%d}_to_{max(f.end for f in cluster):%Y-%m-%d}"
+                target = os.path.join(os.path.dirname(cluster[0].path), f"{date_range}.{cluster[0].fmt}")
+                paths = [f.path for f in cluster]
+                estimate = sum(f.bytes for f in cluster) - max(f.bytes for f in cluster)
+                actions.append(CacheAction('compact', paths, estimate,
+                                           f"{len(cluster)} overlapping ranges", target=target))
+        return actions
+
+    def plan_clear(self, provider: str, symbols: Optional[List[str]] = None, timeframes: Optional[List[str]] = None) -> List[CacheAction]:
+        """
+        Every file of a provider, optionally limited to some symbols and timeframes (None = all).
+        """
+        actions = []
+        for f in self.files():
+            if f.provider == provider and (symbols is None or f.symbol in symbols) and (timeframes is None or f.timeframe in timeframes):
+                actions.append(CacheAction('evict', [f.path] + f.sidecars, f.bytes, 'cleared'))
+        return actions
+
+    def clear(self, provider: str, symbols: Optional[List[str]] = None, timeframes: Optional[List[str]] = None,
+              dry_run: bool = True) -> List[CacheAction]:
+        """
+        Apply plan_clear() unless dry_run; returns the plan.
+        """
+        return self._apply(self.plan_clear(provider, symbols, timeframes), dry_run)
+
+    def evict(self, dry_run: bool = True, now: Optional[float] = None) -> List[CacheAction]:
+        """
+        Apply plan_eviction() unless dry_run; returns the plan.
+        """
+        return self._apply(self.plan_eviction(now), dry_run)
+
+    def _apply(self, actions: List[CacheAction], dry_run: bool) -> List[CacheAction]:
+        if not dry_run:
+            for action in actions:
+                if action.kind == 'reclaim' and action.paths[0].endswith(LOCK_SUFFIX):
+                    if not self._remove_lock(action.paths[0]):
+                        action.bytes = 0
+                        continue
+                else:
+                    self._remove(action.paths)
+                logger.info("[CacheManager] Removed %s (%s): %s", action.paths[0], format_bytes(action.bytes), action.reason)
+        return actions
+
+    def _lock_free(self, lock_path: str) -> bool:
+        try:
+            with self.cache._file_lock(lock_path, timeout=0):
+                return True
+        except TimeoutError:
+            return False
+
+    def _remove_lock(self, lock_path: str) -> bool:
+        """
+        Delete an orphaned lock file unless someone holds it or its data file has been written since the plan.
+        Removed while we hold it, so no fetcher is inside it; one waiting on it re-locks the path (_file_lock).
+        """
+        try:
+            with self.cache._file_lock(lock_path, timeout=0):
+                if os.path.exists(lock_path[:-len(LOCK_SUFFIX)]):
+                    logger.info("[CacheManager] Kept %s: its data file exists", lock_path)
+                    return False
+                self._remove([lock_path])
+            return True
+        except TimeoutError:
+            logger.info("[CacheManager] Kept %s: lock is held", lock_path)
+            return False
+
+    def compact(self, dry_run: bool = True) -> List[CacheAction]:
+        """
+        Apply plan_compaction() unless dry_run; returns the plan with bytes set to the space actually
+        reclaimed (sources minus the merged file) once applied, or the plan's estimate on a dry run.
+        """
+        actions = self.plan_compaction()
+        if not dry_run:
+            for action in actions:
+                self._merge(action)
+        return actions
+
+    def _merge(self, action: CacheAction) -> None:
+        sources = [CacheFile(p, *_key_of(p, self.cache.cache_dir)) for p in action.paths]
+        provider, symbol, timeframe, fmt = sources[0].provider, sources[0].symbol, sources[0].timeframe, sources[0].fmt
+        # Later downloads win where ranges overlap
+        sources.sort(key=lambda f: f.written)
+        source_bytes = sum(f.bytes for f in sources)
+        # Normalized so files written before and after index normalization concatenate
+        frames = [normalize(self.cache._read(f.path, fmt)) for f in sources]
+        if any(list(df.columns) != list(frames[0].columns) for df in frames[1:]):
+            logger.warning("[CacheManager] Not compacting %s: files have different columns", action.paths)
+            action.bytes = 0
+            return
+        merged = pd.concat(frames)
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        date_range = os.path.splitext(os.path.basename(action.target))[0]
+        self.cache.save(merged, symbol, provider, timeframe, fmt, date_range)
+        target_bytes = CacheFile(action.target, provider, symbol, timeframe, fmt).bytes
+        for f in sources:
+            if f.path == action.target:
+                continue
+            with self.cache.lock(symbol, provider, timeframe, fmt, f.date_range):
+                self._remove([f.path, f.path + CHECKSUM_SUFFIX, f.path + SESSIONS_SUFFIX])
+        action.bytes = source_bytes - target_bytes
+        logger.info("[CacheManager] Compacted %d files into %s (%s rows)", len(sources), action.target, len(merged))
+
+    def benchmark_codecs(self, codecs: Optional[List[str]] = None, repeat: int = 3, provider: Optional[str] = None,
+                         timeframe: Optional[str] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Write and load each cached dataset in every codec combination; best of repeat runs.
+        :param codecs: 'format:compression[:level][:nodict]' strings (default BENCHMARK_CODECS)
+        :param provider: Only datasets of this provider
+        :param timeframe: Only datasets of this timeframe
+        :param limit: At most this many datasets (largest first)
+        :return: One row per dataset and combination: rows, bytes, write_s, read_s, and current (the codec save() uses)
+        """
+        files = [f for f in self.files() if (provider is None or f.provider == provider) and (timeframe is None or f.timeframe == timeframe)]
+        files = sorted(files, key=lambda f: f.bytes, reverse=True)[:limit]
+        specs = [parse_codec(spec) for spec in codecs or BENCHMARK_CODECS]
+        scratch = tempfile.mkdtemp(prefix='codec_bench_')
+        rows = []
+        try:
+            for f in files:
+                df = self.cache._read(f.path, f.fmt)
+                current = self.cache.codec(f.timeframe)
+                for spec, fmt, codec in specs:
+                    path = os.path.join(scratch, f"bench.{fmt}")
+                    write_s = read_s = float('inf')
+                    for _ in range(repeat):
+                        t0 = time.perf_counter()
+                        self.cache._write(df, path, fmt, codec)
+                        write_s = min(write_s, time.perf_counter() - t0)
+                        t0 = time.perf_counter()
+                        self.cache._read(path, fmt)
+                        read_s = min(read_s, time.perf_counter() - t0)
+                    rows.append({
+                        'dataset': os.path.relpath(f.path, self.cache.cache_dir), 'timeframe': f.timeframe,
+                        'tier': TIMEFRAME_TIERS.get(f.timeframe, 'hot'), 'rows': len(df), 'codec': spec,
+                        'bytes': os.path.getsize(path), 'write_s': write_s, 'read_s': read_s,
+                        'current': fmt == 'parquet' and codec == {k: current.get(k) for k in codec},
+                    })
+                    os.remove(path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        return pd.DataFrame(rows, columns=['dataset', 'timeframe', 'tier', 'rows', 'codec', 'bytes', 'write_s', 'read_s', 'current'])
+
+    @staticmethod
+    def _remove(paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _subdirs(path: str) -> List[str]:
+    return sorted(d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))) if os.path.isdir(path) else []
+
+
+def _key_of(path: str, root: str) -> Tuple[str, str, str, str]:
+    provider, symbol, timeframe, _ = os.path.relpath(path, root).split(os.sep)
+    return provider, symbol, timeframe, os.path.splitext(path)[1].lstrip('.')
+
+
+def _overlapping_clusters(files: List[CacheFile]) -> List[List[CacheFile]]:
+    # Sweep by start date; a file joins the current cluster when it starts on or before the cluster's last day
+    clusters: List[List[CacheFile]] = []
+    end = None
+    for f in sorted(files, key=lambda f: (f.start, f.end)):
+        if clusters and f.start <= end:
+            clusters[-1].append(f)
+            end = max(end, f.end)
+        else:
+            clusters.append([f])
+            end = f.end
+    return clusters
+
+
+def format_bytes(n: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def parse_codec(spec: str) -> Tuple[str, str, Dict[str, object]]:
+    """
+    'parquet:zstd:9', 'parquet:lz4:nodict', 'feather:lz4', 'csv' -> (spec, format, DataCache._write codec).
+    """
+    parts = spec.split(':')
+    fmt, codec = parts[0], {}
+    if fmt not in DATA_FORMATS:
+        raise ValueError(f"Unknown format in codec spec {spec!r}. Use one of {list(DATA_FORMATS)}.")
+    if fmt == 'csv':
+        return spec, fmt, codec
+    if len(parts) < 2:
+        raise ValueError(f"Codec spec {spec!r} needs a compression, e.g. {fmt}:zstd:9")
+    codec['compression'] = parts[1]
+    codec['compression_level'] = None
+    for part in parts[2:]:
+        if part == 'nodict':
+            codec['use_dictionary'] = False
+        else:
+            codec['compression_level'] = int(part)
+    if fmt == 'parquet':
+        codec.setdefault('use_dictionary', True)
+    return spec, fmt, codec
+
+
+def parse_size(text: str) -> int:
+    """
+    '500MB', '2G', '1024' -> bytes.
+    """
+    text = text.strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
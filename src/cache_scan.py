@@ -0,0 +1,251 @@
+"""
+Lazy queries over the cache: DataCache.scan(symbol, timeframe) builds a plan, between() and
+columns() refine it, and to_arrow()/to_numpy()/to_pandas() execute it. Callers do not need the
+date_range string used at fetch time: every cached file of the symbol/timeframe whose name range
+overlaps the window is considered. Parquet and feather files are read through pyarrow.dataset, so
+only the requested columns are decoded and parquet row groups whose time statistics fall outside
+the window are skipped.
+
+Example:
+    cache.scan('AAPL', 'minute').between('2024-01-02', '2024-03-29').columns(['close', 'high', 'low']).to_pandas()
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+try:
+    from sessions import normalize
+except ImportError:
+    from .sessions import normalize
+
+# Cache file names written by the fetchers: '<start>_to_<end>.<ext>' (or 'data.<ext>' without a range)
+_RANGE_NAME = re.compile(r'^(\d{4}-\d{2}-\d{2})_to_(\d{4}-\d{2}-\d{2})$')
+DATASET_FORMATS = {'parquet': 'parquet', 'feather': 'feather'}
+
+
+def name_range(path: str) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """
+    Dates encoded in a cache file name, (None, None) when the name carries no parseable range.
+    """
+    match = _RANGE_NAME.match(os.path.splitext(os.path.basename(path))[0])
+    if not match:
+        return None, None
+    return pd.Timestamp(match.group(1)), pd.Timestamp(match.group(2))
+
+
+def _naive(value) -> pd.Timestamp:
+    """
+    Wall-clock timestamp without time zone, for comparing with the calendar dates in file names.
+    """
+    ts = pd.Timestamp(value)
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def _end_bound(value) -> pd.Timestamp:
+    """
+    Inclusive end bound; a date without a time covers that whole day, as with DataFrame.loc.
+    """
+    ts = pd.Timestamp(value)
+    if isinstance(value, str) and len(value.strip()) <= 10:
+        ts = ts + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return ts
+
+
+def _arrow_bound(ts: pd.Timestamp, arrow_type: pa.DataType) -> pa.Scalar:
+    tz = getattr(arrow_type, 'tz', None)
+    if tz:
+        ts = ts.tz_localize(tz) if ts.tzinfo is None else ts.tz_convert(tz)
+    elif ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return pa.scalar(ts, type=pa.timestamp('ns', tz=tz)).cast(arrow_type, safe=False)
+
+
+class CacheScan:
+    """
+    Immutable query plan; each refinement returns a new plan and nothing is read until execution.
+    """
+    def __init__(self, cache, symbol: str, timeframe: str, provider: Optional[str] = None, fmt: str = 'parquet',
+                 date_range: Optional[str] = None, start=None, end=None, columns: Optional[Sequence[str]] = None):
+        self.cache = cache
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.provider = provider
+        self.fmt = fmt
+        self.date_range = date_range
+        self.start = start
+        self.end = end
+        self.selected = list(columns) if columns is not None else None
+
+    def _replace(self, **changes) -> 'CacheScan':
+        params = dict(provider=self.provider, fmt=self.fmt, date_range=self.date_range, start=self.start, end=self.end, columns=self.selected)
+        params.update(changes)
+        return CacheScan(self.cache, self.symbol, self.timeframe, **params)
+
+    def between(self, start=None, end=None) -> 'CacheScan':
+        """
+        Keep bars with start <= time <= end (either bound may be None).
+        """
+        return self._replace(start=start, end=end)
+
+    def columns(self, columns: Sequence[str]) -> 'CacheScan':
+        """
+        Read only these columns (the time index is always included).
+        """
+        return self._replace(columns=columns)
+
+    def files(self) -> List[str]:
+        """
+        Cache files the plan reads: the narrowest file whose name range covers the whole window, else every
+        overlapping file (unranged files always overlap). With date_range set, just that file.
+        """
+        overlapping, covering = self._candidates()
+        if covering:
+            return [min(covering)[1]]
+        return overlapping
+
+    def covering(self) -> Optional[str]:
+        """
+        The narrowest cached file whose name range covers the whole window, or None.
+        """
+        covering = self._candidates()[1]
+        return min(covering)[1] if covering else None
+
+    def _candidates(self) -> Tuple[List[str], List[Tuple[pd.Timedelta, str]]]:
+        start = _naive(self.start) if self.start is not None else None
+        end = _naive(_end_bound(self.end)) if self.end is not None else None
+        overlapping, covering = [], []
+        for folder in self._folders():
+            for name in sorted(os.listdir(folder)):
+                if not name.endswith('.' + self.fmt):
+                    continue
+                path = os.path.join(folder, name)
+                if self.date_range:
+                    if name == f"{self.date_range}.{self.fmt}":
+                        overlapping.append(path)
+                    continue
+                lo, hi = name_range(path)
+                # Name ranges are calendar dates; the last day is inclusive
+                hi_end = hi + pd.Timedelta(days=1) if hi is not None else None
+                if (lo is not None and end is not None and lo > end) or (hi_end is not None and start is not None and hi_end <= start):
+                    continue
+                overlapping.append(path)
+                if lo is not None and (start is None or lo <= start) and (end is None or hi_end > end):
+                    covering.append((hi_end - lo, path))
+        return overlapping, covering
+
+    def _folders(self) -> List[str]:
+        root = self.cache.cache_dir
+        if self.provider:
+            providers = [self.provider]
+        else:
+            providers = sorted(os.listdir(root)) if os.path.isdir(root) else []
+        folders = [os.path.join(root, provider, self.symbol, self.timeframe) for provider in providers]
+        return [folder for folder in folders if os.path.isdir(folder)]
+
+    def _time_column(self, schema: pa.Schema) -> Optional[str]:
+        index = (schema.pandas_metadata or {}).get('index_columns') or []
+        names = [c for c in index if isinstance(c, str)]
+        if names and names[0] in schema.names:
+            return names[0]
+        return 'datetime' if 'datetime' in schema.names else None
+
+    def explain(self) -> Dict[str, object]:
+        """
+        The plan without reading data: files, projected columns and, for parquet, row groups kept after pruning.
+        """
+        files = self.files()
+        plan = {'files': files, 'start': self.start, 'end': self.end, 'columns': self.selected, 'row_groups': None}
+        if files and self.fmt == 'parquet':
+            dataset = ds.dataset(files, format='parquet')
+            expr = self._filter(dataset.schema)
+            kept = total = 0
+            for fragment in dataset.get_fragments():
+                total += fragment.metadata.num_row_groups
+                kept += len(fragment.split_by_row_group(expr)) if expr is not None else fragment.metadata.num_row_groups
+            plan['row_groups'] = {'kept': kept, 'total': total}
+        return plan
+
+    def _filter(self, schema: pa.Schema):
+        time_col = self._time_column(schema)
+        if self.start is None and self.end is None:
+            return None
+        if time_col is None:
+            raise ValueError(f"[CacheScan] No time column to filter {self.symbol}/{self.timeframe} on")
+        field = ds.field(time_col)
+        arrow_type = schema.field(time_col).type
+        expr = None
+        if self.start is not None:
+            expr = field >= _arrow_bound(pd.Timestamp(self.start), arrow_type)
+        if self.end is not None:
+            upper = field <= _arrow_bound(_end_bound(self.end), arrow_type)
+            expr = upper if expr is None else expr & upper
+        return expr
+
+    def to_arrow(self) -> Optional[pa.Table]:
+        """
+        Execute the plan. Returns an Arrow table sorted by time (duplicate bars from overlapping files
+        dropped), or None when nothing is cached for the symbol/timeframe.
+        """
+        files = self.files()
+        if not files:
+            return None
+        for path in files:
+            self.cache._touch(path)
+        if self.fmt not in DATASET_FORMATS:
+            return self._read_eager(files)
+        dataset = ds.dataset(files, format=DATASET_FORMATS[self.fmt])
+        time_col = self._time_column(dataset.schema)
+        columns = None
+        if self.selected is not None:
+            missing = [c for c in self.selected if c not in dataset.schema.names]
+            if missing:
+                raise KeyError(f"[CacheScan] Columns not in cache: {missing}")
+            columns = ([time_col] if time_col and time_col not in self.selected else []) + list(self.selected)
+        table = dataset.to_table(columns=columns, filter=self._filter(dataset.schema))
+        if len(files) > 1 and time_col is not None:
+            table = table.sort_by(time_col)
+            times = table[time_col].to_numpy()
+            if len(times) > 1:
+                keep = np.concatenate(([True], times[1:] != times[:-1]))
+                table = table.filter(pa.array(keep))
+        return table
+
+    def _read_eager(self, files: List[str]) -> pa.Table:
+        # Formats without a dataset reader (csv) are read whole and filtered in pandas
+        frames = [self.cache._read(path, self.fmt) for path in files]
+        df = pd.concat(frames).sort_index()
+        df = df[~df.index.duplicated()]
+        if self.start is not None or self.end is not None:
+            df = df.loc[self.start:self.end]
+        if self.selected is not None:
+            df = df[list(self.selected)]
+        return pa.Table.from_pandas(df)
+
+    def to_pandas(self) -> Optional[pd.DataFrame]:
+        """
+        Execute the plan as a DataFrame indexed by time, like DataCache.load.
+        """
+        table = self.to_arrow()
+        if table is None:
+            return None
+        df = table.to_pandas()
+        time_col = self._time_column(table.schema)
+        if time_col is not None and time_col in df.columns:
+            df = df.set_index(time_col)
+        # The pandas metadata usually restores the stored index as is, so legacy naive-UTC files still need normalizing
+        if isinstance(df.index, pd.DatetimeIndex) or df.index.name == 'datetime':
+            df = normalize(df)
+        return df
+
+    def to_numpy(self) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Execute the plan as {column: array}, including the time column (datetime64 in UTC).
+        """
+        table = self.to_arrow()
+        if table is None:
+            return None
+        return {name: table[name].to_numpy() for name in table.column_names}
@@ -7,6 +7,7 @@ from dash import Output, Input, State
 from dashboard.layout import layout
 from dashboard.callbacks import register_callbacks
 from dashboard.glossary_callbacks import register_glossary_callbacks
+from dashboard.exports import register_export_routes
 
 
 # Use a modern Bootstrap theme (e.g., FLATLY)
@@ -22,6 +23,7 @@ app.layout = layout
 
 register_callbacks(app)
 register_glossary_callbacks(app)
+register_export_routes(app)
 
 
 
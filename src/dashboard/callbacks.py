@@ -1,189 +1,208 @@
 
 
+import logging
 from dash import Input, Output, State, no_update, callback_context
 import plotly.graph_objs as go
 import pandas as pd
 import os
 import numpy as np
-from data_fetchers import DataFetcher
-from strategies.sma_crossover import SmaCrossoverStrategy
-from strategies.rsi_mean_reversion import RsiMeanReversionStrategy
-from strategies.macd_crossover import MACDCrossoverStrategy
-from strategies.impulse_macd import ImpulseMACDStrategy
-from backtester import Backtester
-from .utils import compute_extra_metrics, trades_to_table
+from strategy_registry import STRATEGIES
+from providers import ProviderRouter, cache_timeframe
+from .jobs import cache_key, job_manager
 from .components.metrics_panel import metrics_panel
-from .components.trade_table import trade_table
+from .components.trade_table import trade_page
+from .components.performance_charts import equity_figure, price_signals_figure
+from .downsample import visible_range
+from .exports import export_url
 from dash import html
 
+logger = logging.getLogger(__name__)
+
+_router = None
+
+
+def get_router():
+	# One router per server process, so rate-limit state is shared across callbacks
+	global _router
+	if _router is None:
+		_router = ProviderRouter.default()
+	return _router
+
+
+def resolve_provider(symbol, provider, timeframe, start_date=None, end_date=None):
+	# 'auto' resolves as fetches do: the first provider (cheapest first) whose cache covers the window, else the cheapest capable one
+	return get_router().resolve(provider, timeframe, start_date, end_date, symbol=symbol) or 'massive'
+
+
 def register_callbacks(app):
 	# Populate cache-file-dropdown options based on symbol, provider, and timeframe
 	@app.callback(
 		[Output('cache-file-dropdown', 'options'), Output('cache-file-dropdown', 'value')],
-		[Input('symbol', 'value'), Input('provider', 'value'), Input('timeframe', 'value')]
+		[Input('symbol', 'value'), Input('provider', 'value'), Input('timeframe', 'value')],
+		[State('start-date', 'date'), State('end-date', 'date')]
 	)
-	def update_cache_file_options(symbol, provider, timeframe):
+	def update_cache_file_options(symbol, provider, timeframe, start_date, end_date):
 		import os
 		if not symbol or not provider or not timeframe:
 			return [], None
-		tf_map = {'1d': 'day', '1min': 'minute', '1m': 'minute', '5min': 'minute', '1h': 'hour'}
-		def get_cache_timeframe(provider, timeframe):
-			if provider in ['massive', 'auto']:
-				return tf_map.get(timeframe, timeframe)
-			return timeframe
-		# Always use 'massive' for cache lookup if provider is 'auto' or 'massive'
-		chosen_provider = 'massive' if provider in ['auto', 'massive'] else provider
-		cache_timeframe = get_cache_timeframe(chosen_provider, timeframe)
+		chosen_provider = resolve_provider(symbol, provider, timeframe, start_date, end_date)
+		folder = cache_timeframe(chosen_provider, timeframe)
 		# Find project root (two levels up from this file)
 		project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-		cache_dir = os.path.join(project_root, 'cache', str(chosen_provider), str(symbol), str(cache_timeframe))
-		print(f"[DEBUG] Looking for cached data sets in: {cache_dir}")
-		print(f"[DEBUG] Looking for cached data sets in: {cache_dir}")
+		cache_dir = os.path.join(project_root, 'cache', str(chosen_provider), str(symbol), str(folder))
+		logger.debug("Looking for cached data sets in: %s", cache_dir)
 		options = []
 		value = None
 		if os.path.isdir(cache_dir):
 			files = [f for f in os.listdir(cache_dir) if f.endswith('.parquet')]
-			print(f"[DEBUG] Found files: {files}")
+			logger.debug("Found files: %s", files)
 			files = sorted(files)
-			options = [{'label': f, 'value': f} for f in files]
+			# Values carry the provider, so the backtest reads the file from the folder it was listed from
+			options = [{'label': f, 'value': f"{chosen_provider}/{f}"} for f in files]
 			if files:
-				value = files[0]
+				value = options[0]['value']
 		else:
-			print(f"[DEBUG] Directory does not exist: {cache_dir}")
+			logger.debug("Directory does not exist: %s", cache_dir)
 		return options, value
 
-	# Main dashboard update callback
+	# Submit the backtest to the background job pool; the request thread returns immediately
 	@app.callback(
+		[Output('backtest-job', 'data'), Output('job-poll', 'disabled'), Output('backtest-run', 'data', allow_duplicate=True)],
+		[Input('run-btn', 'n_clicks')],
 		[
-			Output('metrics', 'children'),
-			Output('equity-curve', 'figure'),
-			Output('price-signals', 'figure'),
-			Output('trade-table', 'children'),
-			Output('trade-selector', 'options'),
-			Output('trade-selector', 'value'),
-			Output('trade-candlestick', 'figure'),
-			Output('biggest-winner-chart', 'figure'),
-			Output('biggest-loser-chart', 'figure'),
-			Output('win-loss-pie', 'figure'),
-		],
-		[Input('run-btn', 'n_clicks'), Input('chart-toggles', 'value'), Input('trade-selector', 'value')],
-		[
-			State('symbol', 'value'), State('provider', 'value'), State('strategy', 'value'),
-			State('fast', 'value'), State('slow', 'value'),
+			State('symbol', 'value'), State('provider', 'value'), State('timeframe', 'value'), State('start-date', 'date'), State('end-date', 'date'),
+			State('strategy', 'value'), State('fast', 'value'), State('slow', 'value'),
 			State('starting-capital', 'value'), State('risk-factor', 'value'), State('risk-reward', 'value'), State('slippage', 'value'), State('commission', 'value'),
-			State('cache-file-dropdown', 'value')
-		]
+			State('cache-file-dropdown', 'value'),
+			State('stop-policy', 'value'), State('sizing-policy', 'value'), State('max-exposure', 'value')
+		],
+		prevent_initial_call=True
 	)
-	def update_dashboard(n_clicks, chart_toggles, selected_trade, symbol, provider, strategy, fast, slow, starting_capital, risk_factor, risk_reward, slippage, commission, selected_cache_file):
-		ctx_inputs = callback_context.inputs if hasattr(callback_context, 'inputs') else {}
-		timeframe = ctx_inputs.get('timeframe.value', '1d') if hasattr(ctx_inputs, 'get') else '1d'
-		start_date = ctx_inputs.get('start-date.date', None)
-		end_date = ctx_inputs.get('end-date.date', None)
-		print(f"[DEBUG] Run Backtest Clicked: n_clicks={n_clicks}, symbol={symbol}, provider={provider}, timeframe={timeframe}, start_date={start_date}, end_date={end_date}, selected_cache_file={selected_cache_file}, strategy={strategy}, fast={fast}, slow={slow}, starting_capital={starting_capital}, risk_factor={risk_factor}, risk_reward={risk_reward}, slippage={slippage}, commission={commission}")
-		print(f"[DEBUG] Initial chosen_provider: {provider}, timeframe: {timeframe}")
-		if n_clicks == 0:
-			empty_fig = go.Figure()
-			win_loss_pie = go.Figure()
-			return '', empty_fig, empty_fig, '', [], None, empty_fig, empty_fig, empty_fig, win_loss_pie
-		fetcher = DataFetcher()
-		ctx_inputs = callback_context.inputs
-		timeframe = ctx_inputs.get('timeframe.value', '1d') if hasattr(ctx_inputs, 'get') else '1d'
-		start_date = ctx_inputs.get('start-date.date', None)
-		end_date = ctx_inputs.get('end-date.date', None)
+	def submit_backtest(n_clicks, symbol, provider, timeframe, start_date, end_date, strategy, fast, slow, starting_capital, risk_factor, risk_reward, slippage, commission, selected_cache_file, stop_policy, sizing_policy, max_exposure):
+		if not n_clicks:
+			return no_update, no_update, no_update
+		timeframe = timeframe or '1d'
 		date_range = f"{start_date}_to_{end_date}" if start_date and end_date else None
-		tf_map = {'1d': 'day', '1min': 'minute', '1m': 'minute', '5min': 'minute', '1h': 'hour'}
-		chosen_provider = provider
-		warning = ''
-		def get_cache_timeframe(provider, timeframe):
-			if provider == 'massive':
-				return tf_map.get(timeframe, timeframe)
-			return timeframe
-		cache_timeframe = get_cache_timeframe(provider, timeframe)
-		if provider == 'auto':
-			print(f"[DEBUG] Provider is 'auto', evaluating timeframe logic for: {timeframe}")
-			if timeframe in ['1m', '1min', 'minute']:
-				print(f"[DEBUG] Timeframe is minute-based, start_date: {start_date}, end_date: {end_date}")
-				if start_date and end_date:
-					from datetime import datetime
-					d0 = datetime.strptime(start_date, '%Y-%m-%d')
-					d1 = datetime.strptime(end_date, '%Y-%m-%d')
-					days = (d1 - d0).days + 1
-					print(f"[DEBUG] Minute timeframe, days in range: {days}")
-					if days <= 7:
-						chosen_provider = 'yfinance'
-						print(f"[DEBUG] Using yfinance for <=7 days")
-					else:
-						chosen_provider = 'massive'
-						print(f"[DEBUG] Using massive for >7 days")
-				else:
-					chosen_provider = 'yfinance'
-					print(f"[DEBUG] No date range, defaulting to yfinance")
-			else:
-				chosen_provider = 'massive'
-				print(f"[DEBUG] Non-minute timeframe, using massive")
-			cache_timeframe = get_cache_timeframe(chosen_provider, timeframe)
-			print(f"[DEBUG] After auto logic, chosen_provider: {chosen_provider}, cache_timeframe: {cache_timeframe}")
-		print(f"[DEBUG] selected_cache_file: {selected_cache_file}")
-		print(f"[DEBUG] Final chosen_provider: {chosen_provider}, cache_timeframe: {cache_timeframe}")
-		if selected_cache_file:
-			project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-			cache_path = os.path.join(project_root, 'cache', str(chosen_provider), str(symbol), str(cache_timeframe), selected_cache_file)
-			print(f"[DEBUG] Trying to load cache file: {cache_path}")
-			if os.path.exists(cache_path):
-				print(f"[DEBUG] Cache file exists: {cache_path}")
-				data = pd.read_parquet(cache_path)
-				date_range = os.path.splitext(selected_cache_file)[0]
-			else:
-				print(f"[DEBUG] Cache file does NOT exist: {cache_path}")
-				data = None
-		else:
-			print(f"[DEBUG] Calling fetcher.cache.load with symbol={symbol}, provider={chosen_provider}, timeframe={cache_timeframe}, date_range={date_range}")
-			data = fetcher.cache.load(symbol, chosen_provider, cache_timeframe, 'parquet', date_range)
-			print(f"[DEBUG] fetcher.cache.load returned: {type(data)}")
-			warning = f"No cached data for {symbol}/{chosen_provider}/{cache_timeframe}/{date_range}."
-			empty_fig = go.Figure()
-			win_loss_pie = go.Figure()
-			return warning, empty_fig, empty_fig, '', [], None, empty_fig, empty_fig, empty_fig, win_loss_pie
-		if data is None:
-			warning = f"No data loaded for {symbol}/{chosen_provider}/{cache_timeframe}/{date_range}."
-			empty_fig = go.Figure()
-			win_loss_pie = go.Figure()
-			return warning, empty_fig, empty_fig, '', [], None, empty_fig, empty_fig, empty_fig, win_loss_pie
-		if strategy == 'sma_crossover':
-			strat = SmaCrossoverStrategy(fast=fast, slow=slow)
-		elif strategy == 'rsi_mean_reversion':
-			strat = RsiMeanReversionStrategy()
-		elif strategy == 'macd_crossover':
-			strat = MACDCrossoverStrategy(fast=fast, slow=slow)
-		elif strategy == 'impulse_macd':
-			strat = ImpulseMACDStrategy(fast=fast, slow=slow, signal=9, hist_clip=0.5, lookback_days=22)
+		fetch = None
+		cache = None
+		prepare = None
+		if not selected_cache_file:
+			chosen_provider = resolve_provider(symbol, provider, timeframe, start_date, end_date)
+			folder = cache_timeframe(chosen_provider, timeframe)
+			if not date_range:
+				return None, True, {'error': f"No cached data for {symbol}/{chosen_provider}/{folder}/{date_range}."}
+			# Nothing cached: the window is downloaded in this process, through the shared router, before the job runs
+			fetch = {'symbol': symbol, 'timeframe': timeframe, 'start': start_date, 'end': end_date, 'provider': provider}
+
+			def prepare():
+				data, source = get_router().fetch(symbol, timeframe, start_date, end_date, provider)
+				if data is None or data.empty:
+					raise ValueError(f"No data available for {symbol} {timeframe} {start_date} to {end_date}")
+				return cache_key(symbol, source, cache_timeframe(source, timeframe), date_range)
 		else:
-			empty_fig = go.Figure()
-			win_loss_pie = go.Figure()
-			return f"Unknown strategy: {strategy}", empty_fig, empty_fig, '', [], None, empty_fig, empty_fig, empty_fig, win_loss_pie
-		backtester = Backtester(data, strat, initial_cash=starting_capital, fee=commission, risk_factor=risk_factor, risk_reward=risk_reward)
-		results = backtester.run()
-		results = compute_extra_metrics(backtester, results)
-		# Use metrics_panel component
-		settings = {
-			'symbol': symbol,
-			'provider': provider,
+			chosen_provider, _, file_name = selected_cache_file.rpartition('/')
+			chosen_provider = chosen_provider or resolve_provider(symbol, provider, timeframe, start_date, end_date)
+			folder = cache_timeframe(chosen_provider, timeframe)
+			project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+			cache_path = os.path.join(project_root, 'cache', str(chosen_provider), str(symbol), str(folder), file_name)
+			file_range = os.path.splitext(file_name)[0]
+			if not os.path.exists(cache_path):
+				return None, True, {'error': f"No data loaded for {symbol}/{chosen_provider}/{folder}/{file_range}."}
+			cache = cache_key(symbol, chosen_provider, folder, None if file_range == 'data' else file_range)
+		if strategy not in STRATEGIES:
+			return None, True, {'error': f"Unknown strategy: {strategy}"}
+		spec = {
+			'cache': cache,
+			'fetch': fetch,
 			'strategy': strategy,
-			'fast': fast,
-			'slow': slow,
+			'strategy_params': {'fast': fast, 'slow': slow},
 			'starting_capital': starting_capital,
+			'commission': commission,
 			'risk_factor': risk_factor,
 			'risk_reward': risk_reward,
-			'slippage': slippage,
-			'commission': commission,
-			'selected_cache_file': selected_cache_file
+			'stop_policy': stop_policy,
+			'sizing_policy': sizing_policy,
+			'sizing_params': {'max_exposure': max_exposure} if max_exposure else None,
+			'settings': {
+				'symbol': symbol,
+				'provider': provider,
+				'strategy': strategy,
+				'fast': fast,
+				'slow': slow,
+				'starting_capital': starting_capital,
+				'risk_factor': risk_factor,
+				'risk_reward': risk_reward,
+				'slippage': slippage,
+				'commission': commission,
+				'stop_policy': stop_policy,
+				'sizing_policy': sizing_policy,
+				'max_exposure': max_exposure,
+				'selected_cache_file': selected_cache_file
+			},
 		}
-		metrics = metrics_panel(settings, results)
-		# Win/Loss Pie Chart
+		job_id = job_manager.submit(spec, prepare)
+		return job_id, False, no_update
+
+	# Poll the running job: progress bar, and publish the run once it finishes
+	@app.callback(
+		[Output('job-progress', 'value'), Output('job-progress', 'label'), Output('job-poll', 'disabled', allow_duplicate=True), Output('backtest-run', 'data')],
+		[Input('job-poll', 'n_intervals')],
+		[State('backtest-job', 'data')],
+		prevent_initial_call=True
+	)
+	def poll_backtest_job(n_intervals, job_id):
+		if not job_id:
+			return 0, '', True, no_update
+		status = job_manager.status(job_id)
+		pct = int(status['progress'] * 100)
+		if status['state'] in ('queued', 'running'):
+			return pct, f"{status['state'].capitalize()} {pct}%", False, no_update
+		if status['state'] == 'done':
+			return 100, 'Done', True, {'job_id': job_id}
+		if status['state'] == 'cancelled':
+			return pct, 'Cancelled', True, {'error': 'Backtest cancelled.'}
+		return pct, 'Failed', True, {'error': f"Backtest failed: {status['error']}"}
+
+	@app.callback(
+		Output('cancel-btn', 'n_clicks'),
+		[Input('cancel-btn', 'n_clicks')],
+		[State('backtest-job', 'data')],
+		prevent_initial_call=True
+	)
+	def cancel_backtest(n_clicks, job_id):
+		if job_id:
+			job_manager.cancel(job_id)
+		return no_update
+
+	# Per-output render callbacks. Each reads the finished run by id from the job manager,
+	# which computes shared artifacts (extra metrics, trades) once per run, so an input change
+	# only rebuilds the outputs that depend on it.
+	def get_run(run):
+		if not run or run.get('error') or not run.get('job_id'):
+			return None
+		return job_manager.run(run['job_id'])
+
+	@app.callback(Output('metrics', 'children'), [Input('backtest-run', 'data')])
+	def update_metrics(run):
+		if not run:
+			return ''
+		if run.get('error'):
+			return run['error']
+		r = get_run(run)
+		if r is None:
+			return "Backtest results expired; please run it again."
+		return metrics_panel(r['spec']['settings'], r['results'])
+
+	@app.callback(Output('win-loss-pie', 'figure'), [Input('backtest-run', 'data')])
+	def update_win_loss_pie(run):
+		r = get_run(run)
 		win_loss_pie = go.Figure()
-		if hasattr(backtester, 'trade_log') and not backtester.trade_log.empty:
-			win_trades = (backtester.trade_log['pnl'] > 0).sum()
-			loss_trades = (backtester.trade_log['pnl'] < 0).sum()
+		if r is None:
+			return win_loss_pie
+		pnl = r['trades'].pnl
+		if len(pnl):
+			win_trades = int((pnl > 0).sum())
+			loss_trades = int((pnl < 0).sum())
 			win_loss_pie = go.Figure(data=[go.Pie(
 				labels=['Winners', 'Losers'],
 				values=[win_trades, loss_trades],
@@ -191,9 +210,16 @@ def register_callbacks(app):
 				hole=0.4
 			)])
 			win_loss_pie.update_layout(title="Win/Loss Breakdown")
-		# Prepare charts for biggest winner/loser
+		return win_loss_pie
+
+	@app.callback([Output('biggest-winner-chart', 'figure'), Output('biggest-loser-chart', 'figure')], [Input('backtest-run', 'data')])
+	def update_biggest_trades(run):
+		r = get_run(run)
 		biggest_win_fig = go.Figure()
 		biggest_loss_fig = go.Figure()
+		if r is None:
+			return biggest_win_fig, biggest_loss_fig
+		backtester, results = r['backtester'], r['results']
 		if 'biggest_win' in results:
 			t = results['biggest_win']
 			df = backtester.data.loc[t['entry']:t['exit']]
@@ -228,40 +254,70 @@ def register_callbacks(app):
 												showarrow=True, arrowhead=1, ax=0, ay=-40,
 												bgcolor="#fffbe6", bordercolor="#ff9900", borderpad=4)
 			biggest_loss_fig.update_layout(title=f"Biggest Loser: {t['entry']} → {t['exit']} ({t['exit_reason']})", xaxis_title='Date', yaxis_title='Price')
-		eq_fig = go.Figure()
-		price_fig = go.Figure()
-		if 'equity' in chart_toggles:
-			eq_fig.add_trace(go.Scatter(x=backtester.data.index, y=backtester.data['equity'], mode='lines', name='Equity'))
-			eq_fig.update_layout(title='Equity Curve', xaxis_title='Date', yaxis_title='Equity')
-			ctx = callback_context
-			cache_file = None
-			if ctx and ctx.states and 'cache-file-dropdown.value' in ctx.states:
-				cache_file = ctx.states['cache-file-dropdown.value']
-			if cache_file:
-				cache_path = os.path.join(os.path.dirname(__file__), '..', 'cache', chosen_provider, symbol, cache_timeframe, cache_file)
-				if os.path.exists(cache_path):
-					data = pd.read_parquet(cache_path)
-					date_range = os.path.splitext(cache_file)[0]
-				else:
-					data = None
-			else:
-				data = fetcher.cache.load(symbol, chosen_provider, cache_timeframe, 'parquet', date_range)
-			price_fig.add_trace(go.Scatter(x=backtester.data.index, y=backtester.data['close'], mode='lines', name='Close'))
-			buys = backtester.data[backtester.data['signal'] == 1]
-			sells = backtester.data[backtester.data['signal'] == -1]
-			price_fig.add_trace(go.Scatter(x=buys.index, y=buys['close'], mode='markers', marker_symbol='triangle-up', marker_color='green', marker_size=10, name='Buy'))
-			price_fig.add_trace(go.Scatter(x=sells.index, y=sells['close'], mode='markers', marker_symbol='triangle-down', marker_color='red', marker_size=10, name='Sell'))
-			price_fig.update_layout(title='Price & Signals', xaxis_title='Date', yaxis_title='Price')
-		trades = backtester._extract_trades()
-		trade_table_html = trade_table(trades, backtester)
+		return biggest_win_fig, biggest_loss_fig
+
+	# Equity and price charts are downsampled server-side; zooming re-fetches the visible
+	# window at full point budget, and autorange (double-click) returns to the overview.
+	@app.callback(Output('equity-curve', 'figure'), [Input('backtest-run', 'data'), Input('chart-toggles', 'value'), Input('equity-curve', 'relayoutData')])
+	def update_equity_curve(run, chart_toggles, relayout_data):
+		r = get_run(run)
+		if r is None or 'equity' not in (chart_toggles or []):
+			return go.Figure()
+		x_range = None
+		if callback_context.triggered_id == 'equity-curve':
+			x_range = visible_range(relayout_data)
+			if x_range is None:
+				return no_update
+		return equity_figure(r['backtester'].data, x_range)
+
+	@app.callback(Output('price-signals', 'figure'), [Input('backtest-run', 'data'), Input('chart-toggles', 'value'), Input('price-signals', 'relayoutData')])
+	def update_price_signals(run, chart_toggles, relayout_data):
+		r = get_run(run)
+		if r is None or 'price' not in (chart_toggles or []):
+			return go.Figure()
+		x_range = None
+		if callback_context.triggered_id == 'price-signals':
+			x_range = visible_range(relayout_data)
+			if x_range is None:
+				return no_update
+		return price_signals_figure(r['backtester'].data, r['backtester'].trades, x_range)
+
+	# Only the visible page of the trade grid is sent; sorting and filtering run on the
+	# run's cached columnar trade arrays
+	@app.callback(
+		[Output('trade-table', 'data'), Output('trade-table', 'page_count')],
+		[Input('backtest-run', 'data'), Input('trade-table', 'page_current'), Input('trade-table', 'page_size'),
+		 Input('trade-table', 'sort_by'), Input('trade-table', 'filter_query')]
+	)
+	def update_trade_table(run, page_current, page_size, sort_by, filter_query):
+		r = get_run(run)
+		if r is None:
+			return [], 0
+		return trade_page(r['trade_columns'], page_current, page_size, sort_by, filter_query)
+
+	@app.callback([Output('trade-selector', 'options'), Output('trade-selector', 'value')], [Input('backtest-run', 'data')])
+	def update_trade_selector(run):
+		r = get_run(run)
+		if r is None:
+			return [], None
+		trades = r['trades']
+		entries = trades.entry_time.astype(str)
+		exits = trades.exit_time.astype(str)
 		trade_options = [
-			{'label': f"{idx+1}: {str(t['entry'])[:10]} → {str(t['exit'])[:10]} ({'Long' if t['side']==1 else 'Short'})", 'value': idx}
-			for idx, (_, t) in enumerate(trades.iterrows())
+			{'label': f"{idx+1}: {entries[idx][:10]} → {exits[idx][:10]} ({'Long' if side == 1 else 'Short'})", 'value': idx}
+			for idx, side in enumerate(trades.side)
 		]
-		trade_value = selected_trade if selected_trade is not None else (0 if len(trade_options) > 0 else None)
+		return trade_options, (0 if len(trade_options) > 0 else None)
+
+	@app.callback(Output('trade-candlestick', 'figure'), [Input('trade-selector', 'value')], [State('backtest-run', 'data')])
+	def update_trade_candlestick(trade_value, run):
+		r = get_run(run)
 		trade_fig = go.Figure()
-		if trade_value is not None and len(trades) > 0:
-			t = trades.iloc[trade_value]
+		if r is None:
+			return trade_fig
+		backtester, trades = r['backtester'], r['trades']
+		if trade_value is not None and trade_value < len(trades):
+			t = trades.trade(trade_value)
 			entry, exit = t['entry'], t['exit']
 			df = backtester.data.loc[entry:exit]
 			trade_fig = go.Figure(data=[
@@ -280,52 +336,17 @@ def register_callbacks(app):
 										showarrow=True, arrowhead=1, ax=0, ay=-40,
 										bgcolor="#fffbe6", bordercolor="#ff9900", borderpad=4)
 			trade_fig.update_layout(title=f"Trade {trade_value+1}: {entry} → {exit}", xaxis_title='Date', yaxis_title='Price')
-		return metrics, eq_fig, price_fig, trade_table_html, trade_options, trade_value, trade_fig, biggest_win_fig, biggest_loss_fig, win_loss_pie
+		return trade_fig
 
-	# Download trades as CSV
+	# Point the download button at the streaming export route for the run on screen
 	@app.callback(
-		Output("download-trades", "data"),
-		[Input("download-btn", "n_clicks")],
-		[State('symbol', 'value'), State('provider', 'value'), State('strategy', 'value'), State('fast', 'value'), State('slow', 'value')]
+		[Output('download-btn', 'href'), Output('download-btn', 'disabled')],
+		[Input('backtest-run', 'data'), Input('export-kind', 'value'), Input('export-format', 'value')]
 	)
-	def download_trades(n_clicks, symbol, provider, strategy, fast, slow):
-		if n_clicks == 0:
-			return no_update
-		fetcher = DataFetcher()
-		import dash
-		ctx_inputs = dash.callback_context.states
-		timeframe = ctx_inputs.get('timeframe.value', '1d') if hasattr(ctx_inputs, 'get') else '1d'
-		start_date = ctx_inputs.get('start-date.date', None)
-		end_date = ctx_inputs.get('end-date.date', None)
-		date_range = f"{start_date}_to_{end_date}" if start_date and end_date else None
-		tf_map = {'1d': 'day', '1min': 'minute', '1m': 'minute', '5min': 'minute', '1h': 'hour'}
-		cache_timeframe = timeframe
-		if provider == 'massive':
-			cache_timeframe = tf_map.get(timeframe, timeframe)
-		data = fetcher.cache.load(symbol, provider, cache_timeframe, 'parquet', date_range)
-		if data is None:
-			return no_update
-		if strategy == 'sma_crossover':
-			strat = SmaCrossoverStrategy(fast=fast, slow=slow)
-		elif strategy == 'rsi_mean_reversion':
-			strat = RsiMeanReversionStrategy()
-		elif strategy == 'macd_crossover':
-			strat = MACDCrossoverStrategy(fast=fast, slow=slow)
-		elif strategy == 'impulse_macd':
-			strat = ImpulseMACDStrategy(fast=fast, slow=slow, signal=9, hist_clip=0.5, lookback_days=22)
-		else:
-			return no_update
-		backtester = Backtester(data, strat)
-		backtester.run()
-		trades = backtester._extract_trades()
-		if trades.empty:
-			return no_update
-		csv_string = trades.to_csv(index=False)
-		return {
-			'content': csv_string,
-			'filename': f"trades_{symbol}_{provider}.csv",
-			'type': 'text/csv'
-		}
+	def update_export_link(run, kind, fmt):
+		if not run or 'job_id' not in run:
+			return None, True
+		return export_url(run['job_id'], kind, fmt), False
 
 	# Update date range from cache
 
@@ -349,11 +370,10 @@ def register_callbacks(app):
 	def get_date_range_from_cache(symbol, provider, timeframe):
 		import os
 		import re
-		tf_map = {'1d': 'day', '1min': 'minute', '1m': 'minute', '5min': 'minute', '1h': 'hour'}
-		chosen_provider = 'massive' if provider in ['auto', 'massive'] else provider
-		cache_timeframe = tf_map.get(timeframe, timeframe)
+		chosen_provider = resolve_provider(symbol, provider, timeframe)
+		folder = cache_timeframe(chosen_provider, timeframe)
 		project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-		cache_dir = os.path.join(project_root, 'cache', str(chosen_provider), str(symbol), str(cache_timeframe))
+		cache_dir = os.path.join(project_root, 'cache', str(chosen_provider), str(symbol), str(folder))
 		if not os.path.isdir(cache_dir):
 			return None, None
 		files = [f for f in os.listdir(cache_dir) if f.endswith('.parquet')]
@@ -16,6 +16,9 @@ def metrics_panel(settings, results):
 				html.Li(f"Risk/Reward: {settings.get('risk_reward')}") if settings.get('risk_reward') else None,
 				html.Li(f"Slippage: {settings.get('slippage')}") if settings.get('slippage') is not None else None,
 				html.Li(f"Commission: {settings.get('commission')}") if settings.get('commission') is not None else None,
+				html.Li(f"Stop Policy: {settings.get('stop_policy')}") if settings.get('stop_policy') else None,
+				html.Li(f"Sizing Policy: {settings.get('sizing_policy')}") if settings.get('sizing_policy') else None,
+				html.Li(f"Max Exposure: {settings.get('max_exposure')}") if settings.get('max_exposure') else None,
 				html.Li(f"Cache File: {settings.get('selected_cache_file')}") if settings.get('selected_cache_file') else None,
 			])
 		], style={"flex": "1", "margin-right": "32px", "minWidth": "220px"}),
@@ -1 +1,58 @@
 # Performance charts component
+#
+# Equity and price/signal figures built from a downsampled view of the backtest data.
+# Lines are reduced to a point budget for the visible window; markers are the exact trade
+# entries and exits (from the run's TradeRecord) inside that window.
+
+import numpy as np
+import plotly.graph_objs as go
+from ..downsample import DEFAULT_MAX_POINTS, downsample_indices, window_positions
+
+# Above this many raw points in the window, use WebGL traces
+WEBGL_THRESHOLD = 5000
+
+
+def _scatter(n_raw):
+	return go.Scattergl if n_raw > WEBGL_THRESHOLD else go.Scatter
+
+
+def _apply_window(fig, x_range):
+	# uirevision keeps the user's zoom when the figure is replaced by a higher-resolution one
+	fig.update_layout(uirevision='backtest')
+	if x_range and x_range != 'reset':
+		fig.update_xaxes(range=list(x_range))
+
+
+def equity_figure(data, x_range=None, max_points=DEFAULT_MAX_POINTS):
+	window = data.iloc[window_positions(data.index, x_range)]
+	idx = downsample_indices(window.index, window['equity'].to_numpy(), max_points, method='lttb')
+	sampled = window.iloc[idx]
+	fig = go.Figure()
+	fig.add_trace(_scatter(len(window))(x=sampled.index, y=sampled['equity'], mode='lines', name='Equity'))
+	fig.update_layout(title='Equity Curve', xaxis_title='Date', yaxis_title='Equity')
+	_apply_window(fig, x_range)
+	return fig
+
+
+def _trade_markers(trades, rows):
+	# Bar positions and prices of buys (long entries, short exits) and sells (short entries, long exits) inside rows
+	positions = np.concatenate([trades.entry_idx, trades.exit_idx])
+	prices = np.concatenate([trades.entry_price, trades.exit_price])
+	buy = np.concatenate([trades.side == 1, trades.side == -1])
+	inside = (positions >= rows.start) & (positions < rows.stop)
+	return (positions[inside & buy], prices[inside & buy]), (positions[inside & ~buy], prices[inside & ~buy])
+
+
+def price_signals_figure(data, trades, x_range=None, max_points=DEFAULT_MAX_POINTS):
+	rows = window_positions(data.index, x_range)
+	window = data.iloc[rows]
+	idx = downsample_indices(window.index, window['close'].to_numpy(), max_points, method='minmax')
+	sampled = window.iloc[idx]
+	(buy_pos, buy_price), (sell_pos, sell_price) = _trade_markers(trades, rows)
+	fig = go.Figure()
+	fig.add_trace(_scatter(len(window))(x=sampled.index, y=sampled['close'], mode='lines', name='Close'))
+	fig.add_trace(_scatter(len(buy_pos))(x=data.index[buy_pos], y=buy_price, mode='markers', marker_symbol='triangle-up', marker_color='green', marker_size=10, name='Buy'))
+	fig.add_trace(_scatter(len(sell_pos))(x=data.index[sell_pos], y=sell_price, mode='markers', marker_symbol='triangle-down', marker_color='red', marker_size=10, name='Sell'))
+	fig.update_layout(title='Price & Signals', xaxis_title='Date', yaxis_title='Price')
+	_apply_window(fig, x_range)
+	return fig
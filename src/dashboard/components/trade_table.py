@@ -1,22 +1,147 @@
+# Trade table component
+#
+# Server-side paginated, sortable and filterable trade grid. The trade log is converted
+# to columnar arrays once per run; each page request sorts/filters those arrays and
+# serializes only the visible rows.
 
-from dash import html
-
-def trade_table(trades, backtester):
-	if hasattr(backtester, 'trade_log') and not backtester.trade_log.empty:
-		rows = []
-		for _, t in backtester.trade_log.iterrows():
-			rows.append(html.Tr([
-				html.Td(str(t['entry'])),
-				html.Td(str(t['exit'])),
-				html.Td('Long' if t['side'] == 1 else 'Short'),
-				html.Td(f"{t['entry_price']:.2f}" if t['entry_price'] else ''),
-				html.Td(f"{t['exit_price']:.2f}" if t['exit_price'] else ''),
-				html.Td(f"{t['pnl']:.2f}" if t['pnl'] else ''),
-				html.Td(t['exit_reason']),
-			]))
-		return html.Table([
-			html.Thead(html.Tr([html.Th(h) for h in ['Entry', 'Exit', 'Side', 'Entry Price', 'Exit Price', 'PnL', 'Exit Reason']])),
-			html.Tbody(rows)
-		], style={'width': '100%', 'border': '1px solid #ccc'})
-	else:
-		return html.Div("No trades.")
+import numpy as np
+from dash import dash_table
+
+PAGE_SIZE = 25
+
+# (column id, header, kind)
+TRADE_COLUMNS = [
+	('entry', 'Entry', 'datetime'),
+	('exit', 'Exit', 'datetime'),
+	('side', 'Side', 'text'),
+	('entry_price', 'Entry Price', 'numeric'),
+	('exit_price', 'Exit Price', 'numeric'),
+	('pnl', 'PnL', 'numeric'),
+	('exit_reason', 'Exit Reason', 'text'),
+]
+
+FILTER_OPERATORS = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '='], ['contains '], ['datestartswith ']]
+
+
+def trade_table_component():
+	return dash_table.DataTable(
+		id='trade-table',
+		columns=[{'name': header, 'id': col, 'type': 'numeric' if kind == 'numeric' else 'text'} for col, header, kind in TRADE_COLUMNS],
+		data=[],
+		page_current=0,
+		page_size=PAGE_SIZE,
+		page_count=0,
+		page_action='custom',
+		sort_action='custom',
+		sort_mode='multi',
+		sort_by=[],
+		filter_action='custom',
+		filter_query='',
+		style_table={'overflowX': 'auto'},
+		style_cell={'textAlign': 'left', 'padding': '4px'},
+	)
+
+
+def trade_columns(trades):
+	"""
+	Columnar arrays for the grid, read straight from the run's TradeRecord:
+	'sort' holds sortable/filterable values, 'display' formatted strings.
+	"""
+	if trades is None or not len(trades):
+		return {'n': 0, 'sort': {}, 'display': {}}
+	source = {
+		'entry': trades.entry_time.astype(str).to_numpy(dtype=object),
+		'exit': trades.exit_time.astype(str).to_numpy(dtype=object),
+		'side': np.where(trades.side == 1, 'Long', 'Short').astype(object),
+		'entry_price': trades.entry_price,
+		'exit_price': trades.exit_price,
+		'pnl': trades.pnl,
+		'exit_reason': trades.exit_reason,
+	}
+	sort, display = {}, {}
+	for col, _, kind in TRADE_COLUMNS:
+		sort[col] = source[col]
+		if kind == 'numeric':
+			display[col] = np.array([f"{v:.2f}" if v else '' for v in source[col]], dtype=object)
+		else:
+			display[col] = source[col]
+	return {'n': len(trades), 'sort': sort, 'display': display}
+
+
+def split_filter_part(filter_part):
+	for operator_type in FILTER_OPERATORS:
+		for operator in operator_type:
+			if operator in filter_part:
+				name_part, value_part = filter_part.split(operator, 1)
+				name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+				value_part = value_part.strip()
+				v0 = value_part[0] if value_part else ''
+				if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+					value = value_part[1: -1].replace('\\' + v0, v0)
+				else:
+					try:
+						value = float(value_part)
+					except ValueError:
+						value = value_part
+				return name, operator_type[0].strip(), value
+	return None, None, None
+
+
+def _filter_mask(columns, filter_query):
+	mask = np.ones(columns['n'], dtype=bool)
+	for part in (filter_query or '').split(' && '):
+		col, op, value = split_filter_part(part)
+		if col not in columns['sort']:
+			continue
+		values = columns['sort'][col]
+		if op in ('contains', 'datestartswith'):
+			needle = str(value).lower()
+			test = (lambda s: needle in s.lower()) if op == 'contains' else (lambda s: s.startswith(needle))
+			mask &= np.fromiter((test(str(v)) for v in values), dtype=bool, count=len(values))
+			continue
+		if values.dtype == object:
+			value = str(value)
+		elif isinstance(value, str):
+			continue
+		with np.errstate(invalid='ignore'):
+			if op == 'eq':
+				mask &= values == value
+			elif op == 'ne':
+				mask &= values != value
+			elif op == 'lt':
+				mask &= values < value
+			elif op == 'le':
+				mask &= values <= value
+			elif op == 'gt':
+				mask &= values > value
+			elif op == 'ge':
+				mask &= values >= value
+	return mask
+
+
+def _sort_keys(values, ascending):
+	if values.dtype == object:
+		_, codes = np.unique(values.astype(str), return_inverse=True)
+		values = codes
+	return values if ascending else -values
+
+
+def trade_page(columns, page_current=0, page_size=PAGE_SIZE, sort_by=None, filter_query=''):
+	"""
+	Return (records for the requested page, page_count) after filtering and sorting.
+	"""
+	if not columns['n']:
+		return [], 0
+	rows = np.flatnonzero(_filter_mask(columns, filter_query))
+	if sort_by:
+		# lexsort treats the last key as primary
+		keys = [_sort_keys(columns['sort'][s['column_id']][rows], s['direction'] == 'asc') for s in reversed(sort_by) if s['column_id'] in columns['sort']]
+		if keys:
+			rows = rows[np.lexsort(keys)]
+	page_size = page_size or PAGE_SIZE
+	page_count = max(1, -(-len(rows) // page_size))
+	page_current = min(page_current or 0, page_count - 1)
+	page = rows[page_current * page_size:(page_current + 1) * page_size]
+	display = columns['display']
+	records = [{col: display[col][i] for col in display} for i in page]
+	return records, page_count
@@ -0,0 +1,101 @@
+# Server-side downsampling for long time series charts
+#
+# Reduces a series to a fixed point budget before it is serialized to the browser:
+# - LTTB (Largest-Triangle-Three-Buckets) keeps the visual shape of smooth lines (equity)
+# - min/max bucketing keeps every bucket's extremes (price), so spikes are never dropped
+# Both return sorted row positions, so callers can index any aligned column with them.
+
+import numpy as np
+import pandas as pd
+
+# Roughly two points per horizontal pixel of a full-width chart
+DEFAULT_MAX_POINTS = 2000
+
+
+def lttb_indices(x, y, n_out):
+	"""
+	Row positions selected by LTTB. x and y are 1-D numeric arrays of equal length.
+	"""
+	n = len(y)
+	if n_out >= n or n_out < 3:
+		return np.arange(n)
+	x = np.asarray(x, dtype=np.float64)
+	y = np.asarray(y, dtype=np.float64)
+	x = x - x[0]
+	# n_out - 2 buckets between the fixed first and last points
+	edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+	idx = np.empty(n_out, dtype=np.int64)
+	idx[0] = 0
+	idx[-1] = n - 1
+	a = 0
+	for i in range(n_out - 2):
+		start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+		if i + 2 < len(edges):
+			nstart, nend = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+		else:
+			nstart, nend = n - 1, n
+		avg_x = x[nstart:nend].mean()
+		avg_y = np.nanmean(y[nstart:nend]) if np.isfinite(y[nstart:nend]).any() else y[a]
+		area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+		a = start + (int(np.nanargmax(area)) if np.isfinite(area).any() else 0)
+		idx[i + 1] = a
+	return idx
+
+
+def minmax_indices(y, n_out):
+	"""
+	Row positions of the minimum and maximum of each of n_out // 2 equal buckets, plus both ends.
+	"""
+	n = len(y)
+	if n_out >= n or n_out < 4:
+		return np.arange(n)
+	n_buckets = n_out // 2
+	bucket = (np.arange(n) * n_buckets) // n
+	# Sort by bucket, then value: each bucket's first/last entries are its min/max
+	order = np.lexsort((np.asarray(y, dtype=np.float64), bucket))
+	edges = np.searchsorted(bucket, np.arange(n_buckets + 1))
+	mins = order[edges[:-1]]
+	maxs = order[edges[1:] - 1]
+	return np.unique(np.concatenate([mins, maxs, [0, n - 1]]))
+
+
+def downsample_indices(index, values, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+	if len(values) <= max_points:
+		return np.arange(len(values))
+	if method == 'minmax':
+		return minmax_indices(values, max_points)
+	x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(values))
+	return lttb_indices(x, values, max_points)
+
+
+def visible_range(relayout_data):
+	"""
+	Parse a Graph's relayoutData. Returns (x0, x1) strings for a zoom, 'reset' for autorange,
+	or None when the event did not change the x-axis (e.g. autosize or a y-only zoom).
+	"""
+	if not relayout_data:
+		return None
+	if relayout_data.get('xaxis.autorange'):
+		return 'reset'
+	if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+		return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+	if 'xaxis.range' in relayout_data:
+		return tuple(relayout_data['xaxis.range'][:2])
+	return None
+
+
+def window_positions(index, x_range):
+	"""
+	Row slice of index covered by x_range (wall-clock strings as sent by Plotly), or the full slice.
+	"""
+	if not x_range or x_range == 'reset' or not isinstance(index, pd.DatetimeIndex):
+		return slice(0, len(index))
+	x0, x1 = (pd.Timestamp(x) for x in x_range)
+	if index.tz is not None:
+		x0, x1 = (x.tz_localize(index.tz) if x.tzinfo is None else x.tz_convert(index.tz) for x in (x0, x1))
+	elif x0.tzinfo is not None:
+		x0, x1 = x0.tz_localize(None), x1.tz_localize(None)
+	start = int(index.searchsorted(x0, side='left'))
+	end = int(index.searchsorted(x1, side='right'))
+	# One bar of context on each side keeps lines running to the chart edges
+	return slice(max(start - 1, 0), min(end + 1, len(index)))
@@ -0,0 +1,34 @@
+# Streaming export routes
+#
+# Exports are served by a plain Flask route rather than dcc.Download, which would need the
+# whole file inside a callback response. The route reads the finished run from the job
+# manager (the run on screen) and streams it in chunks.
+
+from flask import Response, abort, stream_with_context
+from export import EXPORT_FORMATS, EXPORT_KINDS, iter_export
+from .jobs import job_manager
+
+EXPORT_URL = '/export/<job_id>/<name>'
+
+
+def export_url(job_id, kind, fmt):
+	return f"/export/{job_id}/{kind}.{fmt}"
+
+
+def register_export_routes(app):
+	@app.server.route(EXPORT_URL)
+	def export_run(job_id, name):
+		kind, _, fmt = name.partition('.')
+		if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+			abort(404)
+		run = job_manager.run(job_id)
+		if run is None:
+			abort(404)
+		settings = run['spec'].get('settings', {})
+		filename = f"{kind}_{settings.get('symbol', '')}_{settings.get('strategy', '')}_{job_id}.{fmt}"
+		chunks = iter_export(run['backtester'], kind, fmt)
+		return Response(
+			stream_with_context(chunks),
+			mimetype=EXPORT_FORMATS[fmt],
+			headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+		)
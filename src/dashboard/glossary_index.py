@@ -0,0 +1,204 @@
+# Glossary search index
+#
+# Built once at import from TRADING_GLOSSARY. Lookups try, in order: exact term, term prefix,
+# typo-tolerant match (trigram candidates verified by edit distance), words from the
+# definitions and finally plain trigram similarity. Unmatched or inexact searches are queued to a
+# background writer so the request path never touches disk.
+
+import atexit
+import os
+import queue
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from .components.trading_glossary import TRADING_GLOSSARY
+
+GlossaryMatch = namedtuple('GlossaryMatch', ['term', 'kind', 'score'])
+
+# Match kinds shown directly as a definition; anything else is offered as a suggestion
+DIRECT_KINDS = ('exact', 'prefix', 'typo')
+SUGGEST_CUTOFF = 0.3
+STOPWORDS = {'a', 'an', 'the', 'of', 'to', 'in', 'on', 'is', 'and', 'or', 'for', 'by', 'as', 'with', 'at', 'it', 'its', 'that', 'this'}
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _words(text):
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """
+    Damerau-Levenshtein (adjacent transpositions) distance, or limit + 1 once it is exceeded.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _typo_limit(term):
+    return 1 if len(term) <= 5 else 2
+
+
+class GlossaryIndex:
+    def __init__(self, glossary):
+        self.glossary = glossary
+        self.terms = {k.lower(): k for k in glossary}
+        self.sorted_terms = sorted(self.terms)
+        self.trigrams = defaultdict(set)
+        self.term_trigram_counts = {}
+        self.words = defaultdict(set)
+        for lower in self.terms:
+            grams = _trigrams(lower)
+            self.term_trigram_counts[lower] = len(grams)
+            for gram in grams:
+                self.trigrams[gram].add(lower)
+            entry = glossary[self.terms[lower]]
+            for word in _words(lower) + _words(entry.get('definition', '')):
+                self.words[word].add(lower)
+
+    def search(self, query):
+        """
+        Return the best GlossaryMatch for query (term is the glossary key), or None.
+        """
+        q = ' '.join(query.strip().lower().split())
+        if not q:
+            return None
+        if q in self.terms:
+            return GlossaryMatch(self.terms[q], 'exact', 1.0)
+        match = self._prefix(q)
+        if match:
+            return match
+        typo, similar = self._fuzzy(q)
+        return typo or self._definition(q) or similar
+
+    def _prefix(self, q):
+        if len(q) < 2:
+            return None
+        i = bisect_left(self.sorted_terms, q)
+        candidates = []
+        while i < len(self.sorted_terms) and self.sorted_terms[i].startswith(q):
+            candidates.append(self.sorted_terms[i])
+            i += 1
+        if not candidates:
+            return None
+        best = min(candidates, key=len)
+        return GlossaryMatch(self.terms[best], 'prefix', len(q) / len(best))
+
+    def _fuzzy(self, q):
+        """
+        Return (typo match, similar-term suggestion); at most one is set.
+        """
+        grams = _trigrams(q)
+        shared = defaultdict(int)
+        for gram in grams:
+            for lower in self.trigrams.get(gram, ()):
+                shared[lower] += 1
+        if not shared:
+            return None, None
+        # Dice coefficient over trigram sets
+        scored = sorted(((2.0 * n / (len(grams) + self.term_trigram_counts[lower]), lower) for lower, n in shared.items()), reverse=True)
+        for score, lower in scored[:5]:
+            limit = _typo_limit(lower)
+            if _edit_distance(q, lower, limit) <= limit:
+                return GlossaryMatch(self.terms[lower], 'typo', score), None
+        score, lower = scored[0]
+        if score >= SUGGEST_CUTOFF:
+            return None, GlossaryMatch(self.terms[lower], 'fuzzy', score)
+        return None, None
+
+    def _definition(self, q):
+        words = _words(q)
+        if not words:
+            return None
+        hits = defaultdict(int)
+        for word in words:
+            for lower in self.words.get(word, ()):
+                hits[lower] += 1
+        if not hits:
+            return None
+        lower, n = max(hits.items(), key=lambda kv: (kv[1], -len(kv[0])))
+        return GlossaryMatch(self.terms[lower], 'definition', n / len(words))
+
+
+class MissLog:
+    """
+    Buffered append-only log of searches, written by a daemon thread in batches.
+    """
+    def __init__(self, path, flush_interval=2.0, max_buffer=256):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def log(self, text):
+        self._queue.put(f"{datetime.now().isoformat()}\t{text}\n")
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='glossary-miss-log', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _drain(self):
+        lines = []
+        while len(lines) < self.max_buffer:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def _write(self, lines):
+        if not lines:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush(self):
+        with self._lock:
+            lines = self._drain()
+            while lines:
+                self._write(lines)
+                lines = self._drain()
+
+
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+glossary_index = GlossaryIndex(TRADING_GLOSSARY)
+miss_log = MissLog(os.path.join(_project_root, 'cache', 'dict', 'no_match.txt'))
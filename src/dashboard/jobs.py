@@ -0,0 +1,206 @@
+# Background backtest jobs for the dashboard
+#
+# Backtests run in a local process pool so a long minute-level run never blocks the Dash
+# request thread. Jobs report bar-loop progress and can be cancelled through a shared
+# Manager dict; identical in-flight (or recently finished) runs are deduplicated by a
+# hash of their spec. Workers read their bars from the cache; a job whose window is not
+# cached yet is downloaded first in the server process (see submit's prepare), so every
+# download goes through the server's provider router and its shared rate-limit state.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from backtester import Backtester, BacktestCancelled
+from cache import DataCache
+from strategy_registry import create_strategy
+from .utils import compute_extra_metrics
+from .components.trade_table import trade_columns
+
+MAX_WORKERS = 2
+MAX_FINISHED = 16
+PROGRESS_EVERY = 500
+
+
+def job_id_for(spec):
+	return hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(symbol, provider, timeframe, date_range):
+	"""
+	DataCache.load() arguments of a job's bars: provider and timeframe name the cache folder,
+	date_range the file (None for 'data.parquet').
+	"""
+	return {'symbol': symbol, 'provider': provider, 'timeframe': timeframe, 'date_range': date_range}
+
+
+def load_job_data(key):
+	# Through DataCache, so files cached before index normalization are normalized like every other read
+	data = DataCache().load(key['symbol'], key['provider'], key['timeframe'], 'parquet', key['date_range'])
+	if data is None or data.empty:
+		raise ValueError(f"No cached data for {key['symbol']}/{key['provider']}/{key['timeframe']}/{key['date_range']}")
+	return data
+
+
+def run_backtest_job(job_id, spec, progress, cancelled, key=None):
+	"""
+	Worker entry point: load the job's bars from the cache (the key prepare() returned, else spec['cache']),
+	run the backtest and return the Backtester.
+	"""
+	data = load_job_data(key or spec['cache'])
+	strat = create_strategy(spec['strategy'], spec['strategy_params'])
+	backtester = Backtester(
+		data, strat, initial_cash=spec['starting_capital'], fee=spec['commission'],
+		risk_factor=spec['risk_factor'], risk_reward=spec['risk_reward'],
+		stop_policy=spec.get('stop_policy'), sizing_policy=spec.get('sizing_policy'), sizing_params=spec.get('sizing_params'),
+	)
+
+	def report(done, total):
+		if cancelled.get(job_id):
+			raise BacktestCancelled(job_id)
+		progress[job_id] = done / total if total else 1.0
+
+	backtester.run(progress=report, progress_every=PROGRESS_EVERY)
+	return backtester
+
+
+class JobManager:
+	def __init__(self, max_workers=MAX_WORKERS, max_finished=MAX_FINISHED):
+		self.max_workers = max_workers
+		self.max_finished = max_finished
+		self._executor = None
+		self._preparer = None
+		self._manager = None
+		self._progress = None
+		self._cancelled = None
+		self._jobs = OrderedDict()  # job_id -> {'future', 'spec'}
+		self._runs = OrderedDict()  # job_id -> derived artifacts shared by the per-output callbacks
+		self._lock = threading.Lock()
+
+	def _start(self):
+		# Created on first submit so importing the dashboard does not spawn processes
+		if self._executor is None:
+			import multiprocessing
+			# Spawned, not forked: the compiled kernel's thread pool (kernels.py) is not fork-safe
+			context = multiprocessing.get_context('spawn')
+			self._manager = context.Manager()
+			self._progress = self._manager.dict()
+			self._cancelled = self._manager.dict()
+			self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+			self._preparer = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-prepare')
+
+	def submit(self, spec, prepare=None):
+		"""
+		Queue a backtest and return its job id. An identical job that is running or finished
+		(and not cancelled or failed) is reused instead of being run again.
+		:param prepare: Optional callable run in this (server) process, off the request thread, before the
+		                backtest; it returns the cache_key() of the job's bars, e.g. after downloading them
+		"""
+		job_id = job_id_for(spec)
+		with self._lock:
+			self._start()
+			job = self._jobs.get(job_id)
+			if job is not None and self._state(job_id, job) in ('queued', 'running', 'done'):
+				self._jobs.move_to_end(job_id)
+				return job_id
+			self._progress[job_id] = 0.0
+			self._cancelled[job_id] = False
+			if prepare is None:
+				future = self._executor.submit(run_backtest_job, job_id, spec, self._progress, self._cancelled)
+			else:
+				future = self._preparer.submit(self._prepare_and_run, job_id, spec, prepare)
+			self._jobs[job_id] = {'future': future, 'spec': spec}
+			self._prune()
+		return job_id
+
+	def _prepare_and_run(self, job_id, spec, prepare):
+		key = prepare()
+		if self._cancelled.get(job_id):
+			raise BacktestCancelled(job_id)
+		return self._executor.submit(run_backtest_job, job_id, spec, self._progress, self._cancelled, key).result()
+
+	def cancel(self, job_id):
+		with self._lock:
+			job = self._jobs.get(job_id)
+			if job is None:
+				return
+			if not job['future'].cancel():
+				self._cancelled[job_id] = True
+
+	def status(self, job_id):
+		"""
+		Return {'state', 'progress', 'error'}; state is one of queued, running, done, cancelled, error, unknown.
+		"""
+		with self._lock:
+			job = self._jobs.get(job_id)
+			if job is None:
+				return {'state': 'unknown', 'progress': 0.0, 'error': None}
+			state = self._state(job_id, job)
+			error = None
+			if state == 'error':
+				error = str(job['future'].exception())
+			progress = 1.0 if state == 'done' else self._progress.get(job_id, 0.0)
+			return {'state': state, 'progress': progress, 'error': error}
+
+	def result(self, job_id):
+		"""
+		Return (backtester, spec) for a finished job, or (None, spec) if it is not done.
+		"""
+		with self._lock:
+			job = self._jobs.get(job_id)
+			if job is None:
+				return None, None
+			if self._state(job_id, job) != 'done':
+				return None, job['spec']
+			return job['future'].result(), job['spec']
+
+	def run(self, job_id):
+		"""
+		Return the finished run's artifacts, computed once per job and shared by every callback:
+		{'backtester', 'spec', 'results' (with extra metrics), 'trades' (the TradeRecord), 'trade_columns'}. None if the job is not done.
+		"""
+		with self._lock:
+			run = self._runs.get(job_id)
+			if run is not None:
+				self._runs.move_to_end(job_id)
+				return run
+		backtester, spec = self.result(job_id)
+		if backtester is None:
+			return None
+		run = {
+			'backtester': backtester,
+			'spec': spec,
+			'results': compute_extra_metrics(backtester, dict(backtester.results)),
+			'trades': backtester.trades,
+			'trade_columns': trade_columns(backtester.trades),
+		}
+		with self._lock:
+			self._runs[job_id] = run
+			while len(self._runs) > self.max_finished:
+				self._runs.popitem(last=False)
+		return run
+
+	def _state(self, job_id, job):
+		future = job['future']
+		if future.cancelled():
+			return 'cancelled'
+		if not future.done():
+			return 'running' if future.running() else 'queued'
+		exc = future.exception()
+		if isinstance(exc, BacktestCancelled):
+			return 'cancelled'
+		if exc is not None:
+			return 'error'
+		return 'done'
+
+	def _prune(self):
+		finished = [jid for jid, job in self._jobs.items() if job['future'].done()]
+		for jid in finished[:max(0, len(finished) - self.max_finished)]:
+			self._jobs.pop(jid)
+			self._progress.pop(jid, None)
+			self._cancelled.pop(jid, None)
+
+
+job_manager = JobManager()
@@ -3,6 +3,8 @@
 import dash_bootstrap_components as dbc
 from dash import dcc, html
 from .components.glossary_search import glossary_search_component
+from .components.trade_table import trade_table_component
+from strategy_registry import strategy_options
 
 symbol_list = sorted(list(set([
 	'AAPL', 'AMZN', 'BA', 'BAC', 'GOOGL', 'JNJ', 'JPM', 'MSFT', 'SPY', 'TSLA', 'UNH', 'UNP'
@@ -38,7 +40,8 @@ layout = dbc.Container([
 								   dcc.Dropdown(id='provider', options=[
 									   {'label': 'Auto', 'value': 'auto'},
 									   {'label': 'Massive', 'value': 'massive'},
-									   {'label': 'yFinance', 'value': 'yfinance'}
+									   {'label': 'yFinance', 'value': 'yfinance'},
+									   {'label': 'Alpaca', 'value': 'alpaca'}
 								   ], value='auto', className="mb-2 data-selection-dropdown")
 							   ], md=2),
 							   dbc.Col([
@@ -75,12 +78,7 @@ layout = dbc.Container([
 						   dbc.Row([
 							   dbc.Col([
 								   html.Label(["Strategy ", html.I(className="bi bi-info-circle", id="tt-strategy")], className="form-label fw-bold data-selection-label"),
-								   dcc.Dropdown(id='strategy', options=[
-									   {'label': 'SMA Crossover', 'value': 'sma_crossover'},
-									   {'label': 'RSI Mean Reversion', 'value': 'rsi_mean_reversion'},
-									   {'label': 'MACD Crossover', 'value': 'macd_crossover'},
-									   {'label': 'Impulse MACD', 'value': 'impulse_macd'}
-								   ], value='sma_crossover', className="mb-2 data-selection-dropdown")
+								   dcc.Dropdown(id='strategy', options=strategy_options(), value='sma_crossover', className="mb-2 data-selection-dropdown")
 							   ], md=12),
 							   dbc.Col([
 								   html.Label(["Fast (SMA/RSI) ", html.I(className="bi bi-info-circle", id="tt-fast")], className="form-label fw-bold data-selection-label"),
@@ -119,9 +117,53 @@ layout = dbc.Container([
 								   html.Label(["Commission ($) ", html.I(className="bi bi-info-circle", id="tt-commission")], className="form-label fw-bold data-selection-label"),
 								   dcc.Input(id='commission', value=0.0, type='number', min=0, max=100, step=0.01, className="form-control mb-2")
 							   ], md=6),
+							   dbc.Col([
+								   html.Label(["Stop Policy ", html.I(className="bi bi-info-circle", id="tt-stop-policy")], className="form-label fw-bold data-selection-label"),
+								   dcc.Dropdown(id='stop-policy', options=[
+									   {'label': 'Fixed 1%', 'value': 'fixed_pct'},
+									   {'label': 'ATR', 'value': 'atr'},
+									   {'label': 'Trailing 1%', 'value': 'trailing_pct'},
+									   {'label': 'Trailing ATR', 'value': 'trailing_atr'}
+								   ], value='fixed_pct', clearable=False, className="mb-2 data-selection-dropdown")
+							   ], md=6),
+							   dbc.Col([
+								   html.Label(["Sizing Policy ", html.I(className="bi bi-info-circle", id="tt-sizing-policy")], className="form-label fw-bold data-selection-label"),
+								   dcc.Dropdown(id='sizing-policy', options=[
+									   {'label': 'Fixed Fractional', 'value': 'fixed_fractional'},
+									   {'label': 'Volatility Target', 'value': 'vol_target'}
+								   ], value='fixed_fractional', clearable=False, className="mb-2 data-selection-dropdown")
+							   ], md=6),
+							   dbc.Col([
+								   html.Label(["Max Exposure (x equity) ", html.I(className="bi bi-info-circle", id="tt-max-exposure")], className="form-label fw-bold data-selection-label"),
+								   dcc.Input(id='max-exposure', value=None, type='number', min=0, step=0.1, className="form-control mb-2")
+							   ], md=6),
+							   dbc.Col([
+								   html.Label("Export", className="form-label fw-bold data-selection-label"),
+								   dcc.Dropdown(id='export-kind', options=[
+									   {'label': 'Trades', 'value': 'trades'},
+									   {'label': 'Equity Curve', 'value': 'equity'},
+									   {'label': 'Signals', 'value': 'signals'}
+								   ], value='trades', clearable=False, className="mb-2 data-selection-dropdown")
+							   ], md=6),
+							   dbc.Col([
+								   html.Label("Export Format", className="form-label fw-bold data-selection-label"),
+								   dcc.Dropdown(id='export-format', options=[
+									   {'label': 'CSV', 'value': 'csv'},
+									   {'label': 'CSV (gzip)', 'value': 'csv.gz'},
+									   {'label': 'Parquet (zstd)', 'value': 'parquet'},
+									   {'label': 'Arrow IPC (zstd)', 'value': 'arrow'}
+								   ], value='csv', clearable=False, className="mb-2 data-selection-dropdown")
+							   ], md=6),
 							   dbc.Col([
 								   dbc.Button('Run Backtest', id='run-btn', color='primary', className="me-2 mt-4"),
-								   dbc.Button('Download Trades CSV', id='download-btn', color='secondary', className="mt-4")
+								   dbc.Button('Cancel', id='cancel-btn', color='warning', className="me-2 mt-4"),
+								   dbc.Button('Download', id='download-btn', color='secondary', className="mt-4", external_link=True, download='', disabled=True)
+							   ], md=12),
+							   dbc.Col([
+								   dbc.Progress(id='job-progress', value=0, label='', striped=True, animated=True, className="mt-3"),
+								   dcc.Interval(id='job-poll', interval=500, disabled=True),
+								   dcc.Store(id='backtest-job'),
+								   dcc.Store(id='backtest-run')
 							   ], md=12)
 						   ])
 					   ])
@@ -130,7 +172,7 @@ layout = dbc.Container([
 		   ]),
 		# Tooltips for each parameter
 		dbc.Tooltip("Stock ticker symbol (e.g., AAPL, MSFT, SPY)", target="tt-symbol", placement="top"),
-		dbc.Tooltip("Data provider: Massive (Polygon) or yFinance", target="tt-provider", placement="top"),
+		dbc.Tooltip("Data provider: Massive (Polygon), yFinance or Alpaca; Auto uses the cache, then the cheapest provider that can serve the request", target="tt-provider", placement="top"),
 		dbc.Tooltip("Data timeframe: daily, 1min, 5min, or 1h", target="tt-timeframe", placement="top"),
 		dbc.Tooltip("Start date for data selection", target="tt-start-date", placement="top"),
 		dbc.Tooltip("End date for data selection", target="tt-end-date", placement="top"),
@@ -141,6 +183,9 @@ layout = dbc.Container([
 		dbc.Tooltip("Risk factor for position sizing (future use)", target="tt-risk-factor", placement="top"),
 		dbc.Tooltip("Slippage percentage per trade (future use)", target="tt-slippage", placement="top"),
 		dbc.Tooltip("Commission per trade in dollars", target="tt-commission", placement="top"),
+		dbc.Tooltip("Stop-loss placement: fixed 1%, ATR multiple, or trailing variants", target="tt-stop-policy", placement="top"),
+		dbc.Tooltip("Position sizing: risk a fixed % of equity, or target annualized volatility", target="tt-sizing-policy", placement="top"),
+		dbc.Tooltip("Cap position notional at this multiple of equity (blank = no cap)", target="tt-max-exposure", placement="top"),
 	dbc.Row([
 		dbc.Col([
 			dbc.Card([
@@ -202,7 +247,7 @@ layout = dbc.Container([
 			dbc.Card([
 				dbc.CardBody([
 					html.H4("Trade List", className="card-title mb-3"),
-					html.Div(id='trade-table'),
+					trade_table_component(),
 					html.Br(),
 					html.Label("Select Trade to View Candlestick Chart:"),
 					dcc.Dropdown(id='trade-selector', options=[], value=None, clearable=True, style={"maxWidth": 400}),
@@ -210,7 +255,6 @@ layout = dbc.Container([
 				])
 			], className="mb-4 shadow-sm")
 		], width=12)
-	]),
-	dcc.Download(id="download-trades")
+	])
 ], fluid=True)
 # Main layout definition for dashboard
@@ -1,30 +1,69 @@
-import pytz
-
-
+"""
+Market data fetchers (yFinance, Massive/Polygon, Alpaca) with local caching.
+Provider SDKs (yfinance, polygon, dotenv, aiohttp) are imported inside the methods that use them,
+so importing this module or reading from the cache does not pay their start-up cost.
+Downloads are normalized to a tz-aware exchange-time index (sessions.normalize) before caching,
+whatever zone convention the provider uses.
+"""
 import os
-from dotenv import load_dotenv
+import logging
 import pandas as pd
-import yfinance as yf
-from typing import Optional
-import sys
+from contextlib import ExitStack
+from typing import Dict, List, Optional
 import argparse
 try:
     from .cache import DataCache
+    from . import alpaca_client
+    from .providers import AUTO, PROVIDER_NAMES, ProviderRouter, cache_timeframe
+    from .sessions import EXCHANGE_TZ, normalize
 except ImportError:
     from cache import DataCache
-from polygon import RESTClient as PolygonClient
+    import alpaca_client
+    from providers import AUTO, PROVIDER_NAMES, ProviderRouter, cache_timeframe
+    from sessions import EXCHANGE_TZ, normalize
+try:
+    from instrumentation import traced, count
+except ImportError:
+    from .instrumentation import traced, count
+
+logger = logging.getLogger(__name__)
 from datetime import datetime, timedelta
 
 
 class DataFetcher:
     def __init__(self, cache_fmt: str = 'parquet'):
+        from dotenv import load_dotenv
         load_dotenv()
         self.massive_api_key = os.getenv("MASSIVE_API_KEY")
         self.polygon_api_key = os.getenv("POLYGON_API_KEY")
+        self.alpaca_api_key = os.getenv("ALPACA_API_KEY") or os.getenv("APCA_API_KEY_ID")
+        self.alpaca_secret_key = os.getenv("ALPACA_SECRET_KEY") or os.getenv("APCA_API_SECRET_KEY")
+        self.alpaca_feed = os.getenv("ALPACA_DATA_FEED", "iex")
         self.cache = DataCache()
         self.cache_fmt = cache_fmt
 
+    def _cached_fetch(self, symbol: str, provider: str, timeframe: str, date_range: str, download,
+                      naive_tz: str = 'UTC') -> Optional[pd.DataFrame]:
+        """
+        Return the cached frame, or call download() and cache its result. The download runs under the
+        key's cache lock and the cache is re-checked once the lock is held, so concurrent fetchers of
+        the same key (threads or processes) wait for one download instead of repeating it.
+        :param naive_tz: Zone of naive timestamps in the download (see sessions.normalize_index)
+        """
+        cached = self.cache.load(symbol, provider, timeframe, self.cache_fmt, date_range)
+        if cached is not None:
+            logger.info("[CACHE] Data already exists for %s/%s/%s/%s", provider, symbol, timeframe, date_range)
+            return cached
+        with self.cache.lock(symbol, provider, timeframe, self.cache_fmt, date_range):
+            cached = self.cache.load(symbol, provider, timeframe, self.cache_fmt, date_range)
+            if cached is not None:
+                return cached
+            df = normalize(download(), naive_tz)
+            if df is not None:
+                self.cache.save(df, symbol, provider, timeframe, self.cache_fmt, date_range)
+            return df
 
+    @traced('fetcher.yfinance')
     def fetch_yfinance(self, symbol: str, start: str, end: str, interval: str = "1d") -> Optional[pd.DataFrame]:
         provider = 'yfinance'
         timeframe = interval
@@ -33,61 +72,97 @@ class DataFetcher:
         if interval == '1m':
             max_start = (datetime.today() - timedelta(days=7)).strftime('%Y-%m-%d')
             if start < max_start:
-                print(f"[SKIP] {symbol} 1m {start} to {end}: yFinance only allows 1m data for the last 7 days.")
+                logger.info("[SKIP] %s 1m %s to %s: yFinance only allows 1m data for the last 7 days.", symbol, start, end)
                 return None
-        cached = self.cache.load(symbol, provider, timeframe, self.cache_fmt, date_range)
-        if cached is not None:
-            return cached
+        # Daily bars come back as naive exchange-local dates, intraday bars already tz-aware
+        return self._cached_fetch(symbol, provider, timeframe, date_range,
+                                  lambda: self._download_yfinance(symbol, start, end, interval), naive_tz=EXCHANGE_TZ)
+
+    def _download_yfinance(self, symbol: str, start: str, end: str, interval: str) -> Optional[pd.DataFrame]:
+        import yfinance as yf
         try:
             df = yf.download(symbol, start=start, end=end, interval=interval, auto_adjust=True)
             if df is not None and not df.empty:
-                # Localize index to US/Eastern
-                eastern = pytz.timezone('America/New_York')
-                # Ensure index is a DatetimeIndex
-                if not isinstance(df.index, pd.DatetimeIndex):
-                    df.index = pd.to_datetime(df.index)
-                if df.index.tz is None or df.index.tz is pd.NaT:
-                    df.index = df.index.tz_localize('UTC').tz_convert(eastern)
-                else:
-                    df.index = df.index.tz_convert(eastern)
-                df.index.name = "datetime"
-                self.cache.save(df, symbol, provider, timeframe, self.cache_fmt, date_range)
+                count('fetcher.yfinance.rows', len(df))
                 return df
             else:
-                print(f"yFinance: No data returned for {symbol} from {start} to {end} (interval={interval}). Columns: {df.columns if df is not None else 'None'}")
+                logger.warning("yFinance: No data returned for %s from %s to %s (interval=%s). Columns: %s", symbol, start, end, interval, df.columns if df is not None else 'None')
                 if df is not None:
-                    print(f"yFinance: DataFrame shape: {df.shape}, head: {df.head()}.")
+                    logger.debug("yFinance: DataFrame shape: %s, head: %s.", df.shape, df.head())
                 return None
         except Exception as e:
-            print(f"yFinance: Exception occurred for {symbol} from {start} to {end} (interval={interval}): {e}")
+            logger.warning("yFinance: Exception occurred for %s from %s to %s (interval=%s): %s", symbol, start, end, interval, e)
             return None
 
+    @traced('fetcher.massive')
     def fetch_massive(self, symbol: str, start: str, end: str, timeframe: str = "day") -> Optional[pd.DataFrame]:
         provider = 'massive'
-        # Map timeframe for massive
-        tf_map = {'1d': 'day', '1min': 'minute', '1m': 'minute', '5min': 'minute', '1h': 'hour'}
-        mapped_timeframe = tf_map.get(timeframe, timeframe)
+        mapped_timeframe = cache_timeframe(provider, timeframe)
         date_range = f"{start}_to_{end}"
-        cache_path = self.cache._get_path(symbol, provider, mapped_timeframe, self.cache_fmt, date_range)
-        cached = self.cache.load(symbol, provider, mapped_timeframe, self.cache_fmt, date_range)
-        if cached is not None:
-            print(f"[CACHE] Data already exists in {cache_path}")
-            return cached
+        return self._cached_fetch(symbol, provider, mapped_timeframe, date_range,
+                                  lambda: self._download_massive(symbol, start, end, mapped_timeframe))
+
+    def _download_massive(self, symbol: str, start: str, end: str, mapped_timeframe: str) -> Optional[pd.DataFrame]:
         if not self.polygon_api_key:
             raise ValueError("Polygon API key not set in environment.")
+        from polygon import RESTClient as PolygonClient
         client = PolygonClient(self.polygon_api_key)
         start_dt = pd.to_datetime(start).strftime('%Y-%m-%d')
         end_dt = pd.to_datetime(end).strftime('%Y-%m-%d')
         bars = client.get_aggs(symbol, 1, mapped_timeframe, start_dt, end_dt)
         df = pd.DataFrame([bar.__dict__ for bar in bars])
         if not df.empty:
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('datetime', inplace=True)
-            self.cache.save(df, symbol, provider, mapped_timeframe, self.cache_fmt, date_range)
+            df.index = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
+            count('fetcher.massive.rows', len(df))
             return df
         else:
-            print(f"Massive: No data returned for {symbol} from {start} to {end} (timeframe={mapped_timeframe}).")
+            logger.warning("Massive: No data returned for %s from %s to %s (timeframe=%s).", symbol, start, end, mapped_timeframe)
             return None
+
+    @traced('fetcher.alpaca')
+    def fetch_alpaca(self, symbol: str, start: str, end: str, timeframe: str = "day", transport=None) -> Optional[pd.DataFrame]:
+        return self.fetch_alpaca_bulk([symbol], start, end, timeframe, transport)[symbol]
+
+    @traced('fetcher.alpaca_bulk')
+    def fetch_alpaca_bulk(self, symbols: List[str], start: str, end: str, timeframe: str = "day", transport=None) -> Dict[str, Optional[pd.DataFrame]]:
+        """
+        Fetch many symbols with one paginated Alpaca request for all symbols not cached yet, and cache
+        each symbol separately under provider 'alpaca' (same layout and schema as Massive).
+        :param transport: alpaca_client transport, e.g. a RecordedTransport to replay saved responses offline
+        :return: {symbol: DataFrame or None when Alpaca returned no bars}
+        """
+        provider = 'alpaca'
+        mapped_timeframe = cache_timeframe(provider, timeframe)
+        date_range = f"{start}_to_{end}"
+        out = {symbol: self.cache.load(symbol, provider, mapped_timeframe, self.cache_fmt, date_range) for symbol in symbols}
+        missing = sorted(symbol for symbol, df in out.items() if df is None)
+        if not missing:
+            return out
+        if transport is None and not (self.alpaca_api_key and self.alpaca_secret_key):
+            raise ValueError("Alpaca API key/secret not set in environment.")
+        # Lock in sorted order so concurrent bulk fetches of overlapping symbol sets cannot deadlock
+        with ExitStack() as stack:
+            for symbol in missing:
+                stack.enter_context(self.cache.lock(symbol, provider, mapped_timeframe, self.cache_fmt, date_range))
+            for symbol in missing:
+                out[symbol] = self.cache.load(symbol, provider, mapped_timeframe, self.cache_fmt, date_range)
+            missing = [symbol for symbol in missing if out[symbol] is None]
+            if not missing:
+                return out
+            frames = alpaca_client.fetch_bars(missing, mapped_timeframe, start, end, key_id=self.alpaca_api_key,
+                                              secret_key=self.alpaca_secret_key, feed=self.alpaca_feed, transport=transport)
+            for symbol in missing:
+                df = frames.get(symbol)
+                if df is None or df.empty:
+                    logger.warning("Alpaca: No data returned for %s from %s to %s (timeframe=%s).", symbol, start, end, mapped_timeframe)
+                    continue
+                count('fetcher.alpaca.rows', len(df))
+                df = normalize(df)
+                self.cache.save(df, symbol, provider, mapped_timeframe, self.cache_fmt, date_range)
+                out[symbol] = df
+        return out
+
+
 def parse_period(period_str):
     import re
     match = re.match(r"(\d+)(day|d|minute|min|m)", period_str.lower())
@@ -102,9 +177,11 @@ def parse_period(period_str):
     else:
         raise ValueError(f"Unsupported period unit: {unit}")
 
+
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     parser = argparse.ArgumentParser(description="Fetch market data and cache it.")
-    parser.add_argument("-provider", choices=["massive", "yfinance"], required=True, help="Data provider to use.")
+    parser.add_argument("-provider", choices=[AUTO, *PROVIDER_NAMES], required=True, help="Data provider to use ('auto' routes cache -> yfinance -> massive -> alpaca).")
     parser.add_argument("-period", required=True, help="Period to fetch, e.g. 30day, 60min.")
     parser.add_argument("-symbol", required=True, help="Ticker symbol, e.g. AAPL, GOOGL.")
     args = parser.parse_args()
@@ -114,49 +191,16 @@ def main():
     start = (datetime.today() - timedelta(days=num if unit == "day" else 0, minutes=num if unit == "minute" else 0)).strftime('%Y-%m-%d')
 
     fetcher = DataFetcher(cache_fmt='parquet')
+    router = ProviderRouter.default(fetcher)
     symbol = args.symbol
-
-    if args.provider == "yfinance":
-        interval = "1d" if unit == "day" else "1m"
-        df = fetcher.fetch_yfinance(symbol, start, end, interval=interval)
-    elif args.provider == "massive":
-        timeframe = "day" if unit == "day" else "minute"
-        df = fetcher.fetch_massive(symbol, start, end, timeframe=timeframe)
-    else:
-        print(f"Unknown provider: {args.provider}")
-        sys.exit(1)
+    timeframe = "1d" if unit == "day" else "1min"
+    df, source = router.fetch(symbol, timeframe, start, end, provider=args.provider)
 
     if df is not None:
-        print(f"Fetched {len(df)} rows for {symbol} from {args.provider}.")
+        print(f"Fetched {len(df)} rows for {symbol} from {source}.")
         print(df.head())
     else:
         print(f"No data fetched for {symbol} from {args.provider}.")
 
 if __name__ == "__main__":
     main()
-
-
-
-
-    def fetch_massive(self, symbol: str, start: str, end: str, timeframe: str = "day") -> Optional[pd.DataFrame]:
-        provider = 'massive'
-        cached = self.cache.load(symbol, provider, self.cache_fmt)
-        if cached is not None:
-            return cached
-        if not self.polygon_api_key:
-            raise ValueError("Polygon API key not set in environment.")
-        client = PolygonClient(self.polygon_api_key)
-        start_dt = pd.to_datetime(start).strftime('%Y-%m-%d')
-        end_dt = pd.to_datetime(end).strftime('%Y-%m-%d')
-        bars = client.get_aggs(symbol, 1, timeframe, start_dt, end_dt)
-        df = pd.DataFrame([bar.__dict__ for bar in bars])
-        if not df.empty:
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('datetime', inplace=True)
-            self.cache.save(df, symbol, provider, self.cache_fmt)
-            return df
-        else:
-            print(f"Massive: No data returned for {symbol} from {start} to {end} (timeframe={timeframe}).")
-            return None
-
-
@@ -0,0 +1,147 @@
+"""
+Streaming export of backtest results (trades, equity curve, signals) to CSV, Parquet or Arrow IPC.
+Exports are produced as an iterator of byte chunks, serializing chunk_rows rows at a time,
+so the memory used by an export stays constant regardless of how many rows are written.
+"""
+
+import zlib
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+CHUNK_ROWS = 50_000
+
+EXPORT_KINDS = ['trades', 'equity', 'signals']
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'csv.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+
+def export_frame(backtester, kind: str) -> pd.DataFrame:
+    """
+    Select the columns of a finished Backtester for an export kind. Returns views, not copies.
+    """
+    if kind == 'trades':
+        return getattr(backtester, 'trade_log', pd.DataFrame())
+    if kind == 'equity':
+        return backtester.data[['equity', 'strategy_returns']]
+    if kind == 'signals':
+        cols = [c for c in ['close', 'signal', 'position'] if c in backtester.data.columns]
+        return backtester.data[cols]
+    raise ValueError(f"Unknown export kind: {kind}. Available: {EXPORT_KINDS}")
+
+
+def _row_chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS, compress: bool = False, index: bool = True) -> Iterator[bytes]:
+    """
+    Yield CSV bytes chunk by chunk (header once), optionally gzip-compressed as a single stream.
+    """
+    gz = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    header = True
+    for chunk in _row_chunks(df, chunk_rows) if len(df) else [df]:
+        data = chunk.to_csv(header=header, index=index).encode('utf-8')
+        header = False
+        data = gz.compress(data) if gz else data
+        if data:
+            yield data
+    if gz:
+        yield gz.flush()
+
+
+class _ChunkSink:
+    """
+    Write-only file object that hands written bytes back to the generator between row groups.
+    tell() reports the total written so Parquet footer offsets stay correct.
+    """
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS, compression: Optional[str] = 'zstd', index: bool = True) -> Iterator[bytes]:
+    """
+    Yield a Parquet file as bytes, one row group per chunk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _ChunkSink()
+    writer = None
+    for chunk in _row_chunks(df, chunk_rows) if len(df) else [df]:
+        table = pa.Table.from_pandas(chunk, preserve_index=index)
+        if writer is None:
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), table.schema, compression=compression)
+        writer.write_table(table)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def iter_arrow(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS, compression: Optional[str] = 'zstd', index: bool = True) -> Iterator[bytes]:
+    """
+    Yield an Arrow IPC (Feather v2) file as bytes, one record batch per chunk.
+    """
+    import pyarrow as pa
+    sink = _ChunkSink()
+    writer = None
+    for chunk in _row_chunks(df, chunk_rows) if len(df) else [df]:
+        batch = pa.RecordBatch.from_pandas(chunk, preserve_index=index)
+        if writer is None:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            writer = pa.ipc.new_file(pa.PythonFile(sink, mode='w'), batch.schema, options=options)
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def iter_frame(df: pd.DataFrame, fmt: str, chunk_rows: int = CHUNK_ROWS, compression: Optional[str] = 'zstd', index: bool = True) -> Iterator[bytes]:
+    if fmt == 'csv':
+        return iter_csv(df, chunk_rows, compress=False, index=index)
+    if fmt == 'csv.gz':
+        return iter_csv(df, chunk_rows, compress=True, index=index)
+    if fmt == 'parquet':
+        return iter_parquet(df, chunk_rows, compression=compression, index=index)
+    if fmt == 'arrow':
+        return iter_arrow(df, chunk_rows, compression=compression, index=index)
+    raise ValueError(f"Unsupported export format: {fmt}. Available: {list(EXPORT_FORMATS)}")
+
+
+def iter_export(backtester, kind: str, fmt: str, **kwargs) -> Iterator[bytes]:
+    # Trades are one row per trade; equity and signals keep the bar timestamps as index
+    return iter_frame(export_frame(backtester, kind), fmt, index=kind != 'trades', **kwargs)
+
@@ -0,0 +1,125 @@
+"""
+Array indicators for strategies and parameter sweeps.
+Functions take NumPy arrays and return arrays; the batched forms compute shared inputs
+(price changes, gains/losses) once and stack one row per parameter value.
+"""
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+ArrayLike = Union[np.ndarray, pd.Series, Sequence[float]]
+
+
+def _as_periods(periods) -> np.ndarray:
+    periods = np.atleast_1d(np.asarray(periods, dtype=np.int64))
+    if (periods < 1).any():
+        raise ValueError(f"Periods must be >= 1, got {periods.tolist()}")
+    return periods
+
+
+def gains_losses(close: ArrayLike):
+    """
+    Per-bar gains and losses (both >= 0) of close; element 0 has no change and is NaN.
+    """
+    delta = np.diff(np.asarray(close, dtype=np.float64), prepend=np.nan)
+    return np.clip(delta, 0, None), np.clip(-delta, 0, None)
+
+
+def wilder_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder's smoothing of values[1:] (values[0] is the undefined first change): the first
+    average is the simple mean of the first period values, then avg = (avg * (period - 1) + x) / period.
+    Bars before the first full period are NaN.
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n <= period:
+        return out
+    # Seed with the SMA, then run the recursion as an adjust=False EWM with alpha = 1/period
+    seeded = np.concatenate(([values[1:period + 1].mean()], values[period + 1:]))
+    out[period:] = pd.Series(seeded).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return out
+
+
+def sma_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Rolling simple mean with min_periods=1 (the smoothing RsiMeanReversionStrategy used before Wilder's).
+    """
+    return pd.Series(values).rolling(period, min_periods=1).mean().to_numpy()
+
+
+def rsi(close: ArrayLike, periods, smoothing: str = 'wilder') -> np.ndarray:
+    """
+    RSI of close for one or many periods in one call.
+    :param close: Close prices
+    :param periods: int or sequence of ints
+    :param smoothing: 'wilder' (Wilder's RSI) or 'sma' (rolling mean of gains/losses)
+    :return: float64 array of shape (len(periods), len(close)); NaN where undefined
+    """
+    periods = _as_periods(periods)
+    gain, loss = gains_losses(close)
+    if smoothing == 'wilder':
+        smooth = wilder_mean
+    elif smoothing == 'sma':
+        smooth = sma_mean
+    else:
+        raise ValueError(f"Unknown RSI smoothing: {smoothing}. Use 'wilder' or 'sma'.")
+    out = np.empty((len(periods), len(gain)))
+    for row, period in enumerate(periods):
+        avg_gain = smooth(gain, int(period))
+        avg_loss = smooth(loss, int(period))
+        if smoothing == 'sma':
+            # Historical formula, kept so smoothing='sma' reproduces earlier results exactly
+            out[row] = 100 - (100 / (1 + avg_gain / (avg_loss + 1e-9)))
+        else:
+            total = avg_gain + avg_loss
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[row] = np.where(total > 0, 100.0 * avg_gain / total, 50.0)
+            out[row][np.isnan(total)] = np.nan
+    return out
+
+
+def rolling_mean(close: ArrayLike, windows) -> np.ndarray:
+    """
+    Rolling means (min_periods=1) for one or many windows: shape (len(windows), len(close)).
+    """
+    windows = _as_periods(windows)
+    series = pd.Series(np.asarray(close, dtype=np.float64))
+    return np.vstack([series.rolling(int(w), min_periods=1).mean().to_numpy() for w in windows])
+
+
+def ema(values: ArrayLike, spans) -> np.ndarray:
+    """
+    Exponential moving averages (span convention, adjust=False) for one or many spans: shape (len(spans), len(values)).
+    """
+    spans = _as_periods(spans)
+    series = pd.Series(np.asarray(values, dtype=np.float64))
+    return np.vstack([series.ewm(span=int(s), adjust=False).mean().to_numpy() for s in spans])
+
+
+def crossover_signals(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """
+    1 where fast > slow, -1 where fast < slow, else 0 (int8, broadcasting).
+    """
+    return (fast > slow).astype(np.int8) - (fast < slow).astype(np.int8)
+
+
+def mean_reversion_signals(rsi_values: np.ndarray, below_trend: np.ndarray, lower, upper) -> np.ndarray:
+    """
+    Mean-reversion signals for every threshold combination by broadcasting:
+    1 where RSI < lower, -1 where RSI > upper and price is below the trend MA (shorts win ties), else 0.
+    :param rsi_values: (P, N) RSI rows
+    :param below_trend: (M, N) boolean rows, close < trend MA
+    :param lower: sequence of L lower thresholds
+    :param upper: sequence of U upper thresholds
+    :return: int8 array of shape (P, L, U, M, N)
+    """
+    rsi_values = np.atleast_2d(rsi_values)[:, None, None, None, :]
+    below_trend = np.atleast_2d(below_trend)[None, None, None, :, :]
+    lower = np.atleast_1d(np.asarray(lower, dtype=np.float64))[None, :, None, None, None]
+    upper = np.atleast_1d(np.asarray(upper, dtype=np.float64))[None, None, :, None, None]
+    with np.errstate(invalid='ignore'):
+        longs = rsi_values < lower
+        shorts = (rsi_values > upper) & below_trend
+    return np.where(shorts, np.int8(-1), longs.astype(np.int8))
@@ -0,0 +1,184 @@
+"""
+Lightweight instrumentation: timing spans, counters and optional profiler capture.
+Disabled by default. While disabled, span() returns a shared no-op context manager and
+count() returns immediately, so instrumented code pays one global flag check per call.
+Enable with enable() or the STRATEGYTESTER_TRACE environment variable; each finished span
+is then aggregated and emitted as a one-line JSON record on the 'strategytester.trace' logger.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('strategytester.trace')
+
+_enabled = os.environ.get('STRATEGYTESTER_TRACE', '').lower() in ('1', 'true', 'yes')
+_lock = threading.Lock()
+_spans: Dict[str, Dict[str, float]] = {}
+_counters: Dict[str, float] = {}
+
+
+def enable(level: int = logging.INFO) -> None:
+    """
+    Turn instrumentation on and make sure span records reach a handler.
+    :param level: Trace logger level; spans log at INFO, so WARNING aggregates without a line per span
+    """
+    global _enabled
+    _enabled = True
+    logger.setLevel(level)
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, name: str, fields: Dict[str, Any]):
+        self.name = name
+        self.fields = fields
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stats = _spans.setdefault(self.name, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            stats['count'] += 1
+            stats['total_s'] += elapsed
+            stats['max_s'] = max(stats['max_s'], elapsed)
+        if logger.isEnabledFor(logging.INFO):
+            record = {'span': self.name, 'ms': round(elapsed * 1000, 3), **self.fields}
+            if exc_type is not None:
+                record['error'] = exc_type.__name__
+            logger.info(json.dumps(record, default=str))
+        return False
+
+    def set(self, **fields) -> None:
+        """
+        Attach fields (e.g. row counts) known only once the work is done.
+        """
+        self.fields.update(fields)
+
+
+def span(name: str, **fields):
+    """
+    Time a block: `with span('cache.load', symbol=s) as sp: ...; sp.set(rows=n)`.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, fields)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator form of span(); the flag is checked per call so enabling later still takes effect.
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, n: float = 1) -> None:
+    """
+    Add n to a named counter (rows, bytes, cache hits, ...).
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Aggregated span timings and counters since the last reset().
+    """
+    with _lock:
+        return {'spans': {k: dict(v) for k, v in _spans.items()}, 'counters': dict(_counters)}
+
+
+def reset() -> None:
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def log_summary() -> None:
+    logger.info(json.dumps({'summary': snapshot()}, default=str))
+
+
+@contextmanager
+def profile(path: Optional[str] = None, engine: str = 'cprofile', sort: str = 'cumulative', limit: int = 30):
+    """
+    Profile a block with cProfile or pyinstrument (optional dependency).
+    :param path: Write the capture here (.prof stats for cProfile, HTML for pyinstrument); print a report if None
+    :param engine: 'cprofile' or 'pyinstrument'
+    """
+    if engine == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("pyinstrument is not installed; use engine='cprofile' or pip install pyinstrument") from e
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            if path:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            else:
+                print(profiler.output_text())
+    elif engine == 'cprofile':
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            if path:
+                profiler.dump_stats(path)
+            else:
+                pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+    else:
+        raise ValueError(f"Unknown profiler: {engine}. Use 'cprofile' or 'pyinstrument'.")
@@ -0,0 +1,256 @@
+"""
+Optional compiled simulation kernel (Numba).
+_simulate_columns is the Backtester.run SL/TP state machine over typed arrays: one column per
+parameter set, columns run in parallel (prange), and the compiled code is cached on disk
+(cache=True; see NUMBA_CACHE_DIR) so later processes start warm. Numba itself is only imported
+when the kernel is first called, so importing the backtester stays cheap. Without Numba the
+engine falls back to the NumPy column loop in simulation.py.
+
+Engine names: 'auto' (compiled when Numba is installed), 'numba' (require it) and 'python'
+(never compile). The default comes from the STRATEGYTESTER_ENGINE environment variable.
+"""
+import importlib.util
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from policies import AtrStop, FixedFractionalSizing, FixedPctStop, SizingPolicy, StopPolicy, VolatilityTargetSizing
+
+# Checked without importing: numba alone takes longer to import than the rest of the backtester
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+# Rebound to numba.prange before _simulate_columns is compiled (_kernel)
+prange = range
+
+ENGINES = ('auto', 'numba', 'python')
+DEFAULT_ENGINE = os.environ.get('STRATEGYTESTER_ENGINE', 'auto').lower()
+
+STOP_PCT, STOP_DISTANCE = 0, 1
+SIZE_FIXED_FRACTIONAL, SIZE_VOL_TARGET = 0, 1
+# Trade fields written by the kernel, in argument order
+TRADE_DTYPES = {
+    'entry_idx': np.int64, 'exit_idx': np.int64, 'side': np.int8, 'entry_price': np.float64,
+    'exit_price': np.float64, 'size': np.float64, 'pnl': np.float64, 'reason': np.int8,
+}
+# Bars per kernel call when progress is reported (each call also checks for cancellation via the callback)
+KERNEL_CHUNK = 65_536
+# Initial trade slots per column; a chunk that closes more trades in some column is re-run with room for them
+TRADE_CAPACITY = 256
+
+# Numba's default threading layer does not allow concurrent parallel calls from several threads
+# (e.g. dashboard jobs), so kernel calls are serialized; each call already uses all cores.
+_kernel_lock = threading.Lock()
+_compiled = None
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """
+    'numba' or 'python' for an engine name (None selects DEFAULT_ENGINE).
+    """
+    engine = (engine or DEFAULT_ENGINE).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}. Use one of {list(ENGINES)}.")
+    if engine == 'numba' and not NUMBA_AVAILABLE:
+        raise ImportError("numba is not installed; use engine='python' or pip install numba")
+    if engine == 'auto':
+        return 'numba' if NUMBA_AVAILABLE else 'python'
+    return engine
+
+
+def policy_args(stop_policy: StopPolicy, sizing_policy: SizingPolicy) -> Optional[Tuple]:
+    """
+    Kernel arguments for the built-in policies (already prepared), or None when a policy has no
+    compiled form (custom subclasses), in which case the interpreted engine is used.
+    """
+    if type(stop_policy) is FixedPctStop:
+        stop_mode, stop_pct = STOP_PCT, float(stop_policy.pct)
+    elif type(stop_policy) is AtrStop:
+        stop_mode, stop_pct = STOP_DISTANCE, 0.0
+    else:
+        return None
+    if type(sizing_policy) is FixedFractionalSizing:
+        size_mode, target_vol, vol = SIZE_FIXED_FRACTIONAL, 0.0, np.zeros(1)
+    elif type(sizing_policy) is VolatilityTargetSizing:
+        size_mode, target_vol, vol = SIZE_VOL_TARGET, float(sizing_policy.target_vol), np.asarray(sizing_policy.vol, dtype=np.float64)
+    else:
+        return None
+    max_exposure = np.nan if sizing_policy.max_exposure is None else float(sizing_policy.max_exposure)
+    distance = np.ascontiguousarray(stop_policy.distance, dtype=np.float64)
+    return (stop_mode, stop_pct, distance, bool(stop_policy.trailing), size_mode, target_vol, vol, max_exposure)
+
+
+def _kernel() -> Callable:
+    """
+    The compiled _simulate_columns, built (or loaded from the disk cache) on first use. Call with _kernel_lock held.
+    """
+    global _compiled, prange
+    if _compiled is None:
+        import numba
+        prange = numba.prange
+        _compiled = numba.njit(parallel=True, cache=True)(_simulate_columns)
+    return _compiled
+
+
+def _simulate_columns(close, signals, start, stop,
+                      stop_mode, stop_pct, distance, trailing, size_mode, target_vol, vol, max_exposure,
+                      fee, risk_factor, risk_reward,
+                      position, entry_price, stop_loss, take_profit, trade_size, equity, entry_pos,
+                      capacity, equity_out, returns_out, counts,
+                      t_entry, t_exit, t_side, t_entry_price, t_exit_price, t_size, t_pnl, t_reason):
+    """
+    Advance every column's state over bars [start, stop), writing equity/returns and the closed
+    trades. Column k owns trade slots [k * capacity, (k + 1) * capacity); counts[k] is the number of
+    trades it closed, which may exceed capacity (the trades beyond it are not written).
+    """
+    for k in prange(signals.shape[1]):
+        pos = position[k]
+        ep = entry_price[k]
+        sl = stop_loss[k]
+        tp = take_profit[k]
+        size = trade_size[k]
+        eq = equity[k]
+        epos = entry_pos[k]
+        n_trades = 0
+        for i in range(start, stop):
+            price = close[i]
+            sig = signals[i, k]
+            # Exit logic: stop-loss, then take-profit, then an opposite signal
+            if pos != 0:
+                reason = -1
+                if pos == 1:
+                    if price <= sl:
+                        reason = 0
+                    elif price >= tp:
+                        reason = 1
+                else:
+                    if price >= sl:
+                        reason = 0
+                    elif price <= tp:
+                        reason = 1
+                if reason == -1 and sig == -pos:
+                    reason = 2
+                if reason >= 0:
+                    pnl = (price - ep) * pos * size - fee
+                    eq += pnl
+                    if n_trades < capacity:
+                        j = k * capacity + n_trades
+                        t_entry[j] = epos
+                        t_exit[j] = i
+                        t_side[j] = pos
+                        t_entry_price[j] = ep
+                        t_exit_price[j] = price
+                        t_size[j] = size
+                        t_pnl[j] = pnl
+                        t_reason[j] = reason
+                    n_trades += 1
+                    pos = 0
+                    ep = np.nan
+                    sl = np.nan
+                    tp = np.nan
+                    size = 0.0
+                    epos = -1
+                elif trailing:
+                    candidate = price - pos * distance[i]
+                    if pos == 1:
+                        if candidate > sl:
+                            sl = candidate
+                    elif candidate < sl:
+                        sl = candidate
+            # Entry logic
+            if pos == 0 and sig != 0:
+                if stop_mode == 0:
+                    sl = price * (1 - stop_pct) if sig == 1 else price * (1 + stop_pct)
+                else:
+                    sl = price - sig * distance[i]
+                if sig == 1:
+                    tp = price + (price - sl) * risk_reward
+                else:
+                    tp = price - (sl - price) * risk_reward
+                if size_mode == 0:
+                    risk_per_share = abs(price - sl)
+                    size = risk_factor / 100 * eq / risk_per_share if risk_per_share > 0 else 0.0
+                else:
+                    v = vol[i]
+                    size = eq * target_vol / v / price if (v > 0 and price > 0) else 0.0
+                if max_exposure == max_exposure and price > 0:
+                    cap = max_exposure * eq / price
+                    if size > cap:
+                        size = cap
+                ep = price
+                pos = sig
+                epos = i
+            # Mark-to-market
+            if pos != 0:
+                mtm_pnl = (price - ep) * pos * size
+                equity_out[i, k] = eq + mtm_pnl
+                returns_out[i, k] = mtm_pnl / (eq if eq != 0 else 1.0)
+            else:
+                equity_out[i, k] = eq
+                returns_out[i, k] = 0.0
+        position[k] = pos
+        entry_price[k] = ep
+        stop_loss[k] = sl
+        take_profit[k] = tp
+        trade_size[k] = size
+        equity[k] = eq
+        entry_pos[k] = epos
+        counts[k] = n_trades
+
+
+def simulate_columns(close: np.ndarray, signals: np.ndarray, args: Tuple, initial_cash: float, fee: float, risk_factor: float,
+                     risk_reward: float, progress: Optional[Callable[[int, int], None]] = None,
+                     progress_every: int = 1000) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Run the kernel over all bars. Bars are processed in chunks (one when there is no progress callback),
+    each in a single pass that records trades into per-column slots, trimmed afterwards. Slots start at
+    TRADE_CAPACITY and grow; only a chunk that overflowed them is re-run, from its saved state.
+    :param args: policy_args() of the prepared policies
+    :return: (equity, strategy_returns, trades) with (bars, columns) matrices and flat trade arrays
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signals = np.asfortranarray(signals, dtype=np.int8)
+    n_bars, n_cols = signals.shape
+    state = {
+        'position': np.zeros(n_cols, dtype=np.int8),
+        'entry_price': np.full(n_cols, np.nan),
+        'stop_loss': np.full(n_cols, np.nan),
+        'take_profit': np.full(n_cols, np.nan),
+        'trade_size': np.zeros(n_cols),
+        'equity': np.full(n_cols, float(initial_cash)),
+        'entry_pos': np.full(n_cols, -1, dtype=np.int64),
+    }
+    # Column-major outputs: each parallel column writes one contiguous block
+    equity_out = np.empty((n_bars, n_cols), order='F')
+    returns_out = np.empty((n_bars, n_cols), order='F')
+    counts = np.zeros(n_cols, dtype=np.int64)
+    capacity = 0
+    step = max(progress_every, KERNEL_CHUNK) if progress is not None else max(n_bars, 1)
+    chunks = []
+    with _kernel_lock:
+        kernel = _kernel()
+        for start in range(0, n_bars, step):
+            stop = min(start + step, n_bars)
+            if progress is not None:
+                progress(start, n_bars)
+            # A column closes at most one trade per bar
+            capacity = max(capacity, min(TRADE_CAPACITY, stop - start))
+            saved = {name: arr.copy() for name, arr in state.items()}
+            while True:
+                buffers = {name: np.empty(n_cols * capacity, dtype=dtype) for name, dtype in TRADE_DTYPES.items()}
+                kernel(close, signals, start, stop, *args, fee, risk_factor, risk_reward, *state.values(),
+                       capacity, equity_out, returns_out, counts, *buffers.values())
+                if counts.max(initial=0) <= capacity:
+                    break
+                capacity = min(max(2 * capacity, int(counts.max())), stop - start)
+                for name, arr in saved.items():
+                    state[name][:] = arr
+            filled = (np.arange(capacity) < counts[:, None]).ravel()
+            chunk = {name: buf[filled] for name, buf in buffers.items()}
+            chunk['column'] = np.repeat(np.arange(n_cols, dtype=np.int64), counts)
+            chunks.append(chunk)
+    if progress is not None:
+        progress(n_bars, n_bars)
+    trades = {name: np.concatenate([c[name] for c in chunks]) if chunks else np.empty(0, dtype=dtype)
+              for name, dtype in dict(TRADE_DTYPES, column=np.int64).items()}
+    return equity_out, returns_out, trades
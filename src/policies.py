@@ -0,0 +1,272 @@
+"""
+Stop-loss and position-sizing policies for the StrategyTester backtesting engine.
+Each policy precomputes its inputs (ATR, realized volatility, ...) as NumPy arrays in
+prepare(), so the per-bar work inside Backtester.run is a constant-time array lookup.
+Policies are registered by name so strategies, the CLI and the dashboard can select them.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Union
+
+
+def true_range(data: pd.DataFrame) -> np.ndarray:
+    """
+    True range per bar. Falls back to absolute close-to-close change when high/low are missing.
+    """
+    close = data['close'].to_numpy(dtype=float)
+    prev_close = np.concatenate(([close[0]], close[:-1])) if len(close) else close
+    if 'high' in data.columns and 'low' in data.columns:
+        high = data['high'].to_numpy(dtype=float)
+        low = data['low'].to_numpy(dtype=float)
+        return np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    return np.abs(close - prev_close)
+
+
+def atr(data: pd.DataFrame, period: int = 14) -> np.ndarray:
+    """
+    Average True Range with Wilder smoothing (alpha = 1/period).
+    """
+    tr = pd.Series(true_range(data))
+    return tr.ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+
+def realized_vol(data: pd.DataFrame, window: int = 20, periods_per_year: int = 252) -> np.ndarray:
+    """
+    Annualized rolling standard deviation of log returns. NaN until two bars are available.
+    """
+    log_ret = np.log(data['close']).diff()
+    vol = log_ret.rolling(window, min_periods=2).std() * np.sqrt(periods_per_year)
+    return vol.to_numpy()
+
+
+class StopPolicy(ABC):
+    """
+    Base stop policy. Subclasses fill self.distance (price distance from entry to stop per bar)
+    in prepare(). Take-profit is set from the initial risk and the risk:reward ratio.
+    """
+    name = 'base'
+
+    def __init__(self, trailing: bool = False):
+        self.trailing = trailing
+        self.distance = np.empty(0)
+
+    @abstractmethod
+    def prepare(self, data: pd.DataFrame) -> None:
+        pass
+
+    def initial_stop(self, i: int, price: float, side: int) -> float:
+        return price - side * self.distance[i]
+
+    def update_stop(self, i: int, price: float, side: int, stop: float) -> float:
+        """
+        Ratchet the stop in the trade's favor when trailing; otherwise leave it unchanged.
+        """
+        if not self.trailing:
+            return stop
+        candidate = price - side * self.distance[i]
+        if side == 1:
+            return candidate if candidate > stop else stop
+        return candidate if candidate < stop else stop
+
+    def initial_stops(self, i: int, price: float, sides: np.ndarray) -> np.ndarray:
+        """
+        initial_stop() for several positions opened on bar i (one per simulated column).
+        """
+        if type(self).initial_stop is not StopPolicy.initial_stop:
+            return np.array([self.initial_stop(i, price, int(side)) for side in sides], dtype=float)
+        return price - sides * self.distance[i]
+
+    def update_stops(self, i: int, price: float, sides: np.ndarray, stops: np.ndarray) -> np.ndarray:
+        if type(self).update_stop is not StopPolicy.update_stop:
+            return np.array([self.update_stop(i, price, int(side), stop) for side, stop in zip(sides, stops)], dtype=float)
+        if not self.trailing:
+            return stops
+        candidate = price - sides * self.distance[i]
+        return np.where(sides == 1, np.where(candidate > stops, candidate, stops), np.where(candidate < stops, candidate, stops))
+
+
+class FixedPctStop(StopPolicy):
+    """
+    Stop a fixed percentage away from the entry price (the original engine default: 1%).
+    """
+    name = 'fixed_pct'
+
+    def __init__(self, pct: float = 0.01, trailing: bool = False):
+        super().__init__(trailing)
+        self.pct = pct
+
+    def prepare(self, data: pd.DataFrame) -> None:
+        self.distance = data['close'].to_numpy(dtype=float) * self.pct
+
+    def initial_stop(self, i: int, price: float, side: int) -> float:
+        # Keep the exact arithmetic of the original engine for the default policy
+        return price * (1 - self.pct) if side == 1 else price * (1 + self.pct)
+
+    def initial_stops(self, i: int, price: float, sides: np.ndarray) -> np.ndarray:
+        return np.where(sides == 1, price * (1 - self.pct), price * (1 + self.pct))
+
+
+class AtrStop(StopPolicy):
+    """
+    Stop a multiple of ATR away from the entry price.
+    """
+    name = 'atr'
+
+    def __init__(self, period: int = 14, multiplier: float = 2.0, trailing: bool = False):
+        super().__init__(trailing)
+        self.period = int(period)
+        self.multiplier = multiplier
+
+    def prepare(self, data: pd.DataFrame) -> None:
+        self.distance = atr(data, self.period) * self.multiplier
+
+
+class SizingPolicy(ABC):
+    """
+    Base sizing policy. size() returns the number of shares for a new position,
+    optionally capped so that notional exposure never exceeds max_exposure * equity.
+    """
+    name = 'base'
+
+    def __init__(self, max_exposure: Optional[float] = None):
+        self.max_exposure = max_exposure
+
+    def prepare(self, data: pd.DataFrame) -> None:
+        pass
+
+    @abstractmethod
+    def _raw_size(self, i: int, price: float, stop: float, equity: float, risk_factor: float) -> float:
+        pass
+
+    def size(self, i: int, price: float, stop: float, equity: float, risk_factor: float) -> float:
+        size = self._raw_size(i, price, stop, equity, risk_factor)
+        if self.max_exposure is not None and price > 0:
+            cap = self.max_exposure * equity / price
+            if size > cap:
+                size = cap
+        return size
+
+    def _raw_sizes(self, i: int, price: float, stops: np.ndarray, equity: np.ndarray, risk_factor: float) -> np.ndarray:
+        # Subclasses override with a vectorized form; the default applies _raw_size per column
+        return np.array([self._raw_size(i, price, stop, eq, risk_factor) for stop, eq in zip(stops, equity)], dtype=float)
+
+    def sizes(self, i: int, price: float, stops: np.ndarray, equity: np.ndarray, risk_factor: float) -> np.ndarray:
+        """
+        size() for several positions opened on bar i, each with its own stop and equity.
+        """
+        sizes = self._raw_sizes(i, price, stops, equity, risk_factor)
+        if self.max_exposure is not None and price > 0:
+            sizes = np.minimum(sizes, self.max_exposure * equity / price)
+        return sizes
+
+
+class FixedFractionalSizing(SizingPolicy):
+    """
+    Risk risk_factor% of equity per trade: size = risk per trade / distance to stop.
+    """
+    name = 'fixed_fractional'
+
+    def _raw_size(self, i: int, price: float, stop: float, equity: float, risk_factor: float) -> float:
+        risk_per_trade = risk_factor / 100 * equity
+        risk_per_share = abs(price - stop)
+        return risk_per_trade / risk_per_share if risk_per_share > 0 else 0
+
+    def _raw_sizes(self, i: int, price: float, stops: np.ndarray, equity: np.ndarray, risk_factor: float) -> np.ndarray:
+        risk_per_trade = risk_factor / 100 * equity
+        risk_per_share = np.abs(price - stops)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(risk_per_share > 0, risk_per_trade / risk_per_share, 0.0)
+
+
+class VolatilityTargetSizing(SizingPolicy):
+    """
+    Size the position so its annualized volatility matches target_vol as a fraction of equity.
+    """
+    name = 'vol_target'
+
+    def __init__(self, target_vol: float = 0.15, window: int = 20, periods_per_year: int = 252, max_exposure: Optional[float] = None):
+        super().__init__(max_exposure)
+        self.target_vol = target_vol
+        self.window = int(window)
+        self.periods_per_year = int(periods_per_year)
+        self.vol = np.empty(0)
+
+    def prepare(self, data: pd.DataFrame) -> None:
+        self.vol = realized_vol(data, self.window, self.periods_per_year)
+
+    def _raw_size(self, i: int, price: float, stop: float, equity: float, risk_factor: float) -> float:
+        vol = self.vol[i]
+        if not vol > 0 or price <= 0:
+            return 0
+        return equity * self.target_vol / vol / price
+
+    def _raw_sizes(self, i: int, price: float, stops: np.ndarray, equity: np.ndarray, risk_factor: float) -> np.ndarray:
+        vol = self.vol[i]
+        if not vol > 0 or price <= 0:
+            return np.zeros(len(equity))
+        return equity * self.target_vol / vol / price
+
+
+STOP_POLICIES = {
+    'fixed_pct': FixedPctStop,
+    'atr': AtrStop,
+    'trailing_pct': lambda **kw: FixedPctStop(trailing=True, **kw),
+    'trailing_atr': lambda **kw: AtrStop(trailing=True, **kw),
+}
+
+SIZING_POLICIES = {
+    'fixed_fractional': FixedFractionalSizing,
+    'vol_target': VolatilityTargetSizing,
+}
+
+
+def get_stop_policy(policy: Union[str, StopPolicy, None] = None, **params) -> StopPolicy:
+    """
+    Resolve a stop policy by name (or pass an instance through). None selects 'fixed_pct'.
+    """
+    if isinstance(policy, StopPolicy):
+        return policy
+    name = policy or 'fixed_pct'
+    if name not in STOP_POLICIES:
+        raise ValueError(f"Unknown stop policy: {name}. Available: {list(STOP_POLICIES)}")
+    return STOP_POLICIES[name](**params)
+
+
+def get_sizing_policy(policy: Union[str, SizingPolicy, None] = None, **params) -> SizingPolicy:
+    """
+    Resolve a sizing policy by name (or pass an instance through). None selects 'fixed_fractional'.
+    """
+    if isinstance(policy, SizingPolicy):
+        return policy
+    name = policy or 'fixed_fractional'
+    if name not in SIZING_POLICIES:
+        raise ValueError(f"Unknown sizing policy: {name}. Available: {list(SIZING_POLICIES)}")
+    return SIZING_POLICIES[name](**params)
+
+
+def parse_policy_params(text: Optional[str]) -> Dict[str, Any]:
+    """
+    Parse 'key=value,key=value' into a dict, converting numeric values and true/false (any case) to bool.
+    """
+    params = {}
+    if not text:
+        return params
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        value = value.strip()
+        if value.lower() in ('true', 'false'):
+            params[key.strip()] = value.lower() == 'true'
+            continue
+        try:
+            params[key.strip()] = int(value)
+        except ValueError:
+            try:
+                params[key.strip()] = float(value)
+            except ValueError:
+                params[key.strip()] = value
+    return params
@@ -0,0 +1,310 @@
+"""
+Data providers behind one interface, and the router that picks which one serves a request.
+
+Each DataProvider declares what it can serve: the timeframes it supports, how far back each one
+goes (max_lookback_days, counted from today to the requested start), and a request rate limit.
+ProviderRouter.fetch() serves a request from the cheapest source able to:
+1. the cache of any provider (an exact date-range file or a wider file covering it)
+2. the cheapest capable provider; by default yfinance, then Massive (Polygon), then Alpaca
+If a provider fails, returns no data or answers 429, the router falls back to the next one. Rate-limited
+providers cool down. When only cooling providers remain, the router waits for the earliest and retries.
+
+cache_timeframe() is the single mapping from a requested timeframe ('1d', '1min', '5min', '1h'
+and their aliases) to a provider's cache folder.
+"""
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import date
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    from cache import DataCache
+except ImportError:
+    from .cache import DataCache
+try:
+    from urllib3.exceptions import MaxRetryError, ResponseError
+except ImportError:
+    MaxRetryError = ResponseError = None
+
+logger = logging.getLogger(__name__)
+
+# Requested timeframe aliases -> canonical timeframe
+TIMEFRAME_ALIASES = {
+    '1d': '1d', 'day': '1d', 'daily': '1d',
+    '1h': '1h', 'hour': '1h', '60min': '1h',
+    '5min': '5min', '5m': '5min',
+    '1min': '1min', '1m': '1min', 'minute': '1min',
+}
+# Canonical timeframe -> cache folder, per provider naming scheme
+AGGREGATE_FOLDERS = {'1d': 'day', '1h': 'hour', '5min': 'minute', '1min': 'minute'}
+YFINANCE_INTERVALS = {'1d': '1d', '1h': '1h', '5min': '5m', '1min': '1m'}
+PROVIDER_NAMES = ('yfinance', 'massive', 'alpaca')
+AUTO = 'auto'
+DEFAULT_COOLDOWN_SECONDS = 60.0
+DEFAULT_MAX_RETRIES = 5
+
+
+def canonical_timeframe(timeframe: Optional[str]) -> str:
+    """
+    '1d', '1h', '5min' or '1min' for any accepted alias (None means daily); unknown names are returned unchanged.
+    """
+    timeframe = timeframe or '1d'
+    return TIMEFRAME_ALIASES.get(timeframe.lower(), timeframe)
+
+
+def cache_timeframe(provider: str, timeframe: Optional[str]) -> str:
+    """
+    Cache folder name of a timeframe for a provider: Massive/Alpaca use 'day'/'hour'/'minute'
+    (5-minute requests are served from minute bars), yfinance uses its interval names.
+    """
+    canonical = canonical_timeframe(timeframe)
+    if provider == 'yfinance':
+        return YFINANCE_INTERVALS.get(canonical, canonical)
+    return AGGREGATE_FOLDERS.get(canonical, canonical)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    Whether an exception from a provider SDK is an HTTP 429: by its status code (AlpacaError.status, or the
+    response of a requests/urllib3 error), or a urllib3 MaxRetryError for retries exhausted on 429
+    responses, which the Polygon client raises.
+    """
+    for source in (error, getattr(error, 'response', None)):
+        status = getattr(source, 'status', None) or getattr(source, 'status_code', None)
+        if isinstance(status, int):
+            return status == 429
+    if MaxRetryError is not None and isinstance(error, MaxRetryError) and isinstance(error.reason, ResponseError):
+        return str(error.reason) == ResponseError.SPECIFIC_ERROR.format(status_code=429)
+    return False
+
+
+class DataProvider(ABC):
+    """
+    A market data source. Subclasses declare name, cost (lower is preferred), max_lookback_days
+    ({canonical timeframe: days or None for unlimited}; missing timeframes are unsupported)
+    and rate_limit (requests per minute, None for unlimited).
+    """
+    name: str = ''
+    cost: int = 0
+    max_lookback_days: Dict[str, Optional[int]] = {}
+    rate_limit: Optional[int] = None
+
+    def cache_timeframe(self, timeframe: str) -> str:
+        return cache_timeframe(self.name, timeframe)
+
+    def supports(self, timeframe: str, start: Optional[str] = None, end: Optional[str] = None,
+                 today: Optional[date] = None) -> Optional[str]:
+        """
+        None if the provider can serve the request, else the reason it cannot.
+        """
+        canonical = canonical_timeframe(timeframe)
+        if canonical not in self.max_lookback_days:
+            return f"{self.name} has no {timeframe} data"
+        lookback = self.max_lookback_days[canonical]
+        if lookback is not None and start is not None:
+            today = today or date.today()
+            if (today - pd.Timestamp(start).date()).days > lookback:
+                return f"{self.name} {canonical} data only goes back {lookback} days"
+        return None
+
+    def available(self) -> Optional[str]:
+        """
+        None if the provider is configured (API keys, SDK), else the reason it is not.
+        """
+        return None
+
+    @abstractmethod
+    def fetch(self, symbol: str, timeframe: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        """
+        Download (and cache) bars for symbol between start and end; None when there is no data.
+        """
+        pass
+
+
+class YFinanceProvider(DataProvider):
+    name = 'yfinance'
+    cost = 1
+    # Yahoo serves 1m bars for the last 7 days, 5m for 60 and 1h for 730
+    max_lookback_days = {'1d': None, '1h': 730, '5min': 60, '1min': 7}
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+
+    def fetch(self, symbol: str, timeframe: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        return self.fetcher.fetch_yfinance(symbol, start, end, interval=self.cache_timeframe(timeframe))
+
+
+class MassiveProvider(DataProvider):
+    name = 'massive'
+    cost = 2
+    max_lookback_days = {'1d': None, '1h': None, '5min': None, '1min': None}
+    # Polygon free tier
+    rate_limit = 5
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+
+    def available(self) -> Optional[str]:
+        return None if self.fetcher.polygon_api_key else "POLYGON_API_KEY is not set"
+
+    def fetch(self, symbol: str, timeframe: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        return self.fetcher.fetch_massive(symbol, start, end, timeframe=self.cache_timeframe(timeframe))
+
+
+class AlpacaProvider(DataProvider):
+    name = 'alpaca'
+    cost = 3
+    max_lookback_days = {'1d': None, '1h': None, '5min': None, '1min': None}
+    rate_limit = 200
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+
+    def available(self) -> Optional[str]:
+        return None if self.fetcher.alpaca_api_key and self.fetcher.alpaca_secret_key else "ALPACA_API_KEY/ALPACA_SECRET_KEY are not set"
+
+    def fetch(self, symbol: str, timeframe: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        return self.fetcher.fetch_alpaca(symbol, start, end, timeframe=self.cache_timeframe(timeframe))
+
+
+class ProviderRouter:
+    def __init__(self, providers: List[DataProvider], cache: Optional[DataCache] = None, cache_fmt: str = 'parquet',
+                 cooldown: float = DEFAULT_COOLDOWN_SECONDS, max_retries: int = DEFAULT_MAX_RETRIES,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        :param providers: Providers to route between; tried in order of cost
+        :param cache: Cache checked before any provider (default: the project cache)
+        :param cooldown: Seconds a provider is skipped after a 429
+        :param max_retries: Rounds of waiting for rate-limited providers before giving up
+        """
+        self.providers = sorted(providers, key=lambda p: p.cost)
+        self.cache = cache or DataCache()
+        self.cache_fmt = cache_fmt
+        self.cooldown = cooldown
+        self.max_retries = max_retries
+        self.clock = clock
+        self.sleep = sleep
+        self._blocked_until: Dict[str, float] = {}
+        self._calls: Dict[str, Deque[float]] = {}
+
+    @classmethod
+    def default(cls, fetcher=None, cache_fmt: str = 'parquet') -> 'ProviderRouter':
+        """
+        Router over yfinance, Massive and Alpaca sharing one DataFetcher (and its cache).
+        """
+        if fetcher is None:
+            try:
+                from data_fetchers import DataFetcher
+            except ImportError:
+                from .data_fetchers import DataFetcher
+            fetcher = DataFetcher(cache_fmt=cache_fmt)
+        providers = [YFinanceProvider(fetcher), MassiveProvider(fetcher), AlpacaProvider(fetcher)]
+        return cls(providers, cache=fetcher.cache, cache_fmt=fetcher.cache_fmt)
+
+    def provider(self, name: str) -> DataProvider:
+        for p in self.providers:
+            if p.name == name:
+                return p
+        raise ValueError(f"Unknown provider: {name}. Use one of {[p.name for p in self.providers]} or '{AUTO}'.")
+
+    def plan(self, timeframe: str, start: Optional[str] = None, end: Optional[str] = None,
+             provider: str = AUTO) -> List[Tuple[DataProvider, Optional[str]]]:
+        """
+        Providers in the order fetch() tries them, each with the reason it will be skipped (None if usable).
+        """
+        candidates = self.providers if provider == AUTO else [self.provider(provider)]
+        return [(p, p.supports(timeframe, start, end) or p.available()) for p in candidates]
+
+    def cached(self, symbol: str, timeframe: str, start: Optional[str] = None, end: Optional[str] = None,
+               provider: str = AUTO) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """
+        Cached bars for the window from the first provider (by cost) that has them, and that provider's name.
+        """
+        if not start or not end:
+            return None, None
+        date_range = f"{start}_to_{end}"
+        for p in self.providers if provider == AUTO else [self.provider(provider)]:
+            df = self.cache.load(symbol, p.name, p.cache_timeframe(timeframe), self.cache_fmt, date_range)
+            if df is not None and not df.empty:
+                return df, p.name
+        return None, None
+
+    def resolve(self, provider: str, timeframe: str, start: Optional[str] = None, end: Optional[str] = None,
+                symbol: Optional[str] = None) -> Optional[str]:
+        """
+        The provider a request would use: provider itself unless 'auto'. For 'auto', this is the first
+        provider whose cache already holds the symbol/timeframe, else the cheapest capable and configured one.
+        """
+        if provider != AUTO:
+            return provider
+        if symbol is not None:
+            for p in self.providers:
+                if self.cache.scan(symbol, p.cache_timeframe(timeframe), p.name, self.cache_fmt).between(start, end).files():
+                    return p.name
+        for p, reason in self.plan(timeframe, start, end):
+            if reason is None:
+                return p.name
+        return None
+
+    def fetch(self, symbol: str, timeframe: str, start: str, end: str,
+              provider: str = AUTO) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """
+        Serve bars from the cache or the cheapest provider that succeeds.
+        :param provider: 'auto' to route, or one provider name (then only its rate-limit retries apply)
+        :return: (DataFrame or None, name of the provider that served it or None)
+        """
+        df, source = self.cached(symbol, timeframe, start, end, provider)
+        if df is not None:
+            return df, source
+        pending = []
+        for p, reason in self.plan(timeframe, start, end, provider):
+            if reason is None:
+                pending.append(p)
+            else:
+                logger.info("[Router] Skipping %s for %s %s: %s", p.name, symbol, timeframe, reason)
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            waiting = []
+            for p in pending:
+                if self._wait_time(p) > 0:
+                    waiting.append(p)
+                    continue
+                self._calls.setdefault(p.name, deque()).append(self.clock())
+                try:
+                    df = p.fetch(symbol, timeframe, start, end)
+                except Exception as e:
+                    if is_rate_limited(e):
+                        logger.info("[Router] %s rate limited (429); cooling down %.0fs", p.name, self.cooldown)
+                        self._blocked_until[p.name] = self.clock() + self.cooldown
+                        waiting.append(p)
+                    else:
+                        logger.warning("[Router] %s failed for %s %s %s to %s: %s", p.name, symbol, timeframe, start, end, e)
+                    continue
+                if df is not None and not df.empty:
+                    return df, p.name
+                logger.info("[Router] %s returned no data for %s %s %s to %s", p.name, symbol, timeframe, start, end)
+            pending = waiting
+            if pending and attempt < self.max_retries:
+                delay = min(self._wait_time(p) for p in pending)
+                logger.info("[Router] Waiting %.1fs for %s", delay, ', '.join(p.name for p in pending))
+                self.sleep(delay)
+        return None, None
+
+    def _wait_time(self, p: DataProvider) -> float:
+        """
+        Seconds until p may be called: its 429 cooldown, or the declared rate limit over the last minute.
+        """
+        now = self.clock()
+        wait = self._blocked_until.get(p.name, 0.0) - now
+        calls = self._calls.get(p.name)
+        if p.rate_limit is not None and calls:
+            while calls and calls[0] <= now - 60:
+                calls.popleft()
+            if len(calls) >= p.rate_limit:
+                wait = max(wait, calls[0] + 60 - now)
+        return max(wait, 0.0)
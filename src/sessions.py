@@ -0,0 +1,206 @@
+"""
+Exchange session calendar: index normalization and per-bar session arrays.
+
+Every cached frame is indexed by a tz-aware 'datetime' index in the exchange time zone
+(datetime64[ns, America/New_York], i.e. int64 UTC nanoseconds plus a zone), whatever the provider
+returned: normalize() runs once when data is ingested, so readers never convert zones again.
+
+SessionCalendar.arrays() derives, in one pass over the index:
+- session: the bar's session day (exchange-local date, days since 1970-01-01, int32)
+- regular: bar starts inside regular trading hours (09:30-16:00)
+- extended: bar starts in pre-market (04:00-09:30) or after-hours (16:00-20:00)
+Daily and coarser bars (every bar at local midnight) are whole sessions: regular everywhere.
+Early closes and holidays are not modelled; bars only exist for days the exchange traded.
+DataCache stores these arrays next to each data file ('<file>.sessions.npz') and
+load(..., sessions=True) attaches them as columns, so strategies and resampling filter and
+group by session with array operations instead of recomputing wall-clock times on every run.
+
+Example:
+    data = cache.load('AAPL', 'massive', 'minute', sessions=True)
+    regular = data[session_mask(data, 'regular')]
+    daily = resample_sessions(data, 'regular')
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+EXCHANGE_TZ = 'America/New_York'
+# Session hours as minutes after local midnight, [start, end)
+REGULAR_HOURS = (9 * 60 + 30, 16 * 60)
+EXTENDED_HOURS = (4 * 60, 20 * 60)
+SESSION_COLUMNS = ('session', 'regular', 'extended')
+# session_mask() filters: 'extended' keeps pre-market, regular and after-hours bars
+SESSION_FILTERS = ('regular', 'extended', 'all')
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+# How resample_sessions() aggregates each column
+OHLCV_AGGREGATES = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'transactions': 'sum'}
+
+
+def normalize_index(index, naive_tz: str = 'UTC', tz: str = EXCHANGE_TZ) -> pd.DatetimeIndex:
+    """
+    The index as tz-aware nanosecond timestamps in tz. Date-only bars stamped at midnight UTC (yFinance
+    daily files cached before normalization, 19:00/20:00 exchange time the evening before) are moved
+    to midnight of their date in tz.
+    :param naive_tz: Zone of naive timestamps: 'UTC' for epoch-based bars (Massive, Alpaca),
+                     the exchange zone for date-only daily bars (yFinance)
+    """
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(pd.to_datetime(index, utc=True))
+    if index.tz is None:
+        index = index.tz_localize(naive_tz)
+    index = index.as_unit('ns')
+    if _utc_midnights(index):
+        index = index.tz_convert('UTC').tz_localize(None).tz_localize(tz)
+    return index.tz_convert(tz).rename('datetime')
+
+
+def _utc_midnights(index: pd.DatetimeIndex) -> bool:
+    # Every bar at 00:00 UTC; the first bar is checked alone first, so intraday indexes cost O(1)
+    stamps = index.asi8
+    return len(stamps) > 0 and stamps[0] % NS_PER_DAY == 0 and not (stamps % NS_PER_DAY).any()
+
+
+def is_normalized(index, tz: str = EXCHANGE_TZ) -> bool:
+    return (isinstance(index, pd.DatetimeIndex) and str(index.tz) == tz and index.unit == 'ns' and index.name == 'datetime'
+            and not _utc_midnights(index))
+
+
+def normalize(df: pd.DataFrame, naive_tz: str = 'UTC', tz: str = EXCHANGE_TZ) -> pd.DataFrame:
+    """
+    df re-indexed by normalize_index(); returned unchanged when already normalized.
+    """
+    if df is None or is_normalized(df.index, tz):
+        return df
+    return df.set_axis(normalize_index(df.index, naive_tz, tz), axis=0)
+
+
+class SessionCalendar:
+    """
+    Trading hours of one exchange. Hours are (start, end) minutes after local midnight.
+    """
+    def __init__(self, tz: str = EXCHANGE_TZ, regular: Tuple[int, int] = REGULAR_HOURS, extended: Tuple[int, int] = EXTENDED_HOURS):
+        self.tz = tz
+        self.regular = regular
+        self.extended = extended
+
+    def local_ns(self, index) -> np.ndarray:
+        """
+        Wall-clock time of each bar in the exchange zone, as int64 nanoseconds since 1970-01-01 local.
+        """
+        return normalize_index(index, tz=self.tz).tz_localize(None).asi8
+
+    def arrays(self, index) -> Dict[str, np.ndarray]:
+        """
+        {'session', 'regular', 'extended'} arrays for a bar index (naive timestamps are UTC).
+        """
+        day, time_of_day = np.divmod(self.local_ns(index), NS_PER_DAY)
+        minutes = time_of_day // NS_PER_MINUTE
+        if not minutes.any():
+            regular = np.ones(len(minutes), dtype=bool)
+            extended = np.zeros(len(minutes), dtype=bool)
+        else:
+            regular = (minutes >= self.regular[0]) & (minutes < self.regular[1])
+            extended = (minutes >= self.extended[0]) & (minutes < self.extended[1]) & ~regular
+        return {'session': day.astype(np.int32), 'regular': regular, 'extended': extended}
+
+    def session_index(self, session_ids: np.ndarray) -> pd.DatetimeIndex:
+        """
+        Session days as local midnights (the index normalized daily bars use).
+        """
+        days = np.asarray(session_ids, dtype=np.int64) * NS_PER_DAY
+        return pd.DatetimeIndex(days.astype('datetime64[ns]'), name='datetime').tz_localize(self.tz)
+
+
+DEFAULT_CALENDAR = SessionCalendar()
+
+
+def attach_sessions(df: pd.DataFrame, arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Add the session arrays to df as columns (in place) and return it.
+    """
+    for name in SESSION_COLUMNS:
+        df[name] = arrays[name]
+    return df
+
+
+def session_arrays(data: pd.DataFrame, calendar: Optional[SessionCalendar] = None) -> Dict[str, np.ndarray]:
+    """
+    Session arrays of data: its session columns when loaded with sessions=True, else computed from the index.
+    """
+    if all(name in data.columns for name in SESSION_COLUMNS):
+        return {
+            'session': data['session'].to_numpy(dtype=np.int32),
+            'regular': data['regular'].to_numpy(dtype=bool),
+            'extended': data['extended'].to_numpy(dtype=bool),
+        }
+    return (calendar or DEFAULT_CALENDAR).arrays(data.index)
+
+
+def session_mask(data: pd.DataFrame, which: Optional[str] = 'regular', calendar: Optional[SessionCalendar] = None) -> np.ndarray:
+    """
+    Boolean mask of the bars in a session filter: 'regular', 'extended' (regular plus pre/after-hours) or 'all'.
+    """
+    if which is None or which == 'all':
+        return np.ones(len(data), dtype=bool)
+    return _filter_mask(session_arrays(data, calendar), which)
+
+
+def _filter_mask(arrays: Dict[str, np.ndarray], which: Optional[str]) -> np.ndarray:
+    if which is None or which == 'all':
+        return np.ones(len(arrays['session']), dtype=bool)
+    if which not in SESSION_FILTERS:
+        raise ValueError(f"Unknown session filter: {which}. Use one of {list(SESSION_FILTERS)}.")
+    if which == 'regular':
+        return arrays['regular']
+    return arrays['regular'] | arrays['extended']
+
+
+def session_starts(session_ids: np.ndarray) -> np.ndarray:
+    """
+    Positions where a new session begins in a time-sorted array of session IDs.
+    """
+    session_ids = np.asarray(session_ids)
+    if len(session_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate(([True], session_ids[1:] != session_ids[:-1])))
+
+
+def resample_sessions(data: pd.DataFrame, which: Optional[str] = 'regular', calendar: Optional[SessionCalendar] = None) -> pd.DataFrame:
+    """
+    One bar per session from intraday bars (sorted by time): open/high/low/close/volume/transactions
+    aggregated over the bars in the session filter, vwap volume-weighted. Indexed by session day.
+    """
+    calendar = calendar or DEFAULT_CALENDAR
+    arrays = session_arrays(data, calendar)
+    mask = _filter_mask(arrays, which)
+    ids = arrays['session'][mask]
+    starts = session_starts(ids)
+    ends = np.append(starts[1:], len(ids)) - 1
+    out = {}
+    for column, how in OHLCV_AGGREGATES.items():
+        if column not in data.columns:
+            continue
+        values = data[column].to_numpy(dtype=np.float64)[mask]
+        if len(starts) == 0:
+            out[column] = values[:0]
+        elif how == 'first':
+            out[column] = values[starts]
+        elif how == 'last':
+            out[column] = values[ends]
+        elif how == 'max':
+            out[column] = np.maximum.reduceat(values, starts)
+        elif how == 'min':
+            out[column] = np.minimum.reduceat(values, starts)
+        else:
+            out[column] = np.add.reduceat(values, starts)
+    if 'vwap' in data.columns and 'volume' in data.columns:
+        vwap = data['vwap'].to_numpy(dtype=np.float64)[mask]
+        volume = data['volume'].to_numpy(dtype=np.float64)[mask]
+        if len(starts):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out['vwap'] = np.add.reduceat(vwap * volume, starts) / np.add.reduceat(volume, starts)
+        else:
+            out['vwap'] = vwap[:0]
+    return pd.DataFrame(out, index=calendar.session_index(ids[starts]))
@@ -0,0 +1,192 @@
+"""
+Shared-memory dataset broker for multi-process backtests.
+The parent process loads each symbol/timeframe dataset from the cache once into
+multiprocessing.shared_memory and hands out small picklable descriptors. Worker processes
+attach to the same pages zero-copy instead of each decoding its own copy of the parquet file.
+Datasets are reference counted in the broker and evicted (unlinked) once no longer leased.
+
+Layout: numeric columns are stored as one C-contiguous float64 matrix (bars x columns) and the
+index as int64 nanoseconds, so an attached DataFrame is a read-only view over shared pages.
+Only numeric and boolean columns are published (booleans as 0.0/1.0); other columns (e.g. object
+flags some providers add) are not shared and a warning names them.
+"""
+
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cache import DataCache
+
+logger = logging.getLogger(__name__)
+# Serializes the temporary resource tracker patch in _open_shm across threads
+_attach_lock = threading.Lock()
+
+
+def _open_shm(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to an existing block without letting this process's resource tracker unlink it on exit.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching always registers with the resource tracker, which forked workers share
+    # with the parent; skip the registration instead of unregistering someone else's entry.
+    # The patch is held under a lock and only for the duration of this one attach.
+    from multiprocessing import resource_tracker
+    with _attach_lock:
+        register = resource_tracker.register
+
+        def register_untracked(rname, rtype):
+            if rtype != 'shared_memory' or rname.lstrip('/') != name.lstrip('/'):
+                register(rname, rtype)
+
+        resource_tracker.register = register_untracked
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _to_shared(array: np.ndarray) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm
+
+
+class DatasetBroker:
+    """
+    Owns the shared-memory blocks. Use from the parent process only.
+    max_idle_bytes keeps released datasets resident (for reuse) until that many bytes are idle;
+    the default 0 unlinks a dataset as soon as its last lease is released.
+    """
+    def __init__(self, cache_dir: Optional[str] = None, max_idle_bytes: int = 0):
+        self.cache = DataCache(cache_dir)
+        self.max_idle_bytes = max_idle_bytes
+        self._entries: Dict[Tuple, Dict[str, Any]] = {}
+        self._idle: Dict[Tuple, None] = {}  # insertion-ordered: oldest released first
+
+    def acquire(self, symbol: str, provider: str, timeframe: str = '1d', date_range: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease a dataset, loading it into shared memory on first use.
+        Returns a picklable descriptor for attach_dataset(), or None if the dataset is not cached.
+        """
+        key = (symbol, provider, timeframe, date_range)
+        entry = self._entries.get(key)
+        if entry is None:
+            df = self.cache.load(symbol, provider, timeframe, 'parquet', date_range)
+            if df is None:
+                return None
+            entry = self._publish(key, df)
+            self._entries[key] = entry
+        self._idle.pop(key, None)
+        entry['refs'] += 1
+        return entry['handle']
+
+    def release(self, handle: Dict[str, Any]) -> None:
+        key = tuple(handle['key'])
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry['refs'] -= 1
+        if entry['refs'] <= 0:
+            entry['refs'] = 0
+            self._idle[key] = None
+            self._evict()
+
+    @contextmanager
+    def lease(self, symbol: str, provider: str, timeframe: str = '1d', date_range: Optional[str] = None) -> Iterator[Optional[Dict[str, Any]]]:
+        handle = self.acquire(symbol, provider, timeframe, date_range)
+        try:
+            yield handle
+        finally:
+            if handle is not None:
+                self.release(handle)
+
+    def resident_bytes(self) -> int:
+        return sum(e['nbytes'] for e in self._entries.values())
+
+    def close(self) -> None:
+        """
+        Unlink every block, leased or not. Call once all workers are done.
+        """
+        for key in list(self._entries):
+            self._unlink(key)
+        self._idle.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _publish(self, key: Tuple, df: pd.DataFrame) -> Dict[str, Any]:
+        numeric = df.select_dtypes(include=[np.number, bool])
+        dropped = [c for c in df.columns if c not in numeric.columns]
+        if dropped:
+            logger.warning("[DatasetBroker] Columns %s of %s are not numeric and are not shared", dropped, key)
+        values = np.ascontiguousarray(numeric.to_numpy(dtype=np.float64))
+        index = pd.DatetimeIndex(df.index)
+        tz = str(index.tz) if index.tz is not None else None
+        index_ns = np.ascontiguousarray(index.as_unit('ns').asi8)
+        values_shm = _to_shared(values)
+        index_shm = _to_shared(index_ns)
+        handle = {
+            'key': list(key),
+            'values': values_shm.name,
+            'index': index_shm.name,
+            'shape': values.shape,
+            'columns': [str(c) for c in numeric.columns],
+            'tz': tz,
+            'index_name': df.index.name,
+        }
+        return {'handle': handle, 'blocks': [values_shm, index_shm], 'refs': 0, 'nbytes': values.nbytes + index_ns.nbytes}
+
+    def _evict(self) -> None:
+        idle_bytes = sum(self._entries[k]['nbytes'] for k in self._idle)
+        while self._idle and idle_bytes > self.max_idle_bytes:
+            key = next(iter(self._idle))
+            idle_bytes -= self._entries[key]['nbytes']
+            self._idle.pop(key)
+            self._unlink(key)
+
+    def _unlink(self, key: Tuple) -> None:
+        entry = self._entries.pop(key)
+        for shm in entry['blocks']:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+@contextmanager
+def attach_dataset(handle: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+    """
+    Worker side: yield a read-only DataFrame viewing the shared blocks described by handle.
+    The frame must not be used after the context exits.
+    """
+    values_shm = _open_shm(handle['values'])
+    index_shm = _open_shm(handle['index'])
+    try:
+        n_rows, n_cols = handle['shape']
+        values = np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=values_shm.buf)
+        index_ns = np.ndarray((n_rows,), dtype=np.int64, buffer=index_shm.buf)
+        values.flags.writeable = False
+        index = pd.DatetimeIndex(index_ns.view('datetime64[ns]'), name=handle['index_name'])
+        if handle['tz']:
+            index = index.tz_localize('UTC').tz_convert(handle['tz'])
+        df = pd.DataFrame(values, index=index, columns=handle['columns'], copy=False)
+        yield df
+        del df, values, index_ns, index
+    finally:
+        for shm in (values_shm, index_shm):
+            try:
+                shm.close()
+            except BufferError:
+                # A caller still holds a view; the mapping is released when it is garbage collected
+                pass
@@ -0,0 +1,183 @@
+"""
+Column-batched SL/TP simulation for parameter sweeps.
+simulate() runs the Backtester.run state machine (exits on the close: stop-loss, then
+take-profit, then an opposite signal; entries on a non-zero signal while flat; fee once per
+trade) for every column of a bars x combos signal matrix at once. Each bar is one set of array
+operations over all columns, so K parameter sets cost one pass over the data instead of K.
+When Numba is installed the same state machine runs as a compiled kernel (kernels.py).
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import kernels
+from policies import SizingPolicy, StopPolicy
+from trades import REASON_CODES, TradeRecord
+
+STOP_LOSS = REASON_CODES['stop_loss']
+TAKE_PROFIT = REASON_CODES['take_profit']
+SIGNAL = REASON_CODES['signal']
+
+
+class SimulationResult:
+    """
+    Equity and per-bar strategy returns as (bars, combos) arrays, and every closed trade of
+    every column as flat arrays tagged with their column.
+    """
+    def __init__(self, index: pd.Index, initial_cash: float, equity: np.ndarray, strategy_returns: np.ndarray, trades: Dict[str, np.ndarray]):
+        self.index = index
+        self.initial_cash = initial_cash
+        self.equity = equity
+        self.strategy_returns = strategy_returns
+        self.trade_arrays = trades
+
+    @property
+    def n_columns(self) -> int:
+        return self.equity.shape[1]
+
+    def trades(self, column: int) -> TradeRecord:
+        """
+        The TradeRecord of one column, in exit order like Backtester.trades.
+        """
+        t = self.trade_arrays
+        sel = t['column'] == column
+        return TradeRecord(self.index, t['entry_idx'][sel], t['exit_idx'][sel], t['side'][sel], t['entry_price'][sel],
+                           t['exit_price'][sel], t['size'][sel], t['pnl'][sel], t['reason'][sel])
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """
+        Backtester._compute_metrics for every column, computed on the whole matrices at once.
+        """
+        equity, returns = self.equity, self.strategy_returns
+        n_cols = self.n_columns
+        if not len(equity):
+            return [{} for _ in range(n_cols)]
+        roll_max = np.maximum.accumulate(equity, axis=0)
+        max_drawdown = ((equity - roll_max) / roll_max).min(axis=0)
+        std = returns.std(axis=0, ddof=1) if len(returns) > 1 else np.full(n_cols, np.nan)
+        sharpe = np.sqrt(252) * returns.mean(axis=0) / (std + 1e-9)
+        t = self.trade_arrays
+        num_trades = np.bincount(t['column'], minlength=n_cols)
+        pnl, col = t['pnl'], t['column']
+        avg_win = _grouped_mean(pnl, col, pnl > 0, n_cols)
+        avg_loss = _grouped_mean(pnl, col, pnl < 0, n_cols)
+        final = equity[-1]
+        return [{
+            'final_equity': final[k],
+            'total_return': final[k] / self.initial_cash - 1,
+            'max_drawdown': max_drawdown[k],
+            'sharpe': sharpe[k],
+            'num_trades': int(num_trades[k]),
+            'avg_win': avg_win[k],
+            'avg_loss': avg_loss[k],
+        } for k in range(n_cols)]
+
+
+def _grouped_mean(values: np.ndarray, groups: np.ndarray, mask: np.ndarray, n_groups: int) -> np.ndarray:
+    counts = np.bincount(groups[mask], minlength=n_groups)
+    sums = np.bincount(groups[mask], weights=values[mask], minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), 0)
+
+
+def simulate(data: pd.DataFrame, signals: np.ndarray, stop_policy: StopPolicy, sizing_policy: SizingPolicy,
+             initial_cash: float = 100_000, fee: float = 0.0, risk_factor: float = 1.0, risk_reward: float = 3.0,
+             progress: Optional[Callable[[int, int], None]] = None, progress_every: int = 1000,
+             engine: Optional[str] = None) -> SimulationResult:
+    """
+    Simulate every signal column against data['close'].
+    :param data: Bars; stop_policy and sizing_policy must already be prepared on it
+    :param signals: (len(data), K) array of -1/0/1
+    :param engine: 'auto', 'numba' or 'python' (see kernels.py); policies without a compiled form always run in Python
+    :return: SimulationResult with K columns
+    """
+    close = data['close'].to_numpy(dtype=np.float64)
+    signals = np.asarray(signals)
+    if signals.ndim == 1:
+        signals = signals[:, None]
+    n_bars, n_cols = signals.shape
+    if n_bars != len(close):
+        raise ValueError(f"Signal matrix has {n_bars} rows for {len(close)} bars")
+    if kernels.resolve_engine(engine) == 'numba':
+        args = kernels.policy_args(stop_policy, sizing_policy)
+        if args is not None:
+            equity_curve, strat_returns, trades = kernels.simulate_columns(close, signals, args, initial_cash, fee, risk_factor,
+                                                                           risk_reward, progress, progress_every)
+            return SimulationResult(data.index, initial_cash, equity_curve, strat_returns, trades)
+
+    equity = np.full(n_cols, float(initial_cash))
+    position = np.zeros(n_cols, dtype=np.int8)
+    entry_price = np.full(n_cols, np.nan)
+    stop_loss = np.full(n_cols, np.nan)
+    take_profit = np.full(n_cols, np.nan)
+    trade_size = np.zeros(n_cols)
+    entry_pos = np.full(n_cols, -1, dtype=np.int64)
+    equity_curve = np.empty((n_bars, n_cols))
+    strat_returns = np.zeros((n_bars, n_cols))
+    exits: List[tuple] = []
+    # Bars where nothing can happen (all columns flat, no signal anywhere) only copy equity forward
+    any_signal = (signals != 0).any(axis=1)
+    n_open = 0
+
+    for i in range(n_bars):
+        if progress is not None and i % progress_every == 0:
+            progress(i, n_bars)
+        if not n_open and not any_signal[i]:
+            equity_curve[i] = equity
+            continue
+        price = close[i]
+        signal = signals[i]
+        if n_open:
+            is_open = position != 0
+            long, short = position == 1, position == -1
+            hit_stop = is_open & ((long & (price <= stop_loss)) | (short & (price >= stop_loss)))
+            hit_target = is_open & ~hit_stop & ((long & (price >= take_profit)) | (short & (price <= take_profit)))
+            reversed_ = is_open & ~hit_stop & ~hit_target & (signal == -position)
+            closing = hit_stop | hit_target | reversed_
+            if closing.any():
+                cols = np.flatnonzero(closing)
+                pnl = (price - entry_price[cols]) * position[cols] * trade_size[cols] - fee
+                equity[cols] += pnl
+                reason = np.where(hit_stop[cols], STOP_LOSS, np.where(hit_target[cols], TAKE_PROFIT, SIGNAL))
+                exits.append((cols, entry_pos[cols], np.full(len(cols), i), position[cols].copy(), entry_price[cols],
+                              np.full(len(cols), price), trade_size[cols], pnl, reason))
+                position[cols] = 0
+                entry_price[cols] = np.nan
+                stop_loss[cols] = np.nan
+                take_profit[cols] = np.nan
+                trade_size[cols] = 0
+                entry_pos[cols] = -1
+            held = np.flatnonzero(is_open & ~closing)
+            if len(held):
+                # Trailing stops ratchet with the close; fixed stops are returned unchanged
+                stop_loss[held] = stop_policy.update_stops(i, price, position[held], stop_loss[held])
+        opening = np.flatnonzero((position == 0) & (signal != 0))
+        if len(opening):
+            sides = signal[opening].astype(np.int8)
+            stops = stop_policy.initial_stops(i, price, sides)
+            stop_loss[opening] = stops
+            take_profit[opening] = np.where(sides == 1, price + (price - stops) * risk_reward, price - (stops - price) * risk_reward)
+            trade_size[opening] = sizing_policy.sizes(i, price, stops, equity[opening], risk_factor)
+            entry_price[opening] = price
+            position[opening] = sides
+            entry_pos[opening] = i
+        is_open = position != 0
+        n_open = int(is_open.sum())
+        # Mark-to-market
+        if n_open:
+            mtm_pnl = np.where(is_open, (price - entry_price) * position * trade_size, 0.0)
+            equity_curve[i] = equity + mtm_pnl
+            strat_returns[i] = mtm_pnl / np.where(equity != 0, equity, 1)
+        else:
+            equity_curve[i] = equity
+    if progress is not None:
+        progress(n_bars, n_bars)
+
+    names = ['column', 'entry_idx', 'exit_idx', 'side', 'entry_price', 'exit_price', 'size', 'pnl', 'reason']
+    dtypes = [np.int64, np.int64, np.int64, np.int8, np.float64, np.float64, np.float64, np.float64, np.int8]
+    if exits:
+        trades = {name: np.concatenate([e[j] for e in exits]).astype(dtype) for j, (name, dtype) in enumerate(zip(names, dtypes))}
+    else:
+        trades = {name: np.empty(0, dtype=dtype) for name, dtype in zip(names, dtypes)}
+    return SimulationResult(data.index, initial_cash, equity_curve, strat_returns, trades)
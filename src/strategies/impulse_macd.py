@@ -3,7 +3,57 @@ Impulse MACD Strategy for StrategyTester
 """
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Any, Dict, List
 from strategy_interface import Strategy
+import indicators
+
+# Bars per block when sorting lookback windows (bounds the temporary copies)
+WINDOW_BLOCK = 65_536
+
+
+def _window_stats(macd: np.ndarray, hist: np.ndarray, lookback: int):
+    """
+    Per-bar statistics of the previous lookback bars (bar i uses i-lookback .. i-1), for bars i >= lookback:
+    the 10th/90th percentiles of the histogram, and the oversold/overbought MACD levels. Overbought is the
+    mean of the 2nd-4th highest MACD values (the absolute peak excluded); oversold is the mean of the
+    3 lowest (the 4th lowest excluded).
+    """
+    n = len(macd) - lookback
+    hist_lo, hist_hi, oversold, overbought = (np.empty(max(n, 0)) for _ in range(4))
+    if n <= 0:
+        return hist_lo, hist_hi, oversold, overbought
+    hist_windows = sliding_window_view(hist, lookback)[:n]
+    macd_windows = sliding_window_view(macd, lookback)[:n]
+    k = min(4, lookback)
+    for start in range(0, n, WINDOW_BLOCK):
+        stop = min(start + WINDOW_BLOCK, n)
+        hist_lo[start:stop], hist_hi[start:stop] = np.percentile(hist_windows[start:stop], [10, 90], axis=1)
+        ordered = np.sort(macd_windows[start:stop], axis=1)
+        if k > 1:
+            overbought[start:stop] = ordered[:, ::-1][:, 1:k].mean(axis=1)
+            oversold[start:stop] = ordered[:, :k - 1].mean(axis=1)
+        else:
+            overbought[start:stop] = ordered[:, -1]
+            oversold[start:stop] = ordered[:, 0]
+    return hist_lo, hist_hi, oversold, overbought
+
+
+def _impulse_signals(macd: np.ndarray, hist: np.ndarray, stats, lookback: int, hist_clip: float) -> np.ndarray:
+    """
+    Histogram breakout (beyond the clipped percentile band) first, then MACD reversal at the
+    oversold/overbought levels; the first lookback bars are 0.
+    """
+    signal = np.zeros(len(macd), dtype=np.int8)
+    hist_lo, hist_hi, oversold, overbought = stats
+    if not len(hist_lo):
+        return signal
+    upper = np.clip(hist_hi, 0, hist_clip)
+    lower = np.clip(hist_lo, -hist_clip, 0)
+    m, h = macd[lookback:], hist[lookback:]
+    signal[lookback:] = np.select([h > upper, h < lower, m < oversold, m > overbought], [1, -1, 1, -1], 0)
+    return signal
+
 
 class ImpulseMACDStrategy(Strategy):
     def __init__(self, fast=12, slow=26, signal=9, hist_clip=0.5, lookback_days=22):
@@ -13,55 +63,33 @@ class ImpulseMACDStrategy(Strategy):
         self.hist_clip = hist_clip
         self.lookback_days = lookback_days
 
-    def _dynamic_hist_threshold(self, macd_hist):
-        # Use rolling 90th/10th percentiles, clipped to +/- hist_clip
-        upper = np.clip(np.percentile(macd_hist, 90), 0, self.hist_clip)
-        lower = np.clip(np.percentile(macd_hist, 10), -self.hist_clip, 0)
-        return upper, lower
-
-    def _find_oversold_overbought(self, macd_line, window=22):
-        # Find 3-4 highest peaks and lowest troughs in the lookback window
-        peaks = macd_line[-window:].nlargest(4)
-        troughs = macd_line[-window:].nsmallest(4)
-        # Exclude the absolute max/min, average the next 3
-        overbought = peaks.iloc[1:].mean() if len(peaks) > 1 else peaks.mean()
-        oversold = troughs.iloc[:-1].mean() if len(troughs) > 1 else troughs.mean()
-        return oversold, overbought
+    def _macd(self, close: np.ndarray):
+        ema_fast, ema_slow = indicators.ema(close, [self.fast, self.slow])
+        macd = ema_fast - ema_slow
+        return macd, macd - indicators.ema(macd, self.signal)[0]
 
     def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
-        df = data.copy()
-        df['ema_fast'] = df['close'].ewm(span=self.fast, adjust=False).mean()
-        df['ema_slow'] = df['close'].ewm(span=self.slow, adjust=False).mean()
-        df['macd'] = df['ema_fast'] - df['ema_slow']
-        df['macd_signal'] = df['macd'].ewm(span=self.signal, adjust=False).mean()
-        df['macd_hist'] = df['macd'] - df['macd_signal']
-        signals = []
-        for i in range(len(df)):
-            if i < self.lookback_days:
-                signals.append(0)
-                continue
-            # Dynamic histogram breakout
-            hist_window = df['macd_hist'].iloc[i-self.lookback_days:i]
-            upper, lower = self._dynamic_hist_threshold(hist_window)
-            # Dynamic oversold/overbought
-            macd_window = df['macd'].iloc[i-self.lookback_days:i]
-            oversold, overbought = self._find_oversold_overbought(macd_window, self.lookback_days)
-            macd = df['macd'].iloc[i]
-            hist = df['macd_hist'].iloc[i]
-            # Breakout
-            if hist > upper:
-                signals.append(1)
-            elif hist < lower:
-                signals.append(-1)
-            # Reversal (oversold/overbought)
-            elif macd < oversold:
-                signals.append(1)
-            elif macd > overbought:
-                signals.append(-1)
-            else:
-                signals.append(0)
-        df['signal'] = signals
-        return df[['signal']]
+        macd, hist = self._macd(data['close'].to_numpy(dtype=np.float64))
+        stats = _window_stats(macd, hist, self.lookback_days)
+        signal = _impulse_signals(macd, hist, stats, self.lookback_days, self.hist_clip)
+        return pd.DataFrame({'signal': signal}, index=data.index)
+
+    @classmethod
+    def signal_matrix(cls, data: pd.DataFrame, param_sets: List[Dict[str, Any]]) -> np.ndarray:
+        combos = [cls(**params) for params in param_sets]
+        out = np.zeros((len(data), len(combos)), dtype=np.int8)
+        close = data['close'].to_numpy(dtype=np.float64)
+        # Window statistics depend on (fast, slow, signal, lookback) only; hist_clip just clips them
+        lines, stats = {}, {}
+        for k, c in enumerate(combos):
+            key = (c.fast, c.slow, c.signal)
+            if key not in lines:
+                lines[key] = c._macd(close)
+            macd, hist = lines[key]
+            if key + (c.lookback_days,) not in stats:
+                stats[key + (c.lookback_days,)] = _window_stats(macd, hist, c.lookback_days)
+            out[:, k] = _impulse_signals(macd, hist, stats[key + (c.lookback_days,)], c.lookback_days, c.hist_clip)
+        return out
 
     def custom_metrics(self, trades, data):
         # Add custom Impulse MACD metrics if desired
@@ -3,7 +3,9 @@ MACD Crossover Strategy for StrategyTester
 """
 import pandas as pd
 import numpy as np
+from typing import Any, Dict, List
 from strategy_interface import Strategy
+import indicators
 
 class MACDCrossoverStrategy(Strategy):
     def __init__(self, fast=12, slow=26, signal=9):
@@ -22,6 +24,25 @@ class MACDCrossoverStrategy(Strategy):
                                 np.where(df['macd'] < df['macd_signal'], -1, 0))
         return df[['signal']]
 
+    @classmethod
+    def signal_matrix(cls, data: pd.DataFrame, param_sets: List[Dict[str, Any]]) -> np.ndarray:
+        combos = [cls(**params) for params in param_sets]
+        out = np.zeros((len(data), len(combos)), dtype=np.int8)
+        if not combos:
+            return out
+        spans = sorted({c.fast for c in combos} | {c.slow for c in combos})
+        emas = dict(zip(spans, indicators.ema(data['close'].to_numpy(dtype=np.float64), spans)))
+        # MACD lines per (fast, slow) and signal lines per (fast, slow, signal) are shared across combinations
+        lines, signal_lines = {}, {}
+        for k, c in enumerate(combos):
+            key = (c.fast, c.slow)
+            if key not in lines:
+                lines[key] = emas[c.fast] - emas[c.slow]
+            if key + (c.signal,) not in signal_lines:
+                signal_lines[key + (c.signal,)] = indicators.ema(lines[key], c.signal)[0]
+            out[:, k] = indicators.crossover_signals(lines[key], signal_lines[key + (c.signal,)])
+        return out
+
     def custom_metrics(self, trades, data):
         # Add custom MACD metrics if desired
         return {}
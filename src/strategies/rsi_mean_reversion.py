@@ -2,14 +2,17 @@
 Sample strategy: RSI Mean Reversion
 Buys when RSI < 30, sells when RSI > 70.
 Implements the Strategy interface.
+RSI uses Wilder's smoothing; signal_grid() evaluates a whole parameter sweep on NumPy arrays.
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List, Sequence
 from strategy_interface import Strategy
+import indicators
 
 class RsiMeanReversionStrategy(Strategy):
-    def __init__(self, period: int = 14, lower: float = 30, upper: float = 70, trend_ma: int = 50, **kwargs):
+    def __init__(self, period: int = 14, lower: float = 30, upper: float = 70, trend_ma: int = 50, smoothing: str = 'wilder', **kwargs):
         params = {'period': period, 'lower': lower, 'upper': upper, 'trend_ma': trend_ma}
         params.update(kwargs)
         super().__init__(params)
@@ -17,22 +20,45 @@ class RsiMeanReversionStrategy(Strategy):
         self.lower = lower
         self.upper = upper
         self.trend_ma = trend_ma
+        # 'sma' reproduces the rolling-mean RSI of earlier versions
+        self.smoothing = smoothing
 
     def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
-        df = data.copy()
-        delta = df['close'].diff()
-        gain = delta.clip(lower=0)
-        loss = -delta.clip(upper=0)
-        avg_gain = gain.rolling(self.period, min_periods=1).mean()
-        avg_loss = loss.rolling(self.period, min_periods=1).mean()
-        rs = avg_gain / (avg_loss + 1e-9)
-        df['rsi'] = 100 - (100 / (1 + rs))
-        df['signal'] = 0
+        close = data['close'].to_numpy(dtype=np.float64)
+        rsi = indicators.rsi(close, self.period, self.smoothing)
         # Trend filter: only allow shorts if price is below MA
-        df['ma'] = df['close'].rolling(self.trend_ma, min_periods=1).mean()
-        df.loc[df['rsi'] < self.lower, 'signal'] = 1
-        df.loc[(df['rsi'] > self.upper) & (df['close'] < df['ma']), 'signal'] = -1
-        return df[['signal', 'rsi']]
+        below_trend = close < indicators.rolling_mean(close, self.trend_ma)
+        signal = indicators.mean_reversion_signals(rsi, below_trend, self.lower, self.upper)
+        return pd.DataFrame({'signal': signal.reshape(-1), 'rsi': rsi[0]}, index=data.index)
+
+    @staticmethod
+    def signal_grid(data: pd.DataFrame, periods: Sequence[int], lowers: Sequence[float], uppers: Sequence[float],
+                    trend_mas: Sequence[int], smoothing: str = 'wilder') -> np.ndarray:
+        """
+        Signals for every (period, lower, upper, trend_ma) combination without building a DataFrame per combination:
+        gains/losses are computed once, RSI once per period, the trend MA once per window, and the
+        thresholds are applied by broadcasting.
+        :return: int8 array of shape (len(periods), len(lowers), len(uppers), len(trend_mas), len(data));
+                 grid[i, j, k, m] equals generate_signals()['signal'] for those parameters
+        """
+        close = data['close'].to_numpy(dtype=np.float64)
+        rsi = indicators.rsi(close, periods, smoothing)
+        below_trend = close[None, :] < indicators.rolling_mean(close, trend_mas)
+        return indicators.mean_reversion_signals(rsi, below_trend, lowers, uppers)
+
+    @classmethod
+    def signal_matrix(cls, data: pd.DataFrame, param_sets: List[Dict[str, Any]]) -> np.ndarray:
+        combos = [cls(**params) for params in param_sets]
+        out = np.zeros((len(data), len(combos)), dtype=np.int8)
+        close = data['close'].to_numpy(dtype=np.float64)
+        rsi, below_trend = {}, {}
+        for k, c in enumerate(combos):
+            if (c.period, c.smoothing) not in rsi:
+                rsi[c.period, c.smoothing] = indicators.rsi(close, c.period, c.smoothing)
+            if c.trend_ma not in below_trend:
+                below_trend[c.trend_ma] = close < indicators.rolling_mean(close, c.trend_ma)
+            out[:, k] = indicators.mean_reversion_signals(rsi[c.period, c.smoothing], below_trend[c.trend_ma], c.lower, c.upper).reshape(-1)
+        return out
 
     def custom_metrics(self, trades: pd.DataFrame, data: pd.DataFrame) -> Dict[str, Any]:
         return {'num_trades': len(trades)}
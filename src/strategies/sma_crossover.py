@@ -3,9 +3,11 @@ Sample strategy: Simple Moving Average (SMA) Crossover
 Implements the Strategy interface for demonstration and testing.
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List
 from strategy_interface import Strategy
+import indicators
 
 class SmaCrossoverStrategy(Strategy):
     def __init__(self, fast: int = 10, slow: int = 30, **kwargs):
@@ -24,6 +26,19 @@ class SmaCrossoverStrategy(Strategy):
         df.loc[df['sma_fast'] < df['sma_slow'], 'signal'] = -1
         return df[['signal', 'sma_fast', 'sma_slow']]
 
+    @classmethod
+    def signal_matrix(cls, data: pd.DataFrame, param_sets: List[Dict[str, Any]]) -> np.ndarray:
+        combos = [cls(**params) for params in param_sets]
+        out = np.zeros((len(data), len(combos)), dtype=np.int8)
+        if not combos:
+            return out
+        # Each distinct window is computed once and shared by every combination using it
+        windows = sorted({c.fast for c in combos} | {c.slow for c in combos})
+        means = dict(zip(windows, indicators.rolling_mean(data['close'].to_numpy(dtype=np.float64), windows)))
+        for k, c in enumerate(combos):
+            out[:, k] = indicators.crossover_signals(means[c.fast], means[c.slow])
+        return out
+
     def custom_metrics(self, trades: pd.DataFrame, data: pd.DataFrame) -> Dict[str, Any]:
         # Example: count trades
         return {'num_trades': len(trades)}
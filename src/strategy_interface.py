@@ -6,9 +6,17 @@ Defines the interface and hooks for vectorized, extensible strategies.
 from abc import ABC, abstractmethod
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 class Strategy(ABC):
+    # Preferred stop/sizing policies by name (see policies.py); None lets the Backtester use its defaults
+    stop_policy: Optional[str] = None
+    stop_params: Optional[Dict[str, Any]] = None
+    sizing_policy: Optional[str] = None
+    sizing_params: Optional[Dict[str, Any]] = None
+    # Bars the strategy trades on: 'regular', 'extended' or None for every bar (see sessions.py)
+    session: Optional[str] = None
+
     def __init__(self, params: Optional[Dict[str, Any]] = None):
         """
         Initialize the strategy with optional parameters.
@@ -24,6 +32,20 @@ class Strategy(ABC):
         """
         pass
 
+    @classmethod
+    def signal_matrix(cls, data: pd.DataFrame, param_sets: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Optional batch hook: signals for many parameter sets at once, as an int8 array of shape
+        (len(data), len(param_sets)). Column k equals cls(**param_sets[k]).generate_signals(data)['signal']
+        aligned to data.index. The default calls generate_signals once per set; strategies override it
+        with dense array operations so sweeps avoid one DataFrame per combination.
+        """
+        out = np.zeros((len(data), len(param_sets)), dtype=np.int8)
+        for k, params in enumerate(param_sets):
+            signals = cls(**params).generate_signals(data)['signal']
+            out[:, k] = signals.reindex(data.index).fillna(0).to_numpy()
+        return out
+
     def before_backtest(self, data: pd.DataFrame) -> None:
         """
         Optional hook: Called before backtest starts. Can be used for preprocessing or feature engineering.
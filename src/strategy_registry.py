@@ -0,0 +1,151 @@
+"""
+Strategy registry shared by the CLI and the dashboard.
+Strategies are declared by name with an import path and a parameter schema, so listing
+strategies and building forms never imports strategy modules; the class is imported on
+first use only. Extra strategies can be added with the @register_strategy decorator or
+through the 'strategytester.strategies' entry-point group.
+"""
+
+import importlib
+from typing import Any, Callable, Dict, List, Optional
+
+ENTRY_POINT_GROUP = 'strategytester.strategies'
+
+# name -> {'path': 'module:Class', 'label': str, 'params': {param: {'type': type, 'default': value}}}
+STRATEGIES: Dict[str, Dict[str, Any]] = {
+    'sma_crossover': {
+        'path': 'strategies.sma_crossover:SmaCrossoverStrategy',
+        'label': 'SMA Crossover',
+        'params': {
+            'fast': {'type': int, 'default': 10},
+            'slow': {'type': int, 'default': 30},
+        },
+    },
+    'rsi_mean_reversion': {
+        'path': 'strategies.rsi_mean_reversion:RsiMeanReversionStrategy',
+        'label': 'RSI Mean Reversion',
+        'params': {
+            'period': {'type': int, 'default': 14},
+            'lower': {'type': float, 'default': 30},
+            'upper': {'type': float, 'default': 70},
+            'trend_ma': {'type': int, 'default': 50},
+        },
+    },
+    'macd_crossover': {
+        'path': 'strategies.macd_crossover:MACDCrossoverStrategy',
+        'label': 'MACD Crossover',
+        'params': {
+            'fast': {'type': int, 'default': 12},
+            'slow': {'type': int, 'default': 26},
+            'signal': {'type': int, 'default': 9},
+        },
+    },
+    'impulse_macd': {
+        'path': 'strategies.impulse_macd:ImpulseMACDStrategy',
+        'label': 'Impulse MACD',
+        'params': {
+            'fast': {'type': int, 'default': 12},
+            'slow': {'type': int, 'default': 26},
+            'signal': {'type': int, 'default': 9},
+            'hist_clip': {'type': float, 'default': 0.5},
+            'lookback_days': {'type': int, 'default': 22},
+        },
+    },
+}
+
+_loaded: Dict[str, type] = {}
+_entry_points_scanned = False
+
+
+def register_strategy(name: str, label: Optional[str] = None, params: Optional[Dict[str, Dict[str, Any]]] = None) -> Callable[[type], type]:
+    """
+    Class decorator registering an already-imported strategy under name.
+    """
+    def decorator(cls: type) -> type:
+        STRATEGIES[name] = {
+            'path': f"{cls.__module__}:{cls.__qualname__}",
+            'label': label or name,
+            'params': params if params is not None else getattr(cls, 'param_schema', {}),
+        }
+        _loaded[name] = cls
+        return cls
+    return decorator
+
+
+def _scan_entry_points() -> None:
+    """
+    Add strategies advertised by installed packages. Only metadata is read; nothing is imported.
+    """
+    global _entry_points_scanned
+    if _entry_points_scanned:
+        return
+    _entry_points_scanned = True
+    try:
+        from importlib.metadata import entry_points
+        eps = entry_points(group=ENTRY_POINT_GROUP)
+    except Exception:
+        return
+    for ep in eps:
+        STRATEGIES.setdefault(ep.name, {'path': ep.value, 'label': ep.name, 'params': None})
+
+
+def list_strategies() -> List[str]:
+    _scan_entry_points()
+    return list(STRATEGIES.keys())
+
+
+def strategy_options() -> List[Dict[str, str]]:
+    """
+    Dropdown options ({'label', 'value'}) for every registered strategy.
+    """
+    return [{'label': spec['label'], 'value': name} for name, spec in ((n, STRATEGIES[n]) for n in list_strategies())]
+
+
+def get_strategy_class(name: str) -> type:
+    """
+    Import (once) and return the strategy class registered under name.
+    """
+    if name in _loaded:
+        return _loaded[name]
+    _scan_entry_points()
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name}")
+    spec = STRATEGIES[name]
+    module_path, class_name = spec['path'].split(':')
+    module = importlib.import_module(module_path)
+    cls = getattr(module, class_name)
+    if spec['params'] is None:
+        # Entry-point plugins declare their schema on the class
+        spec['params'] = getattr(cls, 'param_schema', {})
+    _loaded[name] = cls
+    return cls
+
+
+def get_param_schema(name: str) -> Dict[str, Dict[str, Any]]:
+    _scan_entry_points()
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name}")
+    if STRATEGIES[name]['params'] is None:
+        get_strategy_class(name)
+    return STRATEGIES[name]['params']
+
+
+def resolve_params(name: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Merge params over the schema defaults, casting to the declared types.
+    None values and params the strategy does not declare are dropped.
+    """
+    schema = get_param_schema(name)
+    resolved = {key: spec['default'] for key, spec in schema.items()}
+    for key, value in (params or {}).items():
+        if key in schema and value is not None:
+            resolved[key] = schema[key]['type'](value)
+    return resolved
+
+
+def create_strategy(name: str, params: Optional[Dict[str, Any]] = None):
+    """
+    Instantiate the strategy registered under name with resolved parameters.
+    """
+    cls = get_strategy_class(name)
+    return cls(**resolve_params(name, params))
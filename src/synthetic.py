@@ -0,0 +1,72 @@
+"""
+Seeded synthetic OHLCV data for benchmarks and equivalence checks.
+Prices follow a regime-switching random walk (trending up, trending down, choppy) so that
+trend and mean-reversion strategies both produce trades. Intraday timeframes only cover
+regular US sessions (09:30-16:00 America/New_York), like the data the fetchers cache.
+"""
+import numpy as np
+import pandas as pd
+
+# Bars per regular session and bar length for each supported timeframe
+SESSION_BARS = {
+    '1d': (1, None),
+    '1h': (7, pd.Timedelta(hours=1)),
+    '5min': (78, pd.Timedelta(minutes=5)),
+    '1min': (390, pd.Timedelta(minutes=1)),
+}
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+
+
+def synthetic_index(n_bars: int, timeframe: str = '1d', start: str = '2000-01-03', tz: str = 'America/New_York') -> pd.DatetimeIndex:
+    """
+    Timestamps of n_bars consecutive bars starting at the first session on or after start.
+    """
+    if timeframe not in SESSION_BARS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}. Available: {list(SESSION_BARS)}")
+    per_day, step = SESSION_BARS[timeframe]
+    n_days = -(-n_bars // per_day)
+    days = pd.bdate_range(start, periods=n_days)
+    if step is None:
+        index = days[:n_bars]
+    else:
+        offsets = SESSION_OPEN + step * np.arange(per_day)
+        index = (days.repeat(per_day) + np.tile(offsets, n_days))[:n_bars]
+    index = index.tz_localize(tz)
+    index.name = 'datetime'
+    return index
+
+
+def synthetic_ohlcv(n_bars: int, timeframe: str = '1d', seed: int = 0, start: str = '2000-01-03', tz: str = 'America/New_York',
+                    start_price: float = 100.0, annual_vol: float = 0.25, annual_drift: float = 0.3, regime_stay: float = 0.98) -> pd.DataFrame:
+    """
+    Deterministic OHLCV frame (open, high, low, close, volume) for a seed.
+    :param n_bars: Number of bars
+    :param timeframe: '1d', '1h', '5min' or '1min'
+    :param seed: Random seed; the same arguments always give the same frame
+    :param annual_vol: Annualized volatility of bar returns
+    :param annual_drift: Absolute annualized drift while in a trending regime
+    :param regime_stay: Per-bar probability of staying in the current regime
+    """
+    rng = np.random.default_rng(seed)
+    bars_per_year = 252 * SESSION_BARS[timeframe][0]
+    vol = annual_vol / np.sqrt(bars_per_year)
+    drift = annual_drift / bars_per_year
+    # Regimes: +1 trend up, -1 trend down, 0 choppy; a switch draws a fresh regime
+    switches = rng.random(n_bars) > regime_stay
+    switches[0] = True
+    draws = rng.integers(-1, 2, size=n_bars)
+    regime = draws[np.maximum.accumulate(np.where(switches, np.arange(n_bars), 0))]
+    log_ret = regime * drift + vol * rng.standard_normal(n_bars)
+    close = start_price * np.exp(np.cumsum(log_ret))
+    gap = vol * 0.2 * rng.standard_normal(n_bars)
+    open_ = np.empty(n_bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * np.exp(gap[1:])
+    wick = vol * 0.5 * np.abs(rng.standard_normal((2, n_bars)))
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+    volume = np.round(rng.lognormal(mean=12.0, sigma=0.5, size=n_bars))
+    return pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume},
+        index=synthetic_index(n_bars, timeframe, start, tz),
+    )
@@ -0,0 +1,111 @@
+"""
+Columnar trade record produced by the Backtester simulation.
+One TradeRecord holds every closed trade as parallel NumPy arrays (bar positions, prices,
+size, PnL, side and an exit reason code); metrics, charts, tables and exports read these
+arrays directly instead of rescanning the bar data.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+EXIT_REASONS = ['stop_loss', 'take_profit', 'signal']
+REASON_CODES = {reason: code for code, reason in enumerate(EXIT_REASONS)}
+
+# Column order of the DataFrame view (the historical trade_log layout)
+TRADE_LOG_COLUMNS = ['entry', 'exit', 'side', 'entry_price', 'exit_price', 'size', 'pnl', 'exit_reason']
+
+
+class TradeRecordBuilder:
+    """
+    Appends trades during the bar loop; build() converts them to arrays once at the end.
+    """
+    def __init__(self):
+        self.entry_idx: List[int] = []
+        self.exit_idx: List[int] = []
+        self.side: List[int] = []
+        self.entry_price: List[float] = []
+        self.exit_price: List[float] = []
+        self.size: List[float] = []
+        self.pnl: List[float] = []
+        self.reason: List[int] = []
+
+    def add(self, entry_idx: int, exit_idx: int, side: int, entry_price: float, exit_price: float, size: float, pnl: float, reason: str) -> None:
+        self.entry_idx.append(entry_idx)
+        self.exit_idx.append(exit_idx)
+        self.side.append(side)
+        self.entry_price.append(entry_price)
+        self.exit_price.append(exit_price)
+        self.size.append(size)
+        self.pnl.append(pnl)
+        self.reason.append(REASON_CODES[reason])
+
+    def build(self, index: pd.Index) -> 'TradeRecord':
+        return TradeRecord(index, self.entry_idx, self.exit_idx, self.side, self.entry_price, self.exit_price, self.size, self.pnl, self.reason)
+
+
+class TradeRecord:
+    """
+    Closed trades as arrays. entry_idx/exit_idx are bar positions into index (the bar timestamps).
+    """
+    def __init__(self, index: pd.Index, entry_idx, exit_idx, side, entry_price, exit_price, size, pnl, reason):
+        self.index = index
+        self.entry_idx = np.asarray(entry_idx, dtype=np.int64)
+        self.exit_idx = np.asarray(exit_idx, dtype=np.int64)
+        self.side = np.asarray(side, dtype=np.int8)
+        self.entry_price = np.asarray(entry_price, dtype=np.float64)
+        self.exit_price = np.asarray(exit_price, dtype=np.float64)
+        self.size = np.asarray(size, dtype=np.float64)
+        self.pnl = np.asarray(pnl, dtype=np.float64)
+        self.reason = np.asarray(reason, dtype=np.int8)
+
+    @classmethod
+    def empty(cls, index: pd.Index) -> 'TradeRecord':
+        return cls(index, [], [], [], [], [], [], [], [])
+
+    def __len__(self) -> int:
+        return len(self.pnl)
+
+    @property
+    def entry_time(self) -> pd.Index:
+        return self.index[self.entry_idx]
+
+    @property
+    def exit_time(self) -> pd.Index:
+        return self.index[self.exit_idx]
+
+    @property
+    def exit_reason(self) -> np.ndarray:
+        return np.asarray(EXIT_REASONS, dtype=object)[self.reason]
+
+    def trade(self, i: int) -> Dict[str, Any]:
+        """
+        One trade as a dict with the trade_log keys.
+        """
+        return {
+            'entry': self.index[self.entry_idx[i]],
+            'exit': self.index[self.exit_idx[i]],
+            'side': int(self.side[i]),
+            'entry_price': float(self.entry_price[i]),
+            'exit_price': float(self.exit_price[i]),
+            'size': float(self.size[i]),
+            'pnl': float(self.pnl[i]),
+            'exit_reason': EXIT_REASONS[self.reason[i]],
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        DataFrame view in the trade_log layout; an empty record gives an empty frame.
+        """
+        if not len(self):
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'entry': self.entry_time,
+            'exit': self.exit_time,
+            'side': self.side,
+            'entry_price': self.entry_price,
+            'exit_price': self.exit_price,
+            'size': self.size,
+            'pnl': self.pnl,
+            'exit_reason': self.exit_reason,
+        }, columns=TRADE_LOG_COLUMNS)
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Run in a fresh interpreter: a regression here hangs the pool rather than failing it
+SCRIPT = textwrap.dedent('''
+    import sys
+    sys.path.insert(0, {src!r})
+    from batch import run_batch
+    from cache import DataCache
+    from synthetic import synthetic_ohlcv
+
+    if __name__ == '__main__':
+        cache_dir = {cache_dir!r}
+        DataCache(cache_dir).save(synthetic_ohlcv(800, '1d', seed=1), 'AAA', 'massive', 'day', 'parquet',
+                                  '2020-01-01_to_2023-01-01')
+        spec = {{'symbols': ['AAA'], 'provider': 'massive', 'timeframe': '1d',
+                 'date_ranges': ['2020-01-01_to_2023-01-01'], 'cache_dir': cache_dir,
+                 'strategies': {{'sma_crossover': {{'fast': [5, 10], 'slow': [20]}}}}}}
+        runs = [run_batch(spec, workers=1), run_batch(spec, workers=2), run_batch(spec, workers=2, shared=True)]
+        for results in runs:
+            assert len(results) == 2 and results['error'].isna().all(), results
+            print(sorted(results['total_return'].round(10)))
+''')
+
+
+def test_pooled_batch_after_serial_run_in_same_process(tmp_path):
+    script = tmp_path / 'run.py'
+    script.write_text(SCRIPT.format(src=os.path.abspath(SRC), cache_dir=str(tmp_path / 'cache')))
+    proc = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    serial, pooled, shared = proc.stdout.strip().splitlines()
+    assert serial == pooled == shared
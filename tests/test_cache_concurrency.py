@@ -0,0 +1,102 @@
+import multiprocessing as mp
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache import CORRUPT_SUFFIX, LOCK_SUFFIX, DataCache
+
+SMALL, LARGE = 500, 5000
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    index = pd.date_range('2024-01-02 14:30', periods=rows, freq='min', tz='UTC')
+    return pd.DataFrame({'close': np.random.default_rng(rows).normal(100, 1, rows)}, index=index)
+
+
+def _writer(cache_dir: str, go, done) -> None:
+    go.wait(30)
+    DataCache(cache_dir).save(_frame(LARGE), 'TEST', 'massive', 'minute')
+    done.set()
+
+
+class _SlowMetaCache(DataCache):
+    """
+    Lets another process save the key between reading the checksum and checking the file against it.
+    """
+    def __init__(self, cache_dir: str, go, done):
+        super().__init__(cache_dir)
+        self.go = go
+        self.done = done
+
+    def checksum(self, path):
+        meta = super().checksum(path)
+        if not self.go.is_set():
+            self.go.set()
+            assert self.done.wait(30)
+        return meta
+
+
+def test_load_racing_a_save_in_another_process_is_not_quarantined(tmp_path):
+    cache_dir = str(tmp_path)
+    DataCache(cache_dir).save(_frame(SMALL), 'TEST', 'massive', 'minute')
+    ctx = mp.get_context('spawn')
+    go, done = ctx.Event(), ctx.Event()
+    writer = ctx.Process(target=_writer, args=(cache_dir, go, done))
+    writer.start()
+    try:
+        cache = _SlowMetaCache(cache_dir, go, done)
+        df = cache.load('TEST', 'massive', 'minute')
+    finally:
+        writer.join(30)
+    assert writer.exitcode == 0
+    path = cache._get_path('TEST', 'massive', 'minute', create=False)
+    assert not os.path.exists(path + CORRUPT_SUFFIX)
+    assert df is not None and len(df) == LARGE
+
+
+def test_truncated_file_is_quarantined(tmp_path):
+    cache = DataCache(str(tmp_path))
+    cache.save(_frame(SMALL), 'TEST', 'massive', 'minute')
+    path = cache._get_path('TEST', 'massive', 'minute', create=False)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) // 2)
+    assert cache.load('TEST', 'massive', 'minute') is None
+    assert os.path.exists(path + CORRUPT_SUFFIX)
+    assert not os.path.exists(path)
+
+
+def test_waiter_on_a_deleted_lock_file_locks_the_new_one(tmp_path):
+    cache = DataCache(str(tmp_path))
+    lock_path = cache._get_path('TEST', 'massive', 'minute') + LOCK_SUFFIX
+    inside = []
+    entered, leave = threading.Event(), threading.Event()
+
+    def newcomer():
+        with cache.lock('TEST', 'massive', 'minute'):
+            inside.append('newcomer')
+            entered.set()
+            leave.wait(30)
+            inside.remove('newcomer')
+
+    def waiter():
+        with cache.lock('TEST', 'massive', 'minute'):
+            inside.append('waiter')
+
+    waiting = threading.Thread(target=waiter)
+    arriving = threading.Thread(target=newcomer)
+    with cache._file_lock(lock_path):
+        waiting.start()
+        waiting.join(0.3)
+        # Deleted while held, as CacheManager reclaims orphaned locks; the newcomer creates and locks a new file
+        os.remove(lock_path)
+        arriving.start()
+        assert entered.wait(30)
+    # The waiter now holds the deleted file's lock, which excludes no one
+    waiting.join(0.5)
+    assert inside == ['newcomer']
+    leave.set()
+    arriving.join(30)
+    waiting.join(30)
+    assert inside == ['waiter']
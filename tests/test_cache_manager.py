@@ -0,0 +1,54 @@
+import os
+import time
+
+import pandas as pd
+
+from cache import LOCK_SUFFIX, DataCache
+from cache_manager import CacheManager, RetentionPolicy
+from synthetic import synthetic_ohlcv
+
+FIRST, SECOND = '2024-01-02_to_2024-03-28', '2024-03-01_to_2024-05-31'
+
+
+def _ranges(cache: DataCache):
+    bars = synthetic_ohlcv(120, '1d', seed=3, start='2024-01-02')
+    for date_range in (FIRST, SECOND):
+        start, end = date_range.split('_to_')
+        cache.save(bars.loc[start:end], 'AAA', 'massive', 'day', 'parquet', date_range)
+    return bars
+
+
+def test_compacted_ranges_are_still_served(tmp_path):
+    cache = DataCache(str(tmp_path))
+    bars = _ranges(cache)
+    expected = {date_range: cache.load('AAA', 'massive', 'day', date_range=date_range) for date_range in (FIRST, SECOND)}
+
+    actions = CacheManager(cache).compact(dry_run=False)
+
+    assert len(actions) == 1
+    target = cache._get_path('AAA', 'massive', 'day', 'parquet', '2024-01-02_to_2024-05-31', create=False)
+    assert actions[0].target == target and os.path.exists(target)
+    assert [n for n in os.listdir(os.path.dirname(target)) if n.endswith('.parquet')] == [os.path.basename(target)]
+    for date_range, df in expected.items():
+        pd.testing.assert_frame_equal(cache.load('AAA', 'massive', 'day', date_range=date_range), df)
+    assert len(cache.load('AAA', 'massive', 'day', date_range='2024-01-02_to_2024-05-31')) == len(bars.loc['2024-01-02':'2024-05-31'])
+
+
+def test_lock_files_are_kept_until_their_data_file_is_gone(tmp_path):
+    cache = DataCache(str(tmp_path))
+    _ranges(cache)
+    first = cache._get_path('AAA', 'massive', 'day', 'parquet', FIRST, create=False)
+    second = cache._get_path('AAA', 'massive', 'day', 'parquet', SECOND, create=False)
+    old = time.time() - 30 * 86_400
+    for path in (first, first + LOCK_SUFFIX, second + LOCK_SUFFIX):
+        os.utime(path, (old, old))
+    manager = CacheManager(cache, {('*', '*'): RetentionPolicy(max_age_days=7)})
+
+    manager.evict(dry_run=False)
+
+    # The idle file is evicted but its lock stays; the other's old lock is not "stale" while its data exists
+    assert not os.path.exists(first) and os.path.exists(first + LOCK_SUFFIX)
+    assert os.path.exists(second) and os.path.exists(second + LOCK_SUFFIX)
+    actions = manager.evict(dry_run=False)
+    assert [(a.paths, a.reason) for a in actions] == [([first + LOCK_SUFFIX], 'lock without data file')]
+    assert not os.path.exists(first + LOCK_SUFFIX) and os.path.exists(second + LOCK_SUFFIX)
@@ -0,0 +1,24 @@
+import os
+
+from cache import DataCache
+from synthetic import synthetic_ohlcv
+
+
+def test_between_reads_only_the_covering_file(tmp_path):
+    cache = DataCache(str(tmp_path))
+    bars = synthetic_ohlcv(250, '1d', seed=5, start='2024-01-02')
+    cache.save(bars.loc['2024-01-02':'2024-06-28'], 'AAA', 'massive', 'day', 'parquet', '2024-01-02_to_2024-06-28')
+    cache.save(bars.loc['2024-06-03':'2024-12-31'], 'AAA', 'massive', 'day', 'parquet', '2024-06-03_to_2024-12-31')
+    covering = cache._get_path('AAA', 'massive', 'day', 'parquet', '2024-01-02_to_2024-06-28', create=False)
+    other = cache._get_path('AAA', 'massive', 'day', 'parquet', '2024-06-03_to_2024-12-31', create=False)
+    # Unreadable, so the scan fails if it opens this file
+    with open(other, 'wb') as f:
+        f.write(b'not parquet')
+
+    scan = cache.scan('AAA', 'day', 'massive').between('2024-02-01', '2024-03-29')
+
+    assert scan.files() == [covering]
+    df = scan.to_pandas()
+    assert len(df) == len(bars.loc['2024-02-01':'2024-03-29'])
+    assert df.index.min().date().isoformat() >= '2024-02-01' and df.index.max().date().isoformat() <= '2024-03-29'
+    assert os.path.getsize(other) == len(b'not parquet')
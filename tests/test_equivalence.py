@@ -0,0 +1,38 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+import kernels
+from backtester import Backtester
+from equivalence import check_case, engine_output, random_case
+
+CASES = 8
+
+
+def _engine(name: str):
+    def run(data, strategy, **settings):
+        backtester = Backtester(data, strategy, engine=name, **settings)
+        assert backtester.engine == name
+        backtester.run()
+        return engine_output(backtester)
+    return run
+
+
+@pytest.mark.parametrize('engine', [
+    'python',
+    pytest.param('numba', marks=pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason='numba is not installed')),
+])
+def test_engine_matches_reference(engine):
+    rng = random.Random(7)
+    checked = 0
+    for case in (random_case(rng) for _ in range(CASES)):
+        errors = check_case(case, _engine(engine))
+        if errors is None:
+            continue
+        assert errors == [], (case, errors)
+        checked += 1
+    assert checked >= CASES // 2
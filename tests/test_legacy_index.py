@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import DataCache
+from sessions import EXCHANGE_TZ, DEFAULT_CALENDAR, is_normalized
+
+
+def _write_legacy(cache: DataCache, df: pd.DataFrame, timeframe: str, date_range: str) -> None:
+    # Written directly, as files cached before index normalization were: no sidecars, index as stored
+    path = cache._get_path('LEG', 'massive', timeframe, 'parquet', date_range)
+    df.to_parquet(path)
+    assert os.path.exists(path)
+
+
+def test_scan_normalizes_naive_utc_minute_file(tmp_path):
+    cache = DataCache(str(tmp_path))
+    index = pd.date_range('2024-03-01 14:30', periods=390, freq='min', name='datetime')
+    _write_legacy(cache, pd.DataFrame({'close': np.arange(390.0)}, index=index), 'minute', '2024-03-01_to_2024-03-01')
+
+    df = cache.scan('LEG', 'minute', 'massive').to_pandas()
+
+    assert is_normalized(df.index)
+    assert df.index[0] == pd.Timestamp('2024-03-01 09:30', tz=EXCHANGE_TZ)
+    assert df.index.equals(cache.load('LEG', 'massive', 'minute', date_range='2024-03-01_to_2024-03-01').index)
+    assert DEFAULT_CALENDAR.arrays(df.index)['regular'].all()
+
+
+def test_scan_moves_legacy_daily_bars_to_their_session_day(tmp_path):
+    cache = DataCache(str(tmp_path))
+    # Daily dates localized as UTC and stored in exchange time: 19:00/20:00 the evening before
+    dates = pd.to_datetime(['2024-03-08', '2024-03-11', '2024-03-12'])
+    index = dates.tz_localize('UTC').tz_convert(EXCHANGE_TZ).as_unit('us').rename('datetime')
+    _write_legacy(cache, pd.DataFrame({'close': [1.0, 2.0, 3.0]}, index=index), 'day', '2024-03-08_to_2024-03-12')
+
+    df = cache.scan('LEG', 'day', 'massive').to_pandas()
+
+    assert is_normalized(df.index)
+    assert df.index.equals(pd.DatetimeIndex(dates, name='datetime').tz_localize(EXCHANGE_TZ).as_unit('ns'))
+    arrays = DEFAULT_CALENDAR.arrays(df.index)
+    assert arrays['regular'].all() and not arrays['extended'].any()
+    expected_days = (dates - pd.Timestamp('1970-01-01')).days.to_numpy()
+    assert np.array_equal(arrays['session'], expected_days)
+
+
+def test_load_attaches_sessions_of_legacy_daily_file(tmp_path):
+    cache = DataCache(str(tmp_path))
+    dates = pd.to_datetime(['2024-07-01', '2024-07-02'])
+    index = dates.tz_localize('UTC').tz_convert(EXCHANGE_TZ).rename('datetime')
+    _write_legacy(cache, pd.DataFrame({'close': [1.0, 2.0]}, index=index), 'day', '2024-07-01_to_2024-07-02')
+
+    df = cache.load('LEG', 'massive', 'day', date_range='2024-07-01_to_2024-07-02', sessions=True)
+
+    assert list(df.index.day) == [1, 2]
+    assert df['regular'].all()
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import Backtester
+from policies import AtrStop, FixedPctStop, SizingPolicy, StopPolicy, get_stop_policy, parse_policy_params
+from strategy_interface import Strategy
+
+
+class _FlatStrategy(Strategy):
+    stop_policy = 'fixed_pct'
+    stop_params = {'pct': 0.02}
+
+    def generate_signals(self, data):
+        return pd.DataFrame({'signal': 0}, index=data.index)
+
+
+def _data():
+    return pd.DataFrame({'close': np.linspace(100, 110, 50)}, index=pd.date_range('2024-01-01', periods=50))
+
+
+def test_parse_policy_params_converts_booleans_and_numbers():
+    assert parse_policy_params('trailing=False,pct=0.02,period=10,label=x') == {'trailing': False, 'pct': 0.02, 'period': 10, 'label': 'x'}
+    assert get_stop_policy('fixed_pct', **parse_policy_params('trailing=false')).trailing is False
+    assert get_stop_policy('fixed_pct', **parse_policy_params('trailing=TRUE')).trailing is True
+
+
+def test_policy_bases_are_abstract():
+    with pytest.raises(TypeError):
+        StopPolicy()
+    with pytest.raises(TypeError):
+        SizingPolicy()
+
+
+def test_strategy_params_only_follow_the_strategy_policy():
+    explicit = Backtester(_data(), _FlatStrategy(), stop_policy='atr')
+    assert isinstance(explicit.stop_policy, AtrStop) and explicit.stop_policy.multiplier == 2.0
+    preferred = Backtester(_data(), _FlatStrategy())
+    assert isinstance(preferred.stop_policy, FixedPctStop) and preferred.stop_policy.pct == 0.02
+    assert Backtester(_data(), _FlatStrategy(), stop_params={'pct': 0.05}).stop_policy.pct == 0.05